@@ -0,0 +1,11 @@
+"""
+Performance benchmarks for the Spark service.
+
+Benchmarks are not part of the test suite, and can be run using `invoke benchmark`.
+"""
+
+import os
+
+# Service config is parsed from env.
+# Benchmarks do not run inside a Brewblox stack, so the service name can't be detected.
+os.environ.setdefault('BREWBLOX_SPARK_NAME', 'benchmark')
@@ -0,0 +1,80 @@
+"""
+Benchmarks for parsing the controlbox stream protocol.
+
+Feeds a large generated READ_ALL_BLOCKS response to the parser in small fragments,
+as it would arrive in separate TCP segments.
+"""
+
+import argparse
+from time import perf_counter
+
+from brewblox_devcon_spark import codec
+from brewblox_devcon_spark.codec import Codec
+from brewblox_devcon_spark.connection.cbox_parser import CboxParser
+from brewblox_devcon_spark.models import ErrorCode, IntermediateResponse
+
+from .corpus import read_all_payloads
+
+
+def stream_data(size: int) -> bytes:
+    """
+    Generates a single encoded response of at least `size` bytes.
+    The response is interleaved with annotations and event messages.
+    """
+    codec.setup()
+    cdc = Codec()
+    payloads = read_all_payloads(100)
+    count = 100
+
+    while True:
+        response = cdc.encode_response(IntermediateResponse(
+            msgId=1,
+            error=ErrorCode.OK,
+            payload=payloads * (count // 100),
+        ))
+        if len(response) >= size:
+            break
+        count = count * size // len(response) + 100
+
+    # Responses are chunked by the controller
+    chunks = [response[i:i+1000] for i in range(0, len(response), 1000)]
+    return ('<!connected:sensor>' + '<add>,'.join(chunks) + '<id>\n').encode()
+
+
+def measure(data: bytes, fragment: int) -> float:
+    parser = CboxParser()
+    fragments = [data[i:i+fragment] for i in range(0, len(data), fragment)]
+
+    start = perf_counter()
+    for v in fragments:
+        parser.push(v)
+        for _ in parser.event_messages():
+            pass
+        for _ in parser.data_messages():
+            pass
+    return perf_counter() - start
+
+
+def run(sizes: list[int], fragment: int, rounds: int):
+    print(f'cbox parser: {fragment} byte fragments, best of {rounds} rounds')
+    for size in sizes:
+        data = stream_data(size * 1000)
+        duration = min(measure(data, fragment) for _ in range(rounds))
+        print(f'  {len(data) // 1000:6d} kB {duration * 1000:10.2f} ms'
+              f'  ({len(data) / duration / 1e6:.1f} MB/s)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200, 400],
+                        help='Stream sizes in kB')
+    parser.add_argument('--fragment', type=int, default=256,
+                        help='Number of bytes per pushed fragment')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Number of timed rounds')
+    args = parser.parse_args()
+    run(args.sizes, args.fragment, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmarks for block payload encoding and decoding.
+
+Decodes a generated READ_ALL_BLOCKS response using each available decoder,
+and with a warm cache of decoded payloads,
+encodes the decoded blocks again using each available encoder,
+and prints the timing results.
+"""
+
+import argparse
+from time import perf_counter
+from typing import Callable
+
+from brewblox_devcon_spark import codec
+from brewblox_devcon_spark.codec import Codec
+from brewblox_devcon_spark.models import ReadMode
+
+from .corpus import read_all_payloads
+
+
+def measure(func: Callable, rounds: int) -> float:
+    """
+    Returns the best-of-`rounds` duration of `func()` in seconds.
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def run(blocks: int, rounds: int):
+    codec.setup()
+    payloads = read_all_payloads(blocks)
+
+    decoders = {
+        'json': Codec(direct_decode=False, cache_size=0),
+        'direct': Codec(direct_decode=True, cache_size=0),
+    }
+    cached = Codec(direct_decode=True, cache_size=2 * blocks * len(ReadMode))
+    encoders = {
+        'json': Codec(direct_encode=False),
+        'direct': Codec(direct_encode=True),
+    }
+
+    print(f'read_all_blocks: {blocks} blocks, best of {rounds} rounds')
+
+    for temp in ['degC', 'degF']:
+        codec.unit_conversion.CV.get().temperature = temp
+
+        for mode in ReadMode:
+            results = {
+                name: measure(lambda: [cdc.decode_payload(p, mode=mode) for p in payloads],
+                              rounds)
+                for name, cdc in decoders.items()
+            }
+            # After the first round, all payloads are cache hits
+            results['cached'] = measure(lambda: [cached.decode_payload(p, mode=mode) for p in payloads],
+                                        rounds)
+            report(f'{mode.name} {temp}', results)
+
+    codec.unit_conversion.CV.get().temperature = 'degC'
+
+    print(f'write_block: {blocks} blocks, best of {rounds} rounds')
+
+    for mode in ReadMode:
+        decoded = [decoders['direct'].decode_payload(p, mode=mode, filter_values=False)
+                   for p in payloads]
+        results = {
+            name: measure(lambda: [cdc.encode_payload(p) for p in decoded],
+                          rounds)
+            for name, cdc in encoders.items()
+        }
+        report(mode.name, results)
+
+
+def report(label: str, results: dict[str, float]):
+    baseline = results['json']
+    for name, duration in results.items():
+        print(f'  {label:<13} {name:<8} {duration * 1000:8.2f} ms'
+              f'  ({baseline / duration:.2f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=100,
+                        help='Number of blocks in the READ_ALL_BLOCKS response')
+    parser.add_argument('--rounds', type=int, default=10,
+                        help='Number of timed rounds per decoder')
+    args = parser.parse_args()
+    run(args.blocks, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
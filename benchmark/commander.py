@@ -0,0 +1,110 @@
+"""
+Benchmarks for commander round trips.
+
+Sends commands to an in-process mock controller,
+using both the direct and the JSON-based codec.
+Round trips include request and response transcoding on both sides of the connection.
+
+If `--rtt` is set, the mock controller is reached through an emulated link.
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+from time import perf_counter
+
+from brewblox_devcon_spark import (app_factory, codec, command, state_machine,
+                                   utils)
+from brewblox_devcon_spark.connection import connection_handler
+from brewblox_devcon_spark.models import FirmwareBlock
+
+
+async def measure(func, count: int, rounds: int) -> float:
+    """
+    Returns the best-of-`rounds` duration of `count` sequential `await func()` calls in seconds.
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        start = perf_counter()
+        for _ in range(count):
+            await func()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+async def run_commander(direct: bool, blocks: int, count: int, rounds: int) -> dict[str, float]:
+    config = utils.get_config()
+    config.mock = True
+    config.device_id = config.device_id or '123456789012345678901234'
+    config.codec_direct_encode = direct
+    config.codec_direct_decode = direct
+
+    state_machine.setup()
+    codec.setup()
+    connection_handler.setup()
+    command.setup()
+
+    async with connection_handler.lifespan():
+        state = state_machine.CV.get()
+        state.set_enabled(True)
+        await asyncio.wait_for(state.wait_connected(), timeout=5)
+
+        cmder = command.CV.get()
+        for idx in range(blocks):
+            await cmder.create_block(FirmwareBlock(
+                id=f'setpoint-{idx}',
+                nid=0,
+                type='SetpointSensorPair',
+                data={'storedSetting[degC]': 20 + idx / 10},
+            ))
+
+        return {
+            'noop': await measure(cmder.noop, count, rounds) / count,
+            'read_all_blocks': await measure(cmder.read_all_blocks, 1, rounds),
+        }
+
+
+def run(blocks: int, count: int, rounds: int,
+        rtt: float = 0, jitter: float = 0, bandwidth: int = 0):
+    app_factory.setup_logging(False, False)
+
+    config = utils.get_config()
+    config.mock_link = bool(rtt)
+    config.mock_link_rtt = timedelta(milliseconds=rtt)
+    config.mock_link_jitter = timedelta(milliseconds=jitter)
+    config.mock_link_bandwidth = bandwidth
+
+    results = {
+        'json': asyncio.run(run_commander(False, blocks, count, rounds)),
+        'direct': asyncio.run(run_commander(True, blocks, count, rounds)),
+    }
+
+    link = f', {rtt} ms RTT' if rtt else ''
+    print(f'commander round trip: {blocks} blocks{link}, best of {rounds} rounds')
+    for key in results['json']:
+        baseline = results['json'][key]
+        for name, values in results.items():
+            print(f'  {key:<16} {name:<8} {values[key] * 1000:8.3f} ms'
+                  f'  ({baseline / values[key]:.2f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=100,
+                        help='Number of blocks on the mock controller')
+    parser.add_argument('--count', type=int, default=200,
+                        help='Number of sequential noop commands per round')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='Number of timed rounds')
+    parser.add_argument('--rtt', type=float, default=0,
+                        help='Emulated link round trip time in ms')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='Emulated link jitter in ms')
+    parser.add_argument('--bandwidth', type=int, default=0,
+                        help='Emulated link bandwidth in bytes per second')
+    args = parser.parse_args()
+    run(args.blocks, args.count, args.rounds, args.rtt, args.jitter, args.bandwidth)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Generated block payloads for benchmarks
+"""
+
+from base64 import b64encode
+from dataclasses import dataclass
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import Message
+
+from brewblox_devcon_spark.codec import Codec, lookup
+from brewblox_devcon_spark.models import (DecodedPayload, EncodedPayload,
+                                          ReadMode)
+
+SEQUENCE_INSTRUCTIONS = [
+    '# Heat the kettle',
+    'SET_SETPOINT target=Kettle Setpoint, setting=65.5C',
+    'WAIT_SETPOINT target=Kettle Setpoint, precision=1dC',
+    'SET_DIGITAL target=Kettle Pump, setting=STATE_ACTIVE',
+    'SET_PWM target=Kettle PWM, setting=$kettle_pwm',
+    'WAIT_DURATION duration=1h10m',
+    'WAIT_TEMP_ABOVE target=Kettle Sensor, value=78C',
+    "SET_SETPOINT target='HLT Setpoint', setting=$hlt_setting",
+    'SET_DIGITAL target=Kettle Pump, setting=STATE_INACTIVE',
+    'WAIT_DURATION duration=90s',
+]
+
+
+@dataclass
+class CorpusEntry:
+    """
+    A generated block in all formats used by the codec.
+    """
+    impl: lookup.ObjectLookup
+    encoded: EncodedPayload
+    typed: DecodedPayload
+    postfixed: DecodedPayload
+
+
+def _scalar(field: FieldDescriptor):
+    if field.cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        return field.enum_type.values[-1].number
+    if field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return True
+    if field.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        return b'\x01\x02' if field.type == FieldDescriptor.TYPE_BYTES else 'text'
+    return 10
+
+
+def populate(message: Message) -> Message:
+    """
+    Sets a non-default value for every field in `message`.
+    Only the first field of every oneof is set.
+    """
+    for field in message.DESCRIPTOR.fields:
+        if field.containing_oneof and message.WhichOneof(field.containing_oneof.name):
+            continue
+
+        value = getattr(message, field.name)
+
+        if field.message_type and field.message_type.GetOptions().map_entry:
+            v_field = field.message_type.fields_by_name['value']
+            if v_field.message_type:
+                populate(value['key'])
+            else:
+                value['key'] = _scalar(v_field)
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            if field.message_type:
+                populate(value.add())
+                populate(value.add())
+            else:
+                value.extend([_scalar(field), 0])
+        elif field.message_type:
+            populate(value)
+        else:
+            setattr(message, field.name, _scalar(field))
+
+    return message
+
+
+def read_all_payloads(count: int) -> list[EncodedPayload]:
+    """
+    Generates a READ_ALL_BLOCKS response with `count` blocks.
+    Block types are cycled, and every block has all fields populated.
+    """
+    impls = [v for v in lookup.CV.get().objects() if v.type_str != 'EdgeCase']
+    encoded = [b64encode(populate(v.message_cls()).SerializeToString()).decode()
+               for v in impls]
+
+    return [
+        EncodedPayload(
+            blockId=idx + 100,
+            blockType=impls[idx % len(impls)].type_str,
+            name=f'block-{idx}',
+            content=encoded[idx % len(impls)],
+        )
+        for idx in range(count)
+    ]
+
+
+def block_corpus() -> list[CorpusEntry]:
+    """
+    Generates one fully populated block for every known block type.
+
+    Encoded payloads are used as decoder input.
+    Typed (DEFAULT) and postfixed (LOGGED) payloads are used as encoder input.
+    """
+    cdc = Codec(filter_values=False, cache_size=0)
+    entries = []
+
+    for idx, impl in enumerate(lookup.CV.get().objects()):
+        if impl.type_str == lookup.EDGE_CASE_TYPE_STR:
+            continue
+
+        encoded = EncodedPayload(
+            blockId=idx + 100,
+            blockType=impl.type_str,
+            name=f'block-{idx}',
+            content=b64encode(populate(impl.message_cls()).SerializeToString()).decode(),
+        )
+        entries.append(CorpusEntry(
+            impl=impl,
+            encoded=encoded,
+            typed=cdc.decode_payload(encoded, mode=ReadMode.DEFAULT),
+            postfixed=cdc.decode_payload(encoded, mode=ReadMode.LOGGED),
+        ))
+
+    return entries
@@ -0,0 +1,74 @@
+"""
+Benchmarks for codec startup and block type lookup.
+
+Measures the cold start cost of importing and setting up the codec,
+and the per-payload cost of finding the codec entry for a block type.
+"""
+
+import argparse
+import subprocess
+import sys
+from brewblox_devcon_spark.codec import lookup
+
+from .codec import measure
+
+COLD_START_SCRIPT = """
+from time import perf_counter
+start = perf_counter()
+from brewblox_devcon_spark import codec
+from brewblox_devcon_spark.models import EncodedPayload
+codec.setup()
+codec.CV.get().decode_payload(EncodedPayload(blockId=1, blockType='Pid', content=''))
+print(perf_counter() - start)
+"""
+
+
+def cold_start() -> float:
+    """
+    Returns the duration of importing the codec, and decoding a single payload.
+    This is measured in a new interpreter, to prevent cached imports.
+    """
+    result = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT],
+                            capture_output=True,
+                            check=True,
+                            text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run(lookups: int, rounds: int):
+    print(f'cold start: best of {rounds} rounds')
+    duration = min(cold_start() for _ in range(rounds))
+    print(f'  import + setup + decode {duration * 1000:8.2f} ms')
+
+    registry = lookup.TypeRegistry()
+    objects = registry.objects()
+    block_types = [v.type_str for v in objects] + [v.type_int for v in objects]
+    block_types = (block_types * (lookups // len(block_types) + 1))[:lookups]
+
+    def linear():
+        for block_type in block_types:
+            next((v for v in objects
+                  if block_type in [v.type_str, v.type_int]), None)
+
+    def indexed():
+        for block_type in block_types:
+            registry.find_object(block_type)
+
+    print(f'block type lookup: {lookups} lookups, best of {rounds} rounds')
+    for name, func in [('linear', linear), ('indexed', indexed)]:
+        duration = measure(func, rounds)
+        print(f'  {name:<8} {duration * 1e9 / lookups:8.1f} ns/lookup')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lookups', type=int, default=10000,
+                        help='Number of block type lookups')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='Number of timed rounds')
+    args = parser.parse_args()
+    run(args.lookups, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
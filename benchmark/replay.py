@@ -0,0 +1,153 @@
+"""
+Benchmarks for replaying recorded controller traffic.
+
+Recordings are made by setting the `wire_recording` service option.
+Use `--record` to create a recording of the in-process mock controller instead.
+
+The recorded messages are used to measure:
+- parsing the controlbox stream
+- decoding all responses and their payloads
+- sending all recorded requests through the commander, answered by a replay connection
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+from time import perf_counter
+
+from brewblox_devcon_spark import (app_factory, codec, command, state_machine,
+                                   utils)
+from brewblox_devcon_spark.codec import Codec
+from brewblox_devcon_spark.connection import connection_handler, wire_recorder
+from brewblox_devcon_spark.connection.wire_recorder import (RecordKind,
+                                                            WireRecord,
+                                                            read_records)
+from brewblox_devcon_spark.models import FirmwareBlock
+
+from .cbox_parser import measure as measure_parser
+
+
+def stream_data(records: list[WireRecord]) -> bytes:
+    """
+    Reconstructs the received controlbox stream.
+    """
+    return b''.join(
+        f'<{r.msg}>'.encode() if r.kind == RecordKind.EVENT else f'{r.msg}\n'.encode()
+        for r in records
+        if r.kind != RecordKind.REQUEST
+    )
+
+
+def measure_codec(records: list[WireRecord]) -> float:
+    cdc = Codec(cache_size=0)
+    responses = [r.msg for r in records if r.kind == RecordKind.RESPONSE]
+
+    start = perf_counter()
+    for msg in responses:
+        response = cdc.decode_response(msg)
+        for payload in response.payload:
+            cdc.decode_payload(payload)
+    return perf_counter() - start
+
+
+async def measure_commander(path: Path, records: list[WireRecord], speed: float) -> float:
+    config = utils.get_config()
+    config.wire_recording = None
+    config.wire_replay = path
+    config.wire_replay_speed = speed
+
+    state_machine.setup()
+    codec.setup()
+    wire_recorder.setup()
+    connection_handler.setup()
+    command.setup()
+
+    async with connection_handler.lifespan():
+        state = state_machine.CV.get()
+        state.set_enabled(True)
+        await asyncio.wait_for(state.wait_connected(), timeout=5)
+
+        cdc = codec.CV.get()
+        cmder = command.CV.get()
+        requests = [cdc.decode_request(r.msg) for r in records if r.kind == RecordKind.REQUEST]
+
+        start = perf_counter()
+        for request in requests:
+            await cmder._execute(request.opcode, request.payload, request.mode)
+        return perf_counter() - start
+
+
+async def record_mock(path: Path, blocks: int, count: int):
+    config = utils.get_config()
+    config.mock = True
+    config.device_id = config.device_id or '123456789012345678901234'
+    config.wire_recording = path
+
+    state_machine.setup()
+    codec.setup()
+    wire_recorder.setup()
+    connection_handler.setup()
+    command.setup()
+
+    async with wire_recorder.lifespan(), connection_handler.lifespan():
+        state = state_machine.CV.get()
+        state.set_enabled(True)
+        await asyncio.wait_for(state.wait_connected(), timeout=5)
+
+        cmder = command.CV.get()
+        await cmder.version()
+        for idx in range(blocks):
+            await cmder.create_block(FirmwareBlock(
+                id=f'setpoint-{idx}',
+                nid=0,
+                type='SetpointSensorPair',
+                data={'storedSetting[degC]': 20 + idx / 10},
+            ))
+        for _ in range(count):
+            await cmder.read_all_blocks()
+
+
+def run(path: Path, speed: float, rounds: int):
+    app_factory.setup_logging(False, False)
+    codec.setup()
+    records = list(read_records(path))
+    data = stream_data(records)
+
+    print(f'replay: {path} ({len(records)} records, {len(data) // 1000} kB), best of {rounds} rounds')
+
+    duration = min(measure_parser(data, 1024) for _ in range(rounds))
+    print(f'  {"parser":<16} {duration * 1000:10.2f} ms')
+
+    duration = min(measure_codec(records) for _ in range(rounds))
+    print(f'  {"codec":<16} {duration * 1000:10.2f} ms')
+
+    duration = min(asyncio.run(measure_commander(path, records, speed)) for _ in range(rounds))
+    print(f'  {"commander":<16} {duration * 1000:10.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', type=Path,
+                        help='Wire recording file')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='Replay speed multiplier. 0 replays without delays')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Number of timed rounds')
+    parser.add_argument('--record', action='store_true',
+                        help='Record the mock controller before replaying')
+    parser.add_argument('--blocks', type=int, default=100,
+                        help='Number of blocks on the recorded mock controller')
+    parser.add_argument('--count', type=int, default=20,
+                        help='Number of recorded read_all_blocks commands')
+    args = parser.parse_args()
+
+    if args.record:
+        app_factory.setup_logging(False, False)
+        asyncio.run(record_mock(args.recording, args.blocks, args.count))
+
+    run(args.recording, args.speed, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Codec benchmark suite.
+
+Times all codec operations for a generated corpus with one block of every block type.
+Results can be written as JSON, and compared against a previously saved baseline.
+
+If any case is slower than the baseline by more than the threshold,
+the suite exits with a non-zero status.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from typing import Callable
+
+import google.protobuf
+
+from brewblox_devcon_spark import codec
+from brewblox_devcon_spark.codec import Codec, sequence
+from brewblox_devcon_spark.models import (Block, IntermediateRequest,
+                                          IntermediateResponse, Opcode,
+                                          ReadMode)
+
+from .codec import measure
+from .corpus import SEQUENCE_INSTRUCTIONS, block_corpus
+
+
+def cases(repeat: int) -> dict[str, tuple[int, Callable]]:
+    """
+    Returns all benchmark cases, with their number of items per call.
+    Every case processes the full corpus `repeat` times.
+    """
+    codec.setup()
+
+    # The payload cache would hide changes in decoding performance
+    cdc = Codec(cache_size=0)
+    corpus = block_corpus() * repeat
+
+    encoded = [v.encoded for v in corpus]
+    typed = [v.typed for v in corpus]
+    postfixed = [v.postfixed for v in corpus]
+
+    requests = [
+        IntermediateRequest(msgId=idx, opcode=Opcode.BLOCK_WRITE, payload=v)
+        for idx, v in enumerate(encoded)
+    ]
+    response = cdc.encode_response(IntermediateResponse(
+        msgId=1,
+        error='OK',
+        payload=encoded,
+    ))
+
+    lines = SEQUENCE_INSTRUCTIONS * repeat
+    parsed_block = Block(id='sequence', type='Sequence', data={'instructions': lines})
+    sequence.parse(parsed_block)
+    parsed = parsed_block.data['instructions']
+    block = Block(id='sequence', type='Sequence', data={})
+
+    def parse():
+        block.data['instructions'] = lines
+        sequence.parse(block)
+
+    def serialize():
+        block.data['instructions'] = parsed
+        sequence.serialize(block)
+
+    results = {
+        'encode_payload[typed]': (len(typed), lambda: [cdc.encode_payload(v) for v in typed]),
+        'encode_payload[postfixed]': (len(postfixed), lambda: [cdc.encode_payload(v) for v in postfixed]),
+    }
+
+    for mode in ReadMode:
+        results[f'decode_payload[{mode.name}]'] = (
+            len(encoded),
+            lambda mode=mode: [cdc.decode_payload(v, mode=mode) for v in encoded],
+        )
+
+    results['encode_request'] = (len(requests), lambda: [cdc.encode_request(v) for v in requests])
+    results['decode_response'] = (len(encoded), lambda: cdc.decode_response(response))
+    results['sequence.parse'] = (len(lines), parse)
+    results['sequence.serialize'] = (len(lines), serialize)
+
+    return results
+
+
+def run(repeat: int, rounds: int) -> dict:
+    """
+    Runs all cases, and returns the best-of-`rounds` duration per item in microseconds.
+    """
+    results = {}
+    for name, (count, func) in cases(repeat).items():
+        func()  # warmup
+        results[name] = measure(func, rounds) * 1e6 / count
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'protobuf': google.protobuf.__version__,
+            'repeat': repeat,
+            'rounds': rounds,
+        },
+        'results': results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Prints the change relative to baseline for every case.
+    Returns the names of cases that regressed by more than `threshold`.
+    """
+    regressions = []
+
+    for name, duration in results['results'].items():
+        try:
+            previous = baseline['results'][name]
+        except KeyError:
+            print(f'  {name:<28} {duration:10.2f} us/item  (new)')
+            continue
+
+        change = duration / previous - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+
+        print(f'  {name:<28} {duration:10.2f} us/item  ({change:+7.1%}){flag}')
+
+    return regressions
+
+
+def report(results: dict):
+    for name, duration in results['results'].items():
+        print(f'  {name:<28} {duration:10.2f} us/item')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of times the corpus is processed per round')
+    parser.add_argument('--rounds', type=int, default=10,
+                        help='Number of timed rounds per case')
+    parser.add_argument('--output',
+                        help='Write results as JSON to this file')
+    parser.add_argument('--compare',
+                        help='Compare results with a JSON baseline written by --output')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown that is reported as a regression')
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.rounds)
+    print(f'codec suite: corpus x {args.repeat}, best of {args.rounds} rounds')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not args.compare:
+        report(results)
+        return
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} case(s) regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
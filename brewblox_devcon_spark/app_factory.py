@@ -8,8 +8,10 @@ from fastapi.exceptions import RequestValidationError, ResponseValidationError
 from fastapi.responses import JSONResponse
 
 from . import (block_backup, broadcast, codec, command, connection,
-               datastore_blocks, datastore_settings, endpoints, mqtt,
-               spark_api, state_machine, synchronization, time_sync, utils)
+               datastore_blocks, datastore_settings, endpoints, exceptions,
+               mdns, mqtt, multi_controller, spark_api, state_machine,
+               synchronization, time_sync, utils)
+from .endpoints import http_controllers
 from .models import ErrorResponse
 
 LOGGER = logging.getLogger(__name__)
@@ -45,6 +47,10 @@ def add_exception_handlers(app: FastAPI):
         msg = str(ex)
         content = ErrorResponse(error=msg)
 
+        if isinstance(ex, exceptions.BatchException):
+            content.results = ex.results
+            content.errors = ex.errors
+
         if config.debug:
             content.traceback = traceback.format_exception(None, ex, ex.__traceback__)
 
@@ -84,22 +90,101 @@ def add_exception_handlers(app: FastAPI):
 
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
-    LOGGER.info(utils.get_config())
-    LOGGER.trace('ROUTES:\n' + pformat(app.routes))
-    LOGGER.trace('LOGGERS:\n' + pformat(logging.root.manager.loggerDict))
-
+async def controller_lifespan():
     async with AsyncExitStack() as stack:
-        await stack.enter_async_context(mqtt.lifespan())
         await stack.enter_async_context(datastore_settings.lifespan())
         await stack.enter_async_context(connection.lifespan())
         await stack.enter_async_context(synchronization.lifespan())
+        await stack.enter_async_context(spark_api.lifespan())
         await stack.enter_async_context(broadcast.lifespan())
         await stack.enter_async_context(time_sync.lifespan())
         await stack.enter_async_context(block_backup.lifespan())
         yield
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    LOGGER.info(utils.get_config())
+    LOGGER.trace('ROUTES:\n' + pformat(app.routes))
+    LOGGER.trace('LOGGERS:\n' + pformat(logging.root.manager.loggerDict))
+
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(mqtt.lifespan())
+        await stack.enter_async_context(mdns.lifespan())
+        await stack.enter_async_context(controller_lifespan())
+        yield
+
+
+@asynccontextmanager
+async def multi_lifespan(app: FastAPI):
+    LOGGER.info(utils.get_config())
+    LOGGER.trace('ROUTES:\n' + pformat(app.routes))
+
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(mqtt.lifespan())
+        await stack.enter_async_context(mdns.lifespan())
+        await stack.enter_async_context(multi_controller.lifespan(controller_lifespan))
+        yield
+
+
+def setup_controller():
+    """
+    Calls setup functions for all modules that are specific to a single controller.
+    """
+    state_machine.setup()
+    datastore_settings.setup()
+    datastore_blocks.setup()
+    connection.setup()
+    command.setup()
+    spark_api.setup()
+    block_backup.setup()
+    endpoints.setup()
+
+
+def create_controller_app() -> FastAPI:
+    """
+    Creates an app with the endpoints for a single controller in multi-controller mode.
+    The app is mounted at /{name}, and must be created in the controller context.
+    """
+    setup_controller()
+
+    app = FastAPI(docs_url='/api/doc',
+                  redoc_url='/api/redoc',
+                  openapi_url='/openapi.json')
+
+    add_exception_handlers(app)
+
+    for router in endpoints.routers:
+        app.include_router(router)
+
+    return app
+
+
+def create_multi_app() -> FastAPI:
+    config = utils.get_config()
+
+    # Shared by all controllers
+    mqtt.setup()
+    mdns.setup()
+    codec.setup()
+
+    multi_controller.setup(create_controller_app)
+
+    prefix = f'/{config.name}'
+    app = FastAPI(lifespan=multi_lifespan,
+                  docs_url=f'{prefix}/api/doc',
+                  redoc_url=f'{prefix}/api/redoc',
+                  openapi_url=f'{prefix}/openapi.json')
+
+    add_exception_handlers(app)
+    app.include_router(http_controllers.router, prefix=prefix)
+
+    for controller in multi_controller.CV.get():
+        app.mount(f'/{controller.config.name}', controller)
+
+    return app
+
+
 def create_app() -> FastAPI:
     config = utils.get_config()
     setup_logging(config.debug, config.trace)
@@ -112,17 +197,14 @@ def create_app() -> FastAPI:
         debugpy.listen(('0.0.0.0', 5678))
         LOGGER.info('Debugger is enabled and listening on 5678')
 
+    if config.controllers:
+        return create_multi_app()
+
     # Call setup functions for modules
     mqtt.setup()
-    state_machine.setup()
-    datastore_settings.setup()
-    datastore_blocks.setup()
+    mdns.setup()
     codec.setup()
-    connection.setup()
-    command.setup()
-    spark_api.setup()
-    block_backup.setup()
-    endpoints.setup()
+    setup_controller()
 
     # Create app
     # OpenApi endpoints are set to /api/doc for backwards compatibility
@@ -8,8 +8,9 @@ from contextlib import asynccontextmanager
 from contextvars import ContextVar
 from datetime import datetime, timedelta
 
-from . import exceptions, spark_api, state_machine, utils
-from .models import Backup, BackupApplyResult, BackupIdentity
+from . import command_scheduler, exceptions, spark_api, state_machine, utils
+from .models import (Backup, BackupApplyResult, BackupIdentity,
+                     CommandPriority)
 
 LOGGER = logging.getLogger(__name__)
 CV: ContextVar['BackupStorage'] = ContextVar('block_backup.BackupStorage')
@@ -67,7 +68,8 @@ class BackupStorage:
     async def run(self):
         if self.state.is_synchronized():
             dt = datetime.today().strftime('%Y-%m-%d')
-            await self.save(BackupIdentity(name=f'autosave_blocks_{self.config.name}_{dt}'))
+            with command_scheduler.priority(CommandPriority.MAINTENANCE):
+                await self.save(BackupIdentity(name=f'autosave_blocks_{self.config.name}_{dt}'))
 
     async def repeat(self):
         normal_interval = self.config.backup_interval
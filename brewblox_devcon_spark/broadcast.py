@@ -8,9 +8,10 @@ import logging
 from contextlib import asynccontextmanager
 from datetime import timedelta
 
-from . import mqtt, spark_api, state_machine, utils
+from . import command_scheduler, mqtt, spark_api, state_machine, utils
 from .block_analysis import calculate_claims, calculate_relations
-from .models import HistoryEvent, ServiceStateEvent, ServiceStateEventData
+from .models import (CommandPriority, HistoryEvent, ServiceStateEvent,
+                     ServiceStateEventData)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -31,8 +32,9 @@ class Broadcaster:
 
         try:
             if state.is_synchronized():
-                blocks = await self.api.read_all_blocks()
-                logged_blocks = await self.api.read_all_logged_blocks()
+                with command_scheduler.priority(CommandPriority.BROADCAST):
+                    blocks = await self.api.read_all_blocks()
+                    logged_blocks = await self.api.read_all_logged_blocks()
 
                 # Convert list to key/value format suitable for history
                 history_data = {block.id: block.data
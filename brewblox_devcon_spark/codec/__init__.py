@@ -11,7 +11,8 @@ from google.protobuf import json_format
 from .. import exceptions, utils
 from ..models import (DecodedPayload, EncodedPayload, IntermediateRequest,
                       IntermediateResponse, ReadMode)
-from . import lookup, pb2, time_utils, unit_conversion
+from . import lookup, pb2, time_utils, transcoding, unit_conversion
+from .cache import DecodedPayloadCache
 from .processor import ProtobufProcessor
 
 UNKNOWN_TYPE_STR = 'UnknownType'
@@ -22,13 +23,28 @@ CV: ContextVar['Codec'] = ContextVar('codec.Codec')
 
 
 class Codec:
-    def __init__(self, filter_values=True):
+    def __init__(self,
+                 filter_values=True,
+                 direct_encode: bool = ...,
+                 direct_decode: bool = ...,
+                 cache_size: int = ...):
+        config = utils.get_config()
         self._processor = ProtobufProcessor(filter_values)
+        self._direct_encode: bool = utils.not_sentinel(direct_encode,
+                                                       config.codec_direct_encode)
+        self._direct_decode: bool = utils.not_sentinel(direct_decode,
+                                                       config.codec_direct_decode)
+        self.cache = DecodedPayloadCache(unit_conversion.CV.get(),
+                                         utils.not_sentinel(cache_size,
+                                                            config.codec_cache_size))
 
     def encode_request(self, request: IntermediateRequest) -> str:
         try:
-            message = pb2.command_pb2.Request()
-            json_format.ParseDict(request.model_dump(mode='json'), message)
+            if self._direct_encode:
+                message = transcoding.encode_request(request)
+            else:
+                message = pb2.command_pb2.Request()
+                json_format.ParseDict(request.model_dump(mode='json'), message)
             return b64encode(message.SerializeToString()).decode()
 
         except Exception as ex:
@@ -42,6 +58,10 @@ class Codec:
 
             message = pb2.command_pb2.Request()
             message.ParseFromString(data)
+
+            if self._direct_decode:
+                return transcoding.decode_request(message)
+
             decoded: dict = json_format.MessageToDict(
                 message=message,
                 preserving_proto_field_name=True,
@@ -58,8 +78,11 @@ class Codec:
 
     def encode_response(self, response: IntermediateResponse) -> str:
         try:
-            message = pb2.command_pb2.Response()
-            json_format.ParseDict(response.model_dump(mode='json'), message)
+            if self._direct_encode:
+                message = transcoding.encode_response(response)
+            else:
+                message = pb2.command_pb2.Response()
+                json_format.ParseDict(response.model_dump(mode='json'), message)
             return b64encode(message.SerializeToString()).decode()
 
         except Exception as ex:
@@ -73,6 +96,10 @@ class Codec:
 
             message = pb2.command_pb2.Response()
             message.ParseFromString(data)
+
+            if self._direct_decode:
+                return transcoding.decode_response(message)
+
             decoded: dict = json_format.MessageToDict(
                 message=message,
                 preserving_proto_field_name=True,
@@ -118,10 +145,11 @@ class Codec:
                     content=payload.content['bytes'],
                 )
 
+            registry = lookup.CV.get()
+
             # Interface-only payload
             if payload.content is None:
-                impl = next((v for v in lookup.CV_COMBINED.get()  # pragma: no branch
-                             if v.type_int == block_type_value))
+                impl = registry.find_combined(block_type_value)
                 return EncodedPayload(
                     blockId=payload.blockId,
                     blockType=impl.type_int,
@@ -129,19 +157,27 @@ class Codec:
                 )
 
             # Payload contains data
-            try:
-                impl = next((v for v in lookup.CV_OBJECTS.get()  # pragma: no branch
-                            if v.type_int == block_type_value))
-            except StopIteration:
+            impl = registry.find_object(block_type_value)
+
+            if not impl:
                 msg = f'No codec entry found for {payload.blockType}'
-                LOGGER.debug(msg, exc_info=True)
+                LOGGER.debug(msg)
                 raise exceptions.EncodeException(msg)
 
             message = impl.message_cls()
-            payload = self._processor.pre_encode(message.DESCRIPTOR,
-                                                 payload.model_copy(deep=True),
-                                                 filter_values=filter_values)
-            json_format.ParseDict(payload.content, message)
+
+            # The direct encoder converts payload content without copying it
+            if self._direct_encode:
+                mask_fields = self._processor.encode_message(payload,
+                                                             message,
+                                                             filter_values=filter_values)
+            else:
+                payload = self._processor.pre_encode(message.DESCRIPTOR,
+                                                     payload.model_copy(deep=True),
+                                                     filter_values=filter_values)
+                json_format.ParseDict(payload.content, message)
+                mask_fields = payload.maskFields
+
             content: str = b64encode(message.SerializeToString()).decode()
 
             return EncodedPayload(
@@ -150,7 +186,7 @@ class Codec:
                 name=payload.name,
                 content=content,
                 maskMode=payload.maskMode,
-                maskFields=payload.maskFields
+                maskFields=mask_fields
             )
 
         except exceptions.EncodeException:
@@ -166,6 +202,23 @@ class Codec:
                        mode: ReadMode = ReadMode.DEFAULT,
                        filter_values: bool | None = None,
                        ) -> DecodedPayload:
+        if not self.cache.enabled:
+            return self._decode_payload(payload, mode, filter_values)
+
+        key = self.cache.key(payload, mode, filter_values)
+        decoded = self.cache.get(key)
+
+        if decoded is None:
+            decoded = self._decode_payload(payload, mode, filter_values)
+            self.cache.put(key, decoded)
+
+        return decoded
+
+    def _decode_payload(self,
+                        payload: EncodedPayload,
+                        mode: ReadMode,
+                        filter_values: bool | None,
+                        ) -> DecodedPayload:
         try:
             if payload.blockType == lookup.BlockType.Value('Deprecated'):
                 return DecodedPayload(
@@ -175,36 +228,43 @@ class Codec:
                     content={'bytes': payload.content},
                 )
 
+            registry = lookup.CV.get()
+
             # First, try to find an object lookup
-            impl = next((v for v in lookup.CV_OBJECTS.get()
-                         if payload.blockType in [v.type_str, v.type_int]), None)
+            impl = registry.find_object(payload.blockType)
 
             if impl:
                 # We have an object lookup, and can decode the content
                 message = impl.message_cls()
                 message.ParseFromString(b64decode(payload.content))
-                content: dict = json_format.MessageToDict(
-                    message=message,
-                    preserving_proto_field_name=True,
-                    including_default_value_fields=True,
-                    use_integers_for_enums=(mode in (ReadMode.STORED, ReadMode.LOGGED)),
-                )
                 decoded = DecodedPayload(
                     blockId=payload.blockId,
                     blockType=impl.type_str,
                     name=payload.name,
-                    content=content,
                     maskMode=payload.maskMode,
                     maskFields=payload.maskFields
                 )
+
+                # The direct decoder converts and post-processes in a single pass
+                if self._direct_decode:
+                    return self._processor.decode_message(message,
+                                                          decoded,
+                                                          mode=mode,
+                                                          filter_values=filter_values)
+
+                decoded.content = json_format.MessageToDict(
+                    message=message,
+                    preserving_proto_field_name=True,
+                    including_default_value_fields=True,
+                    use_integers_for_enums=(mode in (ReadMode.STORED, ReadMode.LOGGED)),
+                )
                 return self._processor.post_decode(message.DESCRIPTOR,
                                                    decoded,
                                                    mode=mode,
                                                    filter_values=filter_values)
 
             # No object lookup found. Try the interfaces.
-            intf_impl = next((v for v in lookup.CV_INTERFACES.get()
-                              if payload.blockType in [v.type_str, v.type_int]), None)
+            intf_impl = registry.find_interface(payload.blockType)
 
             if intf_impl:
                 return DecodedPayload(
@@ -0,0 +1,127 @@
+"""
+Memoization of decoded payloads
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Hashable
+
+from ..models import (CodecCacheStats, DecodedPayload, EncodedPayload,
+                      ReadMode)
+from .unit_conversion import UnitConverter
+
+
+def copy_content(value):
+    """
+    Copies nested dicts and lists in decoded content.
+    Scalar values are immutable, and are shared between copies.
+    """
+    if isinstance(value, dict):
+        return {k: copy_content(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_content(v) for v in value]
+    return value
+
+
+def copy_payload(payload: DecodedPayload) -> DecodedPayload:
+    return payload.model_copy(update={
+        'maskFields': list(payload.maskFields),
+        'content': copy_content(payload.content),
+    })
+
+
+class DecodedPayloadCache:
+    """
+    Bounded LRU cache of decoded payloads.
+
+    Controllers repeatedly send identical content for blocks that did not change.
+    Decoded payloads are keyed by a digest of the encoded content,
+    combined with all arguments that affect the decoded output.
+
+    Cached payloads are copied when stored and when returned,
+    so callers are free to modify them.
+
+    The cache is cleared when the user temperature unit changes.
+    """
+
+    def __init__(self, converter: UnitConverter, maxsize: int):
+        self._converter = converter
+        self._maxsize = maxsize
+        self._entries: OrderedDict[Hashable, DecodedPayload] = OrderedDict()
+        self._temperature = converter.temperature
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self._maxsize > 0
+
+    def key(self,
+            payload: EncodedPayload,
+            mode: ReadMode,
+            filter_values: bool | None,
+            ) -> Hashable:
+        """
+        Returns the cache key for decoding `payload` with given arguments.
+        If the user temperature unit changed, the cache is cleared.
+        """
+        temperature = self._converter.temperature
+        if temperature != self._temperature:
+            self.clear()
+            self._temperature = temperature
+
+        return (
+            payload.blockType,
+            payload.blockId,
+            payload.name,
+            blake2b(payload.content.encode(), digest_size=16).digest(),
+            payload.maskMode,
+            tuple(tuple(f.address) for f in payload.maskFields),
+            mode,
+            filter_values,
+            temperature,
+        )
+
+    def get(self, key: Hashable) -> DecodedPayload | None:
+        """
+        Returns a copy of the cached payload, or None if not found.
+        """
+        try:
+            cached = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return copy_payload(cached)
+
+    def put(self, key: Hashable, payload: DecodedPayload):
+        """
+        Stores a copy of `payload`.
+        The least recently used entry is evicted if the cache is full.
+        """
+        if not self.enabled:
+            return
+
+        self._entries[key] = copy_payload(payload)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> CodecCacheStats:
+        total = self.hits + self.misses
+        return CodecCacheStats(
+            size=len(self._entries),
+            maxsize=self._maxsize,
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=self.hits / total if total else 0,
+        )
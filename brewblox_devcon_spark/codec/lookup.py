@@ -11,7 +11,7 @@ from google.protobuf.descriptor import Descriptor, FileDescriptor
 from google.protobuf.internal.enum_type_wrapper import EnumTypeWrapper
 from google.protobuf.message import Message
 
-from . import pb2
+from . import pb2, processor
 
 BlockType: EnumTypeWrapper = pb2.brewblox_pb2.BlockType
 
@@ -19,10 +19,11 @@ BlockType: EnumTypeWrapper = pb2.brewblox_pb2.BlockType
 # They will not be associated with actual messages
 BLOCK_INTERFACE_TYPE_END = 255
 
+# Custom test objects are not declared in the BlockType enum
+EDGE_CASE_TYPE_STR = 'EdgeCase'
+EDGE_CASE_TYPE_INT = 9001
 
-CV_OBJECTS: ContextVar[list['ObjectLookup']] = ContextVar('lookup.objects')
-CV_INTERFACES: ContextVar[list['InterfaceLookup']] = ContextVar('lookup.interfaces')
-CV_COMBINED: ContextVar[list['InterfaceLookup']] = ContextVar('lookup.combined')
+CV: ContextVar['TypeRegistry'] = ContextVar('lookup.TypeRegistry')
 
 
 @dataclass(frozen=True)
@@ -47,50 +48,151 @@ def _interface_lookup_generator() -> Generator[InterfaceLookup, None, None]:
             )
 
 
-def _object_lookup_generator() -> Generator[ObjectLookup, None, None]:
-    for pb_module in [getattr(pb2, k) for k in pb2.__all__]:
-        file_desc: FileDescriptor = pb_module.DESCRIPTOR
-        messages: dict[str, Descriptor] = file_desc.message_types_by_name
+def _object_lookup_generator(module_name: str) -> Generator[ObjectLookup, None, None]:
+    pb_module = getattr(pb2, module_name)
+    file_desc: FileDescriptor = pb_module.DESCRIPTOR
+    messages: dict[str, Descriptor] = file_desc.message_types_by_name
 
-        for msg_name, msg_desc in messages.items():
-            msg_cls: Message = getattr(pb_module, msg_name)
-            opts = msg_desc.GetOptions().Extensions[pb2.brewblox_pb2.msg]
-            if opts.objtype:
-                yield ObjectLookup(
-                    type_str=BlockType.Name(opts.objtype),
-                    type_int=opts.objtype,
-                    message_cls=msg_cls,
-                )
+    for msg_name, msg_desc in messages.items():
+        msg_cls: Message = getattr(pb_module, msg_name)
+        opts = msg_desc.GetOptions().Extensions[pb2.brewblox_pb2.msg]
+        if opts.objtype:
+            yield ObjectLookup(
+                type_str=BlockType.Name(opts.objtype),
+                type_int=opts.objtype,
+                message_cls=msg_cls,
+            )
+
+    # Custom test objects
+    if module_name == 'EdgeCase_pb2':
+        yield ObjectLookup(
+            type_str=EDGE_CASE_TYPE_STR,
+            type_int=EDGE_CASE_TYPE_INT,
+            message_cls=pb_module.Block,
+        )
+
+
+class TypeRegistry:
+    """
+    Index of block types and their protobuf messages.
+
+    All lookups are indexed by both type name and type int.
+
+    Protobuf modules are imported when their messages are first requested.
+    Field plans for their messages are compiled on import.
+    By convention, the message for block type `Name` is declared in `Name_pb2`.
+    If the convention does not apply, all modules are imported and indexed.
+    """
+
+    def __init__(self):
+        self._objects: dict[str | int, ObjectLookup] = {}
+        self._interfaces: dict[str | int, InterfaceLookup] = {}
+        self._loaded_modules: set[str] = set()
+        self._complete = False
+
+        interfaces = [
+            *_interface_lookup_generator(),
+
+            # Custom test objects
+            InterfaceLookup(
+                type_str=EDGE_CASE_TYPE_STR,
+                type_int=EDGE_CASE_TYPE_INT,
+            ),
+        ]
+
+        for intf in interfaces:
+            self._interfaces[intf.type_str] = intf
+            self._interfaces[intf.type_int] = intf
+
+    def _load_module(self, module_name: str):
+        if module_name in self._loaded_modules:
+            return
+
+        self._loaded_modules.add(module_name)
+        objects = list(_object_lookup_generator(module_name))
+
+        for obj in objects:
+            self._objects.setdefault(obj.type_str, obj)
+            self._objects.setdefault(obj.type_int, obj)
+
+        processor.warm_field_plans(obj.message_cls.DESCRIPTOR for obj in objects)
+
+    def _candidate_modules(self, block_type: str | int) -> list[str]:
+        if isinstance(block_type, int):
+            intf = self._interfaces.get(block_type)
+            try:
+                block_type = intf.type_str if intf else BlockType.Name(block_type)
+            except ValueError:
+                return []
+
+        candidates = [
+            f'{block_type}_pb2',
+            f'{block_type.removeprefix("Deprecated_")}_pb2',
+        ]
+        return [v for v in candidates if v in pb2.__all__]
+
+    def load_all(self):
+        """
+        Imports and indexes all protobuf modules.
+        """
+        if not self._complete:
+            for module_name in pb2.__all__:
+                self._load_module(module_name)
+            self._complete = True
+
+    def find_object(self, block_type: str | int) -> ObjectLookup | None:
+        """
+        Returns the object lookup for given type name or type int.
+        Returns None if the type is unknown or interface-only.
+        """
+        try:
+            return self._objects[block_type]
+        except KeyError:
+            pass
+
+        if self._complete:
+            return None
+
+        intf = self._interfaces.get(block_type)
+        if intf and intf.type_int <= BLOCK_INTERFACE_TYPE_END:
+            return None
+
+        for module_name in self._candidate_modules(block_type):
+            self._load_module(module_name)
+
+        if block_type not in self._objects:
+            self.load_all()
+
+        return self._objects.get(block_type)
+
+    def find_interface(self, block_type: str | int) -> InterfaceLookup | None:
+        """
+        Returns the interface lookup for given type name or type int.
+        Returns None if the type is not an interface.
+        """
+        return self._interfaces.get(block_type)
+
+    def find_combined(self, block_type: str | int) -> ObjectLookup | InterfaceLookup | None:
+        """
+        Returns the object lookup for given type name or type int.
+        If no object lookup exists, the interface lookup is returned instead.
+        """
+        return self.find_object(block_type) or self.find_interface(block_type)
+
+    def objects(self) -> list[ObjectLookup]:
+        """
+        Returns all object lookups.
+        This imports all protobuf modules.
+        """
+        self.load_all()
+        return list({id(v): v for v in self._objects.values()}.values())
+
+    def interfaces(self) -> list[InterfaceLookup]:
+        """
+        Returns all interface lookups.
+        """
+        return list({id(v): v for v in self._interfaces.values()}.values())
 
 
 def setup():
-    objects: list[ObjectLookup] = [
-        # Actual objects
-        *_object_lookup_generator(),
-
-        # Custom test objects
-        ObjectLookup(
-            type_str='EdgeCase',
-            type_int=9001,
-            message_cls=pb2.EdgeCase_pb2.Block,
-        ),
-    ]
-
-    interfaces: list[InterfaceLookup] = [
-        *_interface_lookup_generator(),
-
-        # Custom test objects
-        InterfaceLookup(
-            type_str='EdgeCase',
-            type_int=9001,
-        ),
-    ]
-
-    combined: list[InterfaceLookup] = [
-        *objects,
-        *interfaces,
-    ]
-
-    CV_OBJECTS.set(objects)
-    CV_INTERFACES.set(interfaces)
-    CV_COMBINED.set(combined)
+    CV.set(TypeRegistry())
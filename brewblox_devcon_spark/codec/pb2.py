@@ -1,52 +1,24 @@
 """
-Imports all auto-generated pb_2.py files
+Lazily imports auto-generated pb_2.py files
+
+Modules are imported when first accessed as attribute of this module.
+Example: `pb2.Pid_pb2` or `from .pb2 import Pid_pb2`.
 """
 
+import importlib
 import sys
 from pathlib import Path
+from types import ModuleType
 
 # Proto files must be imported as an absolute path
 # For this to happen without polluting the repo root directory, we have to extend sys.path
-# The import is done inside the if statement to avoid autopep8 / isort interfering
-if 'brewblox_pb2' not in sys.modules:  # pragma: no cover
-    sys.path.append(f'{Path(__file__).parent.resolve()}/proto-compiled/')
+PROTO_DIR = f'{Path(__file__).parent.resolve()}/proto-compiled/'
 
-    import ActuatorAnalogMock_pb2
-    import ActuatorLogic_pb2
-    import ActuatorOffset_pb2
-    import ActuatorPwm_pb2
-    import AnalogGpioModule_pb2
-    import Balancer_pb2
-    import brewblox_pb2
-    import command_pb2
-    import DigitalActuator_pb2
-    import DigitalInput_pb2
-    import DisplaySettings_pb2
-    import DS2408_pb2
-    import DS2413_pb2
-    import EdgeCase_pb2
-    import FastPwm_pb2
-    import GpioModule_pb2
-    import MockPins_pb2
-    import MotorValve_pb2
-    import Mutex_pb2
-    import Pid_pb2
-    import Screen_pb2
-    import Sequence_pb2
-    import SetpointProfile_pb2
-    import SetpointSensorPair_pb2
-    import Spark2Pins_pb2
-    import Spark3Pins_pb2
-    import SysInfo_pb2
-    import TempSensorAnalog_pb2
-    import TempSensorCombi_pb2
-    import TempSensorExternal_pb2
-    import TempSensorMock_pb2
-    import TempSensorOneWire_pb2
-    import Variables_pb2
-    import WiFiSettings_pb2
+if PROTO_DIR not in sys.path:  # pragma: no cover
+    sys.path.append(PROTO_DIR)
 
-__all__ = [
+# Names are resolved by __getattr__()
+__all__ = [  # noqa: F822
     'ActuatorAnalogMock_pb2',
     'ActuatorLogic_pb2',
     'ActuatorOffset_pb2',
@@ -82,3 +54,12 @@ __all__ = [
     'Variables_pb2',
     'WiFiSettings_pb2',
 ]
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name not in __all__:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    module = importlib.import_module(name)
+    globals()[name] = module
+    return module
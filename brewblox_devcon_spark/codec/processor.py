@@ -4,16 +4,19 @@ Input/output modification functions for transcoding
 
 import ipaddress
 import logging
+import math
 import re
 from base64 import b64decode, b64encode
 from binascii import hexlify, unhexlify
 from dataclasses import dataclass
-from functools import reduce
+from functools import lru_cache, reduce
 from socket import htonl, ntohl
-from typing import Any, Iterator
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
 
 from google.protobuf import json_format
 from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.internal import type_checkers
+from google.protobuf.message import Message
 
 from brewblox_devcon_spark.models import (DecodedPayload, MaskField, MaskMode,
                                           ReadMode)
@@ -25,12 +28,251 @@ from .time_utils import serialize_datetime
 
 LOGGER = logging.getLogger(__name__)
 
+_SYMBOLS = re.escape('[]<>')
+_POSTFIX_PATTERN = re.compile(''.join([
+    f'([^{_SYMBOLS}]+)',     # "value" -> captured
+    f'[{_SYMBOLS}]?',        # "["
+    f'([^{_SYMBOLS},]*)',    # "degC" -> captured
+    f',?[^{_SYMBOLS}]*',     # ",driven" -> (backwards compatibility)
+    f'[{_SYMBOLS}]?',        # "]"
+]))
+
+# Field plans are derived from protobuf descriptors.
+# Descriptors are immutable, so plans can be shared between processors.
+_FIELD_PLANS: dict[Descriptor, dict[str, 'FieldPlan']] = {}
+
 
 @dataclass(frozen=True)
-class OptionElement():
+class FieldPlan():
+    """
+    Precompiled codec metadata for a single protobuf field.
+
+    Resolving Brewblox field options and enum names is relatively expensive.
+    Plans are compiled once per message descriptor,
+    and are then reused for every encoded or decoded payload.
+    """
+
     field: FieldDescriptor
     """The protobuf field descriptor"""
 
+    name: str
+    """The protobuf field name"""
+
+    number: int
+    """The protobuf field tag"""
+
+    options: brewblox_pb2.FieldOpts
+    """The Brewblox field options"""
+
+    unit_type: str
+    """The system unit type name. Example: 'DeltaCelsius'"""
+
+    link_type: str
+    """The block type name for links. Example: 'TempSensorInterface'"""
+
+    message_type: Descriptor | None
+    """The descriptor for nested messages.
+
+    For map fields, this is the descriptor of the map value.
+    """
+
+    repeated: bool
+    """Whether the field is a list or map field"""
+
+    is_map: bool
+    """Whether the field is a map field"""
+
+    is_int: bool
+    """Whether numeric values must be rounded to int before encoding"""
+
+    has_presence: bool
+    """Whether the field is only included in decoded content if set.
+
+    This is true for singular submessages and oneof fields.
+    """
+
+    map_value: FieldDescriptor | None
+    """The field descriptor for map values"""
+
+
+@lru_cache(maxsize=4096)
+def split_postfix(key: str) -> tuple[str, str]:
+    """
+    Splits a (postfixed) key into its field name and postfix.
+
+    Example: 'value[degC]' -> ('value', 'degC')
+    """
+    return _POSTFIX_PATTERN.findall(key)[0]
+
+
+def _compile_field_plan(field: FieldDescriptor) -> FieldPlan:
+    options: brewblox_pb2.FieldOpts = field.GetOptions().Extensions[brewblox_pb2.field]
+    repeated = field.label == FieldDescriptor.LABEL_REPEATED
+    is_map = bool(repeated
+                  and field.message_type
+                  and field.message_type.GetOptions().map_entry)
+
+    if is_map:
+        map_value = field.message_type.fields_by_name['value']
+        message_type = map_value.message_type
+    else:
+        map_value = None
+        message_type = field.message_type
+
+    return FieldPlan(
+        field=field,
+        name=field.name,
+        number=field.number,
+        options=options,
+        unit_type=brewblox_pb2.UnitType.Name(options.unit),
+        link_type=brewblox_pb2.BlockType.Name(options.objtype),
+        message_type=message_type,
+        repeated=repeated,
+        is_map=is_map,
+        is_int=field.cpp_type in json_format._INT_TYPES,
+        has_presence=not repeated and bool(field.message_type or field.containing_oneof),
+        map_value=map_value,
+    )
+
+
+def _json_map_key(key: Any) -> str:
+    if isinstance(key, bool):
+        return 'true' if key else 'false'
+    return str(key)
+
+
+def _json_scalar(field: FieldDescriptor,
+                 value: Any,
+                 enums_as_int: bool) -> Any:
+    """
+    Converts a scalar protobuf value to its JSON representation.
+    This matches the output of `json_format.MessageToDict()`.
+    """
+    cpp_type = field.cpp_type
+
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        if enums_as_int:
+            return value
+        enum_value = field.enum_type.values_by_number.get(value)
+        return enum_value.name if enum_value is not None else value
+
+    if cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        if field.type == FieldDescriptor.TYPE_BYTES:
+            return b64encode(value).decode('utf-8')
+        return value
+
+    if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return bool(value)
+
+    if cpp_type in json_format._INT64_TYPES:
+        return str(value)
+
+    if cpp_type in json_format._FLOAT_TYPES:
+        if math.isinf(value):
+            return '-Infinity' if value < 0 else 'Infinity'
+        if math.isnan(value):
+            return 'NaN'
+        if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+            return type_checkers.ToShortestFloat(value)
+
+    return value
+
+
+def field_plans(desc: Descriptor) -> dict[str, FieldPlan]:
+    """
+    Returns the field plans for all fields in `desc`, indexed by field name.
+    Plans are compiled on first use.
+    """
+    try:
+        return _FIELD_PLANS[desc]
+    except KeyError:
+        plans = {field.name: _compile_field_plan(field)
+                 for field in desc.fields}
+        _FIELD_PLANS[desc] = plans
+        return plans
+
+
+def warm_field_plans(descriptors: Iterable[Descriptor]):
+    """
+    Compiles field plans for all given descriptors, and their nested messages.
+    """
+    pending = list(descriptors)
+    while pending:
+        desc = pending.pop()
+        if desc in _FIELD_PLANS:
+            continue
+        pending.extend(plan.message_type
+                       for plan in field_plans(desc).values()
+                       if plan.message_type)
+
+
+class MaskTrie():
+    """
+    Prefix trie of mask field addresses.
+
+    An address matches the trie if it matches any inserted address,
+    using the same rules as `ProtobufProcessor.matches_address()`:
+    - A None tag in a mask address is a wildcard, and matches any tag.
+    - A mask address matches all addresses nested inside it.
+    - A mask address matches all parents of the address.
+
+    Matching an address takes a single descent,
+    regardless of the number of mask fields.
+    """
+    __slots__ = ('children', 'terminal')
+
+    def __init__(self, fields: Iterable[MaskField] = ()):
+        self.children: dict[int | None, MaskTrie] = {}
+        self.terminal = False
+
+        for field in fields:
+            self.insert(field.address)
+
+    def insert(self, address: Iterable[int | None]) -> bool:
+        """
+        Adds `address` to the trie.
+        Returns False if the exact address was already present.
+        """
+        node = self
+        for tag in address:
+            child = node.children.get(tag)
+            if child is None:
+                child = node.children[tag] = MaskTrie()
+            node = child
+
+        if node.terminal:
+            return False
+
+        node.terminal = True
+        return True
+
+    def matches(self, address: tuple[int | None], idx: int = 0) -> bool:
+        """
+        Returns whether any inserted mask address matches `address`.
+        """
+        if self.terminal:
+            return True
+
+        if idx == len(address):
+            return bool(self.children)
+
+        wildcard = self.children.get(None)
+        if wildcard is not None and wildcard.matches(address, idx + 1):
+            return True
+
+        tag = address[idx]
+        if tag is not None:
+            child = self.children.get(tag)
+            if child is not None and child.matches(address, idx + 1):
+                return True
+
+        return False
+
+
+class OptionElement(NamedTuple):
+    plan: FieldPlan
+    """The precompiled field metadata"""
+
     obj: dict
     """The raw data in python format"""
 
@@ -85,22 +327,20 @@ class OptionElement():
     """
 
 
+def _field_parse_error(plan: FieldPlan, ex: json_format.ParseError) -> json_format.ParseError:
+    # Oneof field errors are not prefixed by json_format.ParseDict()
+    if plan.field.containing_oneof is None:
+        return json_format.ParseError(f'Failed to parse {plan.name} field: {ex}.')
+    else:
+        return json_format.ParseError(str(ex))
+
+
 class ProtobufProcessor():
-    _BREWBLOX_PROVIDER: FieldDescriptor = brewblox_pb2.field
 
     def __init__(self, filter_values=True):
         self._converter = unit_conversion.CV.get()
         self._filter_values = filter_values
 
-        symbols = re.escape('[]<>')
-        self._postfix_pattern = re.compile(''.join([
-            f'([^{symbols}]+)',     # "value" -> captured
-            f'[{symbols}]?',        # "["
-            f'([^{symbols},]*)',    # "degC" -> captured
-            f',?[^{symbols}]*',     # ",driven" -> (backwards compatibility)
-            f'[{symbols}]?',        # "]"
-        ]))
-
     @staticmethod
     def hex_to_int(s: str) -> int:
         return int.from_bytes(unhexlify(s), 'little')
@@ -142,14 +382,6 @@ class ProtobufProcessor():
                 return False
         return True
 
-    @staticmethod
-    def unit_name(unit_num: int) -> str:
-        return brewblox_pb2.UnitType.Name(unit_num)
-
-    @staticmethod
-    def type_name(blockType_num: int) -> str:
-        return brewblox_pb2.BlockType.Name(blockType_num)
-
     def _walk_elements(self,
                        desc: Descriptor,
                        obj: dict,
@@ -162,61 +394,59 @@ class ProtobufProcessor():
         This makes it safe for calling code to modify or delete the value relevant to them.
         Any entries added to the parent object after an element is yielded will not be considered.
         """
+        plans = field_plans(desc)
+
         for key, value in list(obj.items()):
-            base_key, postfix = self._postfix_pattern.findall(key)[0]
-            field: FieldDescriptor = desc.fields_by_name[base_key]
-            address: tuple[int | None] = (*parent_address, field.number)
+            base_key, postfix = split_postfix(key)
+            plan = plans[base_key]
+            address: tuple[int | None] = (*parent_address, plan.number)
 
             # Value field, no need for recursion
             # This is a leaf node
             # obj is { key: ... }
-            if not field.message_type:
-                yield OptionElement(field, obj, key, base_key, postfix, address)
+            if not plan.message_type and not plan.is_map:
+                yield OptionElement(plan, obj, key, base_key, postfix, address)
 
             # Explicitly deleted submessage field
             # Stop recursion
             # obj is { key: None }
             # Because we stop here, this field is a leaf node
             elif value is None:
-                yield OptionElement(field, obj, key, base_key, postfix, address)
+                yield OptionElement(plan, obj, key, base_key, postfix, address)
 
             # Repeated fields are generic collections, expressed in json as list or dict
             # Because the list/map index is not a tag, we can't patch inside the repeated field
             # The repeated field itself is a leaf node
-            elif field.label == FieldDescriptor.LABEL_REPEATED:
+            elif plan.repeated:
 
                 # map<K, V> field
                 # traverse all values
                 # The content is serialized as repeated `{ key: K, value: V }` entries
                 # obj is { key: {...} }
                 if isinstance(value, dict):
-                    message_type = field.message_type.fields_by_name['value'].message_type
                     for childobj in value.values():
-                        yield from self._walk_elements(message_type, childobj, (*address, None))
+                        yield from self._walk_elements(plan.message_type, childobj, (*address, None))
 
                 # Generic repeated field
                 # traverse all values
                 # obj is { key: [{...},{...}] }
                 else:
                     for childobj in value:
-                        yield from self._walk_elements(field.message_type, childobj, (*address, None))
+                        yield from self._walk_elements(plan.message_type, childobj, (*address, None))
 
-                yield OptionElement(field, obj, key, base_key, postfix, address)
+                yield OptionElement(plan, obj, key, base_key, postfix, address)
 
             # Submessage with content
             # traverse all members
             # obj is { key: {...} }
             # The field itself is not a leaf node
             else:
-                yield from self._walk_elements(field.message_type, value, address)
+                yield from self._walk_elements(plan.message_type, value, address)
                 # This is not a leaf node. Its address should not be included in the mask
-                yield OptionElement(field, obj, key, base_key, postfix, (*address, None))
+                yield OptionElement(plan, obj, key, base_key, postfix, (*address, None))
 
         return
 
-    def _field_options(self, field: FieldDescriptor) -> brewblox_pb2.FieldOpts:
-        return field.GetOptions().Extensions[self._BREWBLOX_PROVIDER]
-
     def _encode_unit(self, value: float | dict, unit_type: str, postfix: str | None) -> float:
         if isinstance(value, dict):
             user_value = value['value']
@@ -295,8 +525,11 @@ class ProtobufProcessor():
         if filter_values is None:
             filter_values = self._filter_values
 
+        mask = MaskTrie(payload.maskFields)
+
         for element in self._walk_elements(desc, payload.content):
-            options = self._field_options(element.field)
+            plan = element.plan
+            options = plan.options
 
             if options.ignored:
                 del element.obj[element.key]
@@ -309,38 +542,12 @@ class ProtobufProcessor():
             # We don't support exclusive masks at this level
             # List items are not supported for patching
             # Only insert a field mask for the `repeated` field itself, not its children
-            if payload.maskMode == MaskMode.INCLUSIVE and None not in element.address:
+            # Duplicate addresses are only inserted once
+            if payload.maskMode == MaskMode.INCLUSIVE \
+                    and None not in element.address \
+                    and mask.insert(element.address):
                 payload.maskFields.append(MaskField(address=list(element.address)))
 
-            def _convert_value(value: Any) -> str | int | float:
-                if options.unit:
-                    unit_name = self.unit_name(options.unit)
-                    value = self._encode_unit(value, unit_name, element.postfix or None)
-
-                if options.objtype:
-                    if isinstance(value, dict):
-                        value = value['id']
-
-                if options.scale:
-                    value *= options.scale
-
-                if options.hexed:
-                    value = self.hex_to_int(value)
-
-                if options.hexstr:
-                    value = self.hex_to_b64(value)
-
-                if options.ipv4address:
-                    value = self.ipv4_to_int(value)
-
-                if options.datetime:
-                    value = serialize_datetime(value, DateFormatOpt.SECONDS)
-
-                if element.field.cpp_type in json_format._INT_TYPES:
-                    value = int(round(value))
-
-                return value
-
             new_key = element.base_key
             new_value = element.obj[element.key]
 
@@ -349,11 +556,11 @@ class ProtobufProcessor():
                 continue
 
             if isinstance(new_value, (list, set)):
-                new_value = [_convert_value(v)
+                new_value = [self._encode_value(plan, v, element.postfix)
                              for v in new_value
                              if v is not None]
             else:
-                new_value = _convert_value(new_value)
+                new_value = self._encode_value(plan, new_value, element.postfix)
 
             # The key changed if postfixed metadata was used
             if element.key != new_key:
@@ -363,6 +570,206 @@ class ProtobufProcessor():
 
         return payload
 
+    def encode_message(self,
+                       payload: DecodedPayload,
+                       message: Message, /,
+                       filter_values: bool | None = None,
+                       ) -> list[MaskField]:
+        """
+        Converts payload content directly to protobuf message fields.
+
+        The result is identical to calling `pre_encode()` on a copy of the payload,
+        and then converting the modified content with `json_format.ParseDict()`.
+        Payload content is only read, and is not copied or modified.
+
+        Returns the payload mask fields.
+        If the payload uses an inclusive mask, the addresses of all set fields are appended.
+        """
+        if filter_values is None:
+            filter_values = self._filter_values
+
+        mask_fields = list(payload.maskFields)
+        mask = MaskTrie(mask_fields)
+
+        # Duplicate addresses are only inserted once
+        def add_mask(address: tuple[int]):
+            if mask.insert(address):
+                mask_fields.append(MaskField(address=list(address)))
+
+        self._encode_fields(message,
+                            payload.content,
+                            message.DESCRIPTOR.name,
+                            (),
+                            add_mask if payload.maskMode == MaskMode.INCLUSIVE else None,
+                            filter_values)
+        return mask_fields
+
+    def _encode_fields(self,
+                       message: Message,
+                       obj: dict,
+                       path: str,
+                       parent_address: tuple[int | None],
+                       add_mask: Callable[[tuple[int]], None] | None,
+                       filter_values: bool):
+        plans = field_plans(message.DESCRIPTOR)
+        oneofs: dict[str, str] = {}
+
+        for key, value in obj.items():
+            base_key, postfix = split_postfix(key)
+            plan = plans[base_key]
+            options = plan.options
+            address: tuple[int | None] = (*parent_address, plan.number)
+            omitted = options.ignored or (filter_values and options.readonly)
+
+            # Nested content is always converted, even if the field itself is omitted
+            # The contents of omitted submessages are written to a discarded message
+            if value is not None and (plan.message_type or plan.is_map):
+                try:
+                    target = type(message)() if omitted else message
+                    self._encode_nested(target, plan, value, path, address, add_mask, filter_values)
+
+                    if not plan.repeated and not omitted:
+                        self._check_oneof(oneofs, plan, message, path)
+                except json_format.ParseError as ex:
+                    raise _field_parse_error(plan, ex) from ex
+
+                # This is not a leaf node. Its address should not be included in the mask
+                if not plan.repeated:
+                    continue
+
+            if omitted:
+                continue
+
+            if add_mask is not None and None not in address:
+                add_mask(address)
+
+            # Explicitly deleted fields are not written
+            # Nested content was already written
+            if value is None or plan.message_type or plan.is_map:
+                continue
+
+            if isinstance(value, (list, set)):
+                value = [self._encode_value(plan, v, postfix)
+                         for v in value
+                         if v is not None]
+            else:
+                value = self._encode_value(plan, value, postfix)
+
+            # Errors include the field path, in the same format as json_format.ParseDict()
+            try:
+                self._check_oneof(oneofs, plan, message, path)
+
+                if plan.repeated:
+                    if not isinstance(value, list):
+                        raise json_format.ParseError(
+                            f'repeated field {plan.name} must be in [] which is {value} at {path}')
+                    message.ClearField(plan.name)
+                    getattr(message, plan.name).extend(
+                        [json_format._ConvertScalarFieldValue(v, plan.field, f'{path}.{plan.name}[{idx}]')
+                         for idx, v in enumerate(value)])
+                else:
+                    setattr(message,
+                            plan.name,
+                            json_format._ConvertScalarFieldValue(value, plan.field, f'{path}.{plan.name}'))
+            except json_format.ParseError as ex:
+                raise _field_parse_error(plan, ex) from ex
+            except (ValueError, TypeError) as ex:
+                raise json_format.ParseError(f'Failed to parse {plan.name} field: {ex}.') from ex
+
+    def _encode_nested(self,
+                       message: Message,
+                       plan: FieldPlan,
+                       value: dict | list,
+                       parent_path: str,
+                       address: tuple[int | None],
+                       add_mask: Callable[[tuple[int]], None] | None,
+                       filter_values: bool):
+        message.ClearField(plan.name)
+        field_value = getattr(message, plan.name)
+        path = f'{parent_path}.{plan.name}'
+
+        # map<K, V> field
+        # Map values are not leaf nodes
+        if plan.is_map:
+            if not isinstance(value, dict):
+                raise json_format.ParseError(
+                    f'Map field {plan.name} must be in a dict which is {value} at {path}')
+            key_field = plan.field.message_type.fields_by_name['key']
+            for k, v in value.items():
+                map_key = json_format._ConvertScalarFieldValue(k, key_field, f'{path}.key', True)
+                self._encode_fields(field_value[map_key],
+                                    v,
+                                    f'{path}[{map_key}]',
+                                    (*address, None),
+                                    add_mask,
+                                    filter_values)
+
+        # Generic repeated field
+        # List items are not leaf nodes
+        elif plan.repeated:
+            if not isinstance(value, list):
+                raise json_format.ParseError(
+                    f'repeated field {plan.name} must be in [] which is {value} at {parent_path}')
+            for idx, v in enumerate(value):
+                self._encode_fields(field_value.add(),
+                                    v,
+                                    f'{path}[{idx}]',
+                                    (*address, None),
+                                    add_mask,
+                                    filter_values)
+
+        # Submessage
+        else:
+            field_value.SetInParent()
+            self._encode_fields(field_value,
+                                value,
+                                path,
+                                address,
+                                add_mask,
+                                filter_values)
+
+    def _check_oneof(self, oneofs: dict[str, str], plan: FieldPlan, message: Message, path: str):
+        oneof = plan.field.containing_oneof
+        if oneof is not None:
+            if oneofs.setdefault(oneof.name, plan.name) != plan.name:
+                raise json_format.ParseError(
+                    f'Message type "{message.DESCRIPTOR.full_name}" should not have multiple '
+                    f'"{oneof.name}" oneof fields at "{path}".')
+
+    def _encode_value(self,
+                      plan: FieldPlan,
+                      value: Any,
+                      postfix: str,
+                      ) -> str | int | float:
+        options = plan.options
+
+        if options.unit:
+            value = self._encode_unit(value, plan.unit_type, postfix or None)
+
+        if options.objtype:
+            if isinstance(value, dict):
+                value = value['id']
+
+        if options.scale:
+            value *= options.scale
+
+        if options.hexed:
+            value = self.hex_to_int(value)
+
+        if options.hexstr:
+            value = self.hex_to_b64(value)
+
+        if options.ipv4address:
+            value = self.ipv4_to_int(value)
+
+        if options.datetime:
+            value = serialize_datetime(value, DateFormatOpt.SECONDS)
+
+        if plan.is_int:
+            value = int(round(value))
+
+        return value
+
     def post_decode(self,
                     desc: Descriptor,
                     payload: DecodedPayload, /,
@@ -424,124 +831,269 @@ class ProtobufProcessor():
                 }
             }
         """
-        metadata_opt = MetadataOpt.TYPED
-        date_fmt_opt = DateFormatOpt.ISO8601
-
-        if mode == ReadMode.LOGGED:
-            metadata_opt = MetadataOpt.POSTFIX
-            date_fmt_opt = DateFormatOpt.SECONDS
+        metadata_opt, date_fmt_opt = self._decode_opts(mode)
 
         if filter_values is None:
             filter_values = self._filter_values
 
+        mask = MaskTrie(payload.maskFields)
+
         for element in self._walk_elements(desc, payload.content):
-            options = self._field_options(element.field)
-
-            if payload.maskMode == MaskMode.NO_MASK:
-                excluded = False
-            elif payload.maskMode in [MaskMode.INCLUSIVE, MaskMode.EXCLUSIVE]:
-                masked = any((f for f in payload.maskFields
-                              if self.matches_address(f, element.address)))
-                excluded = masked ^ (payload.maskMode == MaskMode.INCLUSIVE)
-            else:
-                raise NotImplementedError(f'{payload.maskMode=}')
+            plan = element.plan
+            options = plan.options
+            excluded = self._is_excluded(payload.maskMode, mask, element.address)
 
-            if options.ignored:
+            if self._is_omitted(options, mode, filter_values):
                 del element.obj[element.key]
                 continue
 
-            if filter_values:
-                if (mode == ReadMode.STORED and not options.stored) \
-                        or (mode == ReadMode.LOGGED and not options.logged):
+            new_key = self._decode_key(plan, element.key, metadata_opt)
+            new_value = element.obj[element.key]
+
+            # Filter values that should be omitted entirely
+            if options.omit_if_zero:
+                if isinstance(new_value, (list, set)):
+                    new_value = [v for v in new_value if v != 0]
+                elif new_value == 0:
                     del element.obj[element.key]
                     continue
 
-            link_type = self.type_name(options.objtype)
-            qty_system_unit = self.unit_name(options.unit)
-            qty_user_unit = self._converter.to_user_unit(qty_system_unit)
+            # Convert value
+            if isinstance(new_value, (list, set)):
+                new_value = [self._decode_value(plan, v, excluded, metadata_opt, date_fmt_opt)
+                             for v in new_value]
+            else:
+                new_value = self._decode_value(plan, new_value, excluded, metadata_opt, date_fmt_opt)
+
+            # Remove old key/value if we updated the key
+            if element.key != new_key:
+                del element.obj[element.key]
+
+            element.obj[new_key] = new_value
 
-            def _convert_value(value: float | int | str) -> float | int | str | None:
-                null_value = options.null_if_zero and value == 0
+        return payload
 
-                if options.scale:
-                    value /= options.scale
+    def decode_message(self,
+                       message: Message,
+                       payload: DecodedPayload, /,
+                       mode: ReadMode = ReadMode.DEFAULT,
+                       filter_values: bool | None = None,
+                       ) -> DecodedPayload:
+        """
+        Converts a protobuf message directly to post-processed content.
 
-                if options.unit:
-                    if excluded or null_value:
-                        value = None
-                    else:
-                        value = self._converter.to_user_value(value, qty_system_unit)
+        The result is identical to converting the message using
+        `json_format.MessageToDict()`, and then calling `post_decode()`.
+        Instead of walking the message twice, values are converted while
+        the message fields are read.
 
-                    if metadata_opt == MetadataOpt.TYPED:
-                        value = {
-                            '__bloxtype': 'Quantity',
-                            'unit': qty_user_unit,
-                            'value': value
-                        }
+        Any existing content in `payload` is replaced.
+        The mask mode and fields of `payload` are used to determine excluded values.
+        """
+        metadata_opt, date_fmt_opt = self._decode_opts(mode)
 
-                        if options.readonly:
-                            value['readonly'] = True
+        if filter_values is None:
+            filter_values = self._filter_values
 
-                    return value
+        payload.content = self._decode_fields(message,
+                                              payload.maskMode,
+                                              MaskTrie(payload.maskFields),
+                                              (),
+                                              mode,
+                                              filter_values,
+                                              metadata_opt,
+                                              date_fmt_opt)
+        return payload
 
-                if options.objtype:
-                    if excluded or null_value:
-                        value = None
+    def _decode_fields(self,
+                       message: Message,
+                       mask_mode: MaskMode,
+                       mask: MaskTrie,
+                       parent_address: tuple[int | None],
+                       mode: ReadMode,
+                       filter_values: bool,
+                       metadata_opt: MetadataOpt,
+                       date_fmt_opt: DateFormatOpt,
+                       ) -> dict:
+        obj = {}
+        enums_as_int = mode in (ReadMode.STORED, ReadMode.LOGGED)
+
+        for plan in field_plans(message.DESCRIPTOR).values():
+            options = plan.options
+
+            if self._is_omitted(options, mode, filter_values):
+                continue
 
-                    if metadata_opt == MetadataOpt.TYPED:
-                        value = {
-                            '__bloxtype': 'Link',
-                            'type': link_type,
-                            'id': value,
-                        }
+            # Singular submessages and oneof fields are only included if set
+            if plan.has_presence and not message.HasField(plan.name):
+                continue
 
-                    return value
+            value = getattr(message, plan.name)
+            address: tuple[int | None] = (*parent_address, plan.number)
+
+            if plan.is_map:
+                if plan.message_type:
+                    value = {
+                        _json_map_key(k): self._decode_fields(v,
+                                                              mask_mode,
+                                                              mask,
+                                                              (*address, None),
+                                                              mode,
+                                                              filter_values,
+                                                              metadata_opt,
+                                                              date_fmt_opt)
+                        for k, v in value.items()}
+                else:
+                    value = {_json_map_key(k): _json_scalar(plan.map_value, v, enums_as_int)
+                             for k, v in value.items()}
+
+            elif plan.repeated:
+                if plan.message_type:
+                    value = [self._decode_fields(v,
+                                                 mask_mode,
+                                                 mask,
+                                                 (*address, None),
+                                                 mode,
+                                                 filter_values,
+                                                 metadata_opt,
+                                                 date_fmt_opt)
+                             for v in value]
+                else:
+                    value = [_json_scalar(plan.field, v, enums_as_int) for v in value]
+
+                if options.omit_if_zero:
+                    value = [v for v in value if v != 0]
+
+            elif plan.message_type:
+                value = self._decode_fields(value,
+                                            mask_mode,
+                                            mask,
+                                            address,
+                                            mode,
+                                            filter_values,
+                                            metadata_opt,
+                                            date_fmt_opt)
+                # This is not a leaf node
+                address = (*address, None)
 
-                if excluded or null_value:
-                    return None
+            else:
+                value = _json_scalar(plan.field, value, enums_as_int)
 
-                if options.hexed:
-                    return self.int_to_hex(value)
+                if options.omit_if_zero and value == 0:
+                    continue
 
-                if options.hexstr:
-                    return self.b64_to_hex(value)
+            excluded = self._is_excluded(mask_mode, mask, address)
+            key = self._decode_key(plan, plan.name, metadata_opt)
 
-                if options.ipv4address:
-                    return self.int_to_ipv4(value)
+            if isinstance(value, list):
+                obj[key] = [self._decode_value(plan, v, excluded, metadata_opt, date_fmt_opt)
+                            for v in value]
+            else:
+                obj[key] = self._decode_value(plan, value, excluded, metadata_opt, date_fmt_opt)
 
-                if options.datetime:
-                    return serialize_datetime(value, date_fmt_opt)
+        return obj
 
-                return value
+    @staticmethod
+    def _decode_opts(mode: ReadMode) -> tuple[MetadataOpt, DateFormatOpt]:
+        if mode == ReadMode.LOGGED:
+            return MetadataOpt.POSTFIX, DateFormatOpt.SECONDS
+        else:
+            return MetadataOpt.TYPED, DateFormatOpt.ISO8601
 
-            new_key = element.key
-            new_value = element.obj[element.key]
+    @staticmethod
+    def _is_omitted(options: brewblox_pb2.FieldOpts,
+                    mode: ReadMode,
+                    filter_values: bool) -> bool:
+        if options.ignored:
+            return True
 
-            # If metadata is postfixed, we may need to update the key
-            if metadata_opt == MetadataOpt.POSTFIX:
-                if options.objtype:
-                    new_key = f'{element.key}<{link_type}>'
-                if options.unit:
-                    new_key = f'{element.key}[{qty_user_unit}]'
+        if filter_values:
+            if (mode == ReadMode.STORED and not options.stored) \
+                    or (mode == ReadMode.LOGGED and not options.logged):
+                return True
 
-            # Filter values that should be omitted entirely
-            if options.omit_if_zero:
-                if isinstance(new_value, (list, set)):
-                    new_value = [v for v in new_value if v != 0]
-                elif new_value == 0:
-                    del element.obj[element.key]
-                    continue
+        return False
 
-            # Convert value
-            if isinstance(new_value, (list, set)):
-                new_value = [_convert_value(v) for v in new_value]
+    @staticmethod
+    def _is_excluded(mask_mode: MaskMode,
+                     mask: MaskTrie,
+                     address: tuple[int | None]) -> bool:
+        if mask_mode == MaskMode.NO_MASK:
+            return False
+        elif mask_mode in [MaskMode.INCLUSIVE, MaskMode.EXCLUSIVE]:
+            return mask.matches(address) ^ (mask_mode == MaskMode.INCLUSIVE)
+        else:
+            raise NotImplementedError(f'{mask_mode=}')
+
+    def _decode_key(self,
+                    plan: FieldPlan,
+                    key: str,
+                    metadata_opt: MetadataOpt) -> str:
+        # If metadata is postfixed, we may need to update the key
+        if metadata_opt == MetadataOpt.POSTFIX:
+            if plan.options.unit:
+                return f'{key}[{self._converter.to_user_unit(plan.unit_type)}]'
+            if plan.options.objtype:
+                return f'{key}<{plan.link_type}>'
+        return key
+
+    def _decode_value(self,
+                      plan: FieldPlan,
+                      value: float | int | str,
+                      excluded: bool,
+                      metadata_opt: MetadataOpt,
+                      date_fmt_opt: DateFormatOpt,
+                      ) -> float | int | str | None:
+        options = plan.options
+        null_value = options.null_if_zero and value == 0
+
+        if options.scale:
+            value /= options.scale
+
+        if options.unit:
+            if excluded or null_value:
+                value = None
             else:
-                new_value = _convert_value(new_value)
+                value = self._converter.to_user_value(value, plan.unit_type)
 
-            # Remove old key/value if we updated the key
-            if element.key != new_key:
-                del element.obj[element.key]
+            if metadata_opt == MetadataOpt.TYPED:
+                value = {
+                    '__bloxtype': 'Quantity',
+                    'unit': self._converter.to_user_unit(plan.unit_type),
+                    'value': value
+                }
 
-            element.obj[new_key] = new_value
+                if options.readonly:
+                    value['readonly'] = True
 
-        return payload
+            return value
+
+        if options.objtype:
+            if excluded or null_value:
+                value = None
+
+            if metadata_opt == MetadataOpt.TYPED:
+                value = {
+                    '__bloxtype': 'Link',
+                    'type': plan.link_type,
+                    'id': value,
+                }
+
+            return value
+
+        if excluded or null_value:
+            return None
+
+        if options.hexed:
+            return self.int_to_hex(value)
+
+        if options.hexstr:
+            return self.b64_to_hex(value)
+
+        if options.ipv4address:
+            return self.int_to_ipv4(value)
+
+        if options.datetime:
+            return serialize_datetime(value, date_fmt_opt)
+
+        return value
@@ -0,0 +1,116 @@
+"""
+Direct conversion between command models and protobuf messages
+
+Requests and responses wrap encoded payloads that do not require further processing.
+Messages are converted field by field, and decoded models are created without validation.
+"""
+
+import enum
+from functools import lru_cache
+
+from google.protobuf import json_format
+from google.protobuf.descriptor import EnumDescriptor
+
+from ..models import (EncodedPayload, ErrorCode, IntermediateRequest,
+                      IntermediateResponse, MaskField, MaskMode, Opcode,
+                      ReadMode, parse_enum)
+from . import pb2
+
+
+@lru_cache
+def _enum_table(cls: type[enum.Enum], enum_desc: EnumDescriptor) -> dict[int, enum.Enum]:
+    # Protobuf values are matched to model enums by name, with fallback to number
+    table = {}
+    for number, value in enum_desc.values_by_number.items():
+        try:
+            table[number] = parse_enum(cls, value.name)
+        except ValueError:
+            pass
+    return table
+
+
+def _decode_enum(cls: type[enum.Enum], message, field_name: str) -> enum.Enum:
+    value = getattr(message, field_name)
+    table = _enum_table(cls, message.DESCRIPTOR.fields_by_name[field_name].enum_type)
+    try:
+        return table[value]
+    except KeyError:
+        return cls(value)
+
+
+def _encode_payload(payload: EncodedPayload, message: pb2.command_pb2.Payload):
+    message.blockId = payload.blockId
+
+    if payload.blockType is not None:
+        message.blockType = json_format._ConvertScalarFieldValue(
+            payload.blockType,
+            message.DESCRIPTOR.fields_by_name['blockType'],
+            'payload.blockType')
+    if payload.name is not None:
+        message.name = payload.name
+
+    message.content = payload.content
+    message.maskMode = payload.maskMode.value
+
+    for field in payload.maskFields:
+        message.maskFields.add().address.extend(field.address)
+
+
+def _decode_payload(message: pb2.command_pb2.Payload) -> EncodedPayload:
+    block_type = message.blockType
+    try:
+        block_type = message.DESCRIPTOR.fields_by_name['blockType'].enum_type.values_by_number[block_type].name
+    except KeyError:
+        pass
+
+    return EncodedPayload.model_construct(
+        blockId=message.blockId,
+        maskMode=_decode_enum(MaskMode, message, 'maskMode'),
+        maskFields=[MaskField.model_construct(address=list(v.address))
+                    for v in message.maskFields],
+        blockType=block_type,
+        name=message.name,
+        content=message.content,
+    )
+
+
+def encode_request(request: IntermediateRequest) -> pb2.command_pb2.Request:
+    message = pb2.command_pb2.Request(
+        msgId=request.msgId,
+        opcode=request.opcode.value,
+        mode=request.mode.value,
+    )
+    if request.payload is not None:
+        _encode_payload(request.payload, message.payload)
+    return message
+
+
+def decode_request(message: pb2.command_pb2.Request) -> IntermediateRequest:
+    return IntermediateRequest.model_construct(
+        msgId=message.msgId,
+        opcode=_decode_enum(Opcode, message, 'opcode'),
+        mode=_decode_enum(ReadMode, message, 'mode'),
+        payload=(_decode_payload(message.payload)
+                 if message.HasField('payload')
+                 else None),
+    )
+
+
+def encode_response(response: IntermediateResponse) -> pb2.command_pb2.Response:
+    message = pb2.command_pb2.Response(
+        msgId=response.msgId,
+        error=response.error.value,
+        mode=response.mode.value,
+    )
+    for payload in response.payload:
+        _encode_payload(payload, message.payload.add())
+    return message
+
+
+def decode_response(message: pb2.command_pb2.Response) -> IntermediateResponse:
+    return IntermediateResponse.model_construct(
+        msgId=message.msgId,
+        error=_decode_enum(ErrorCode, message, 'error'),
+        mode=_decode_enum(ReadMode, message, 'mode'),
+        payload=[_decode_payload(v) for v in message.payload],
+    )
@@ -3,8 +3,10 @@ User-configurable unit conversion
 """
 
 import logging
+import math
 from contextvars import ContextVar
 from dataclasses import dataclass
+from functools import lru_cache
 
 from pint import UnitRegistry
 
@@ -45,6 +47,39 @@ class UnitMapping:
     user_value: str
 
 
+@dataclass(frozen=True)
+class AffineConversion:
+    """
+    Precomputed unit conversion: `value * scale + offset`
+    """
+    scale: float
+    offset: float
+
+
+@lru_cache(maxsize=256)
+def affine_conversion(src: str, dst: str) -> AffineConversion | None:
+    """
+    Derives conversion coefficients from pint.
+    Returns None if the conversion from `src` to `dst` is not affine.
+    """
+    def convert(value: float) -> float:
+        return _UREG.Quantity(value, src).to(dst).magnitude
+
+    offset = convert(0)
+    if offset == 0:
+        # Multiplicative conversion. This yields the same factor used by pint.
+        scale = convert(1)
+    else:
+        # Offset conversion (degF -> degC). Use a wide span for precision.
+        scale = (convert(1000.0) - offset) / 1000.0
+
+    probe = 123.456
+    if not math.isclose(convert(probe), probe * scale + offset, rel_tol=1e-9, abs_tol=1e-9):
+        return None
+
+    return AffineConversion(scale, offset)
+
+
 def derived_table(user_temp) -> dict[str, UnitMapping]:
     # Python 3.7+ guarantees values being insertion-ordered
     sys_vals = [s.format(temp=SYSTEM_TEMP) for s in FORMATS.values()]
@@ -61,7 +96,17 @@ class UnitConverter:
 
     def __init__(self):
         # Init with system temp. All mappings will have system_value == user_value
-        self._table = derived_table(SYSTEM_TEMP)
+        self._set_table(derived_table(SYSTEM_TEMP))
+
+    def _set_table(self, table: dict[str, UnitMapping]):
+        self._table = table
+
+        # All FORMATS conversions are affine.
+        # Precomputed coefficients let us skip pint for all non-custom units.
+        self._to_sys = {k: affine_conversion(v.user_value, v.system_value)
+                        for k, v in table.items()}
+        self._to_user = {k: affine_conversion(v.system_value, v.user_value)
+                         for k, v in table.items()}
 
     @property
     def temperature(self) -> str:
@@ -77,14 +122,26 @@ class UnitConverter:
             except Exception as ex:
                 raise InvalidInput(f'Invalid new unit config {mapping}, {ex}')
 
-        self._table = cfg
+        self._set_table(cfg)
 
     def to_sys_value(self, amount: float, id: str, custom=None) -> float:
         mapping = self._table[id]
+        conversion = self._to_sys[id]
+
+        if conversion \
+                and (not custom or custom == mapping.user_value) \
+                and isinstance(amount, (int, float)):
+            return amount * conversion.scale + conversion.offset
+
         return _UREG.Quantity(amount, custom or mapping.user_value).to(mapping.system_value).magnitude
 
     def to_user_value(self, amount: float, id: str) -> float:
         mapping = self._table[id]
+        conversion = self._to_user[id]
+
+        if conversion and isinstance(amount, (int, float)):
+            return amount * conversion.scale + conversion.offset
+
         return _UREG.Quantity(amount, mapping.system_value).to(mapping.user_value).magnitude
 
     def to_sys_unit(self, id):
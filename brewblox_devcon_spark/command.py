@@ -6,10 +6,13 @@ Requests are matched with responses here.
 import asyncio
 import logging
 from contextvars import ContextVar
+from functools import partial
+from time import perf_counter
 
-from . import codec, connection, exceptions, state_machine, utils
-from .models import (ControllerDescription, DecodedPayload, DeviceDescription,
-                     EncodedPayload, ErrorCode, FirmwareBlock,
+from . import (codec, command_scheduler, connection, exceptions, state_machine,
+               utils)
+from .models import (CommandPriority, ControllerDescription, DecodedPayload,
+                     DeviceDescription, EncodedPayload, ErrorCode, FirmwareBlock,
                      FirmwareBlockIdentity, FirmwareDescription,
                      HandshakeMessage, IntermediateRequest,
                      IntermediateResponse, MaskMode, Opcode, ReadMode)
@@ -28,6 +31,23 @@ HANDSHAKE_KEYS = [
     'device_id',
 ]
 
+# Concurrent identical reads share a single command
+COALESCED_OPCODES = {
+    Opcode.BLOCK_READ,
+    Opcode.BLOCK_READ_ALL,
+    Opcode.NAME_READ_ALL,
+}
+
+# Commands that do not modify controller state
+PASSIVE_OPCODES = {
+    Opcode.NONE,
+    Opcode.VERSION,
+    Opcode.STORAGE_READ,
+    Opcode.STORAGE_READ_ALL,
+    Opcode.NAME_READ,
+    *COALESCED_OPCODES,
+}
+
 LOGGER = logging.getLogger(__name__)
 CV: ContextVar['CboxCommander'] = ContextVar('command.CboxCommander')
 
@@ -42,8 +62,14 @@ class CboxCommander:
 
         self._msgid = 0
         self._active_messages: dict[int, asyncio.Future[IntermediateResponse]] = {}
+        self._pending = 0
         self._empty_ev = asyncio.Event()
         self._empty_ev.set()
+        self.scheduler = command_scheduler.CommandScheduler(self.config.command_window)
+
+        self._shared_reads: dict[tuple, asyncio.Task[list[EncodedPayload]]] = {}
+        self._write_generation = 0
+        self.coalesced_reads = 0
 
         self.conn.on_event = self._on_event
         self.conn.on_response = self._on_response
@@ -128,6 +154,69 @@ class CboxCommander:
                        payload: EncodedPayload | None = None,
                        mode: ReadMode = ReadMode.DEFAULT,
                        ) -> list[EncodedPayload]:
+        prio = command_scheduler.PRIORITY.get()
+
+        if opcode not in COALESCED_OPCODES:
+            if opcode not in PASSIVE_OPCODES:
+                # Reads that start after this command will not join earlier reads
+                self._write_generation += 1
+            return await self._execute_scheduled(opcode, payload, mode, prio)
+
+        # Callers only join reads with the same priority class.
+        # Joining a lower priority read would demote the caller.
+        key = (
+            opcode,
+            mode,
+            prio,
+            (payload.blockId, payload.name, payload.blockType) if payload else None,
+            self._write_generation,
+        )
+
+        try:
+            task = self._shared_reads[key]
+            self.coalesced_reads += 1
+
+        except KeyError:
+            task = asyncio.create_task(self._execute_scheduled(opcode, payload, mode, prio))
+            self._shared_reads[key] = task
+            task.add_done_callback(partial(self._on_shared_read_done, key))
+
+        # Cancelling one caller does not cancel the shared command
+        return await asyncio.shield(task)
+
+    def _on_shared_read_done(self, key: tuple, task: asyncio.Task):
+        self._shared_reads.pop(key, None)
+
+        # Prevent warnings if all callers were cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _execute_scheduled(self,
+                                 opcode: Opcode,
+                                 payload: EncodedPayload | None,
+                                 mode: ReadMode,
+                                 prio: CommandPriority,
+                                 ) -> list[EncodedPayload]:
+        start = perf_counter()
+
+        self._pending += 1
+        self._empty_ev.clear()
+
+        try:
+            async with self.scheduler.slot(prio):
+                return await self._send(opcode, payload, mode)
+
+        finally:
+            self.scheduler.record(prio, perf_counter() - start)
+            self._pending -= 1
+            if not self._pending:
+                self._empty_ev.set()
+
+    async def _send(self,
+                    opcode: Opcode,
+                    payload: EncodedPayload | None,
+                    mode: ReadMode,
+                    ) -> list[EncodedPayload]:
         msg_id = self._next_id()
 
         request = IntermediateRequest(
@@ -140,7 +229,6 @@ class CboxCommander:
         msg = self.codec.encode_request(request)
         fut: asyncio.Future[IntermediateResponse] = asyncio.get_running_loop().create_future()
         self._active_messages[msg_id] = fut
-        self._empty_ev.clear()
 
         try:
             LOGGER.trace(f'request: {msg}')
@@ -158,8 +246,6 @@ class CboxCommander:
 
         finally:
             del self._active_messages[msg_id]
-            if not self._active_messages:
-                self._empty_ev.set()
 
     async def validate(self, block: FirmwareBlock) -> FirmwareBlock:
         request = IntermediateRequest(
@@ -0,0 +1,174 @@
+"""
+Concurrency control and prioritization for controller commands.
+
+The number of commands awaiting a response is limited by a window.
+If the window is full, commands wait in a queue per priority class.
+Higher priority classes are always served first.
+Within a class, commands are served round-robin per flow,
+so a single caller can't monopolize the class.
+By default, every task is a separate flow.
+"""
+
+import asyncio
+import math
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Generator
+
+from .models import CommandLatency, CommandPriority
+
+# The number of most recent samples used to calculate latency percentiles
+LATENCY_SAMPLES = 1000
+
+PRIORITY: ContextVar[CommandPriority] = ContextVar('command_scheduler.priority',
+                                                   default=CommandPriority.INTERACTIVE)
+FLOW: ContextVar[object | None] = ContextVar('command_scheduler.flow', default=None)
+
+
+@contextmanager
+def priority(value: CommandPriority) -> Generator[None, None, None]:
+    """
+    Sets the priority class for all commands sent in this context.
+    Commands are INTERACTIVE by default.
+    """
+    token = PRIORITY.set(value)
+    try:
+        yield
+    finally:
+        PRIORITY.reset(token)
+
+
+@contextmanager
+def flow() -> Generator[None, None, None]:
+    """
+    Groups all commands sent in this context as a single flow.
+    This includes commands sent by tasks created in this context.
+    """
+    token = FLOW.set(object())
+    try:
+        yield
+    finally:
+        FLOW.reset(token)
+
+
+class LatencyTracker:
+
+    def __init__(self):
+        self._count = 0
+        self._samples: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, value: float):
+        self._count += 1
+        self._samples.append(value)
+
+    def report(self) -> CommandLatency:
+        samples = sorted(self._samples)
+
+        def percentile(pct: int) -> float:
+            if not samples:
+                return 0
+            return samples[math.ceil(pct / 100 * len(samples)) - 1]
+
+        return CommandLatency(
+            count=self._count,
+            mean=sum(samples) / len(samples) if samples else 0,
+            p50=percentile(50),
+            p99=percentile(99),
+            max=samples[-1] if samples else 0,
+        )
+
+
+class CommandScheduler:
+
+    def __init__(self, window: int):
+        self._window = window
+        self._in_flight = 0
+        self._waiting = 0
+        self._queues: dict[CommandPriority, OrderedDict[object, deque[asyncio.Future]]] = {
+            prio: OrderedDict() for prio in CommandPriority
+        }
+        self._latency: dict[CommandPriority, LatencyTracker] = {
+            prio: LatencyTracker() for prio in CommandPriority
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def record(self, prio: CommandPriority, latency: float):
+        self._latency[prio].add(latency)
+
+    def latency(self) -> dict[str, CommandLatency]:
+        return {prio.name: tracker.report()
+                for prio, tracker in self._latency.items()}
+
+    def _enqueue(self, prio: CommandPriority) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        flows = self._queues[prio]
+        flow = FLOW.get() or asyncio.current_task()
+
+        try:
+            flows[flow].append(fut)
+        except KeyError:
+            flows[flow] = deque([fut])
+
+        self._waiting += 1
+        return fut
+
+    def _dequeue(self, prio: CommandPriority, fut: asyncio.Future):
+        flows = self._queues[prio]
+        for flow, queue in flows.items():
+            if fut in queue:
+                queue.remove(fut)
+                if not queue:
+                    del flows[flow]
+                self._waiting -= 1
+                return
+
+    def _release(self):
+        self._in_flight -= 1
+
+        for flows in self._queues.values():
+            if not flows:
+                continue
+
+            # Round-robin: the served flow moves to the back of the line
+            flow, queue = flows.popitem(last=False)
+            fut = queue.popleft()
+            if queue:
+                flows[flow] = queue
+
+            self._waiting -= 1
+            self._in_flight += 1
+            fut.set_result(None)
+            return
+
+    @asynccontextmanager
+    async def slot(self, prio: CommandPriority) -> AsyncGenerator[None, None]:
+        """
+        Waits until a command with priority `prio` may be sent.
+        The slot is released at the end of the context.
+        """
+        if self._in_flight < self._window and not self._waiting:
+            self._in_flight += 1
+        else:
+            fut = self._enqueue(prio)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # The slot was granted just before cancellation
+                    self._release()
+                else:
+                    self._dequeue(prio, fut)
+                raise
+
+        try:
+            yield
+        finally:
+            self._release()
@@ -1,16 +1,18 @@
 from contextlib import asynccontextmanager
 
-from . import connection_handler, mqtt_connection
+from . import connection_handler, mqtt_connection, wire_recorder
 from .connection_handler import CV
 
 
 @asynccontextmanager
 async def lifespan():
-    async with connection_handler.lifespan():
-        yield
+    async with wire_recorder.lifespan():
+        async with connection_handler.lifespan():
+            yield
 
 
 def setup():
+    wire_recorder.setup()
     mqtt_connection.setup()
     connection_handler.setup()
 
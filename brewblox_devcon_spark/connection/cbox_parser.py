@@ -4,90 +4,99 @@ Parses stream data into controlbox events and data
 
 import logging
 import re
-from queue import Queue
+from collections import deque
 from typing import Generator
 
 LOGGER = logging.getLogger(__name__)
 
-# Pattern: '{start}(?P<message>[^{start}]*?){end}'
-EVENT_END = '>'
-EVENT_PATTERN = re.compile('<(?P<message>[^<]*?)>')
-DATA_END = '\n'
-DATA_PATTERN = re.compile('^(?P<message>[^^]*?)\n')
+# Annotations use < and > as start/end characters
+# Data is newline-separated
+EVENT_START = ord('<')
+EVENT_END = ord('>')
+DATA_END = ord('\n')
+DELIMITER_PATTERN = re.compile(b'[<>\n]')
 
 
 class CboxParser:
+    """ Incrementally splits a byte stream into event and data messages.
+
+    It makes some assumptions about messages:
+    * Annotations start with '<' and end with '>'
+    * Data messages end with a newline
+    * Start/end characters are not included in yielded messages
+    * Annotations can be nested, and can interrupt data messages
+    * Annotations can span multiple lines
+
+    Received bytes are scanned once. Text between delimiters is appended
+    to the innermost open annotation, or to the current data message.
+
+    Annotations are ordered on the position of their end character.
+    Given the stream: (< and > are start/end characters)
+
+        '<messageA <messageB> <messageC> > data <messageD>'
+
+    Yielded event messages will be:
+
+        [
+            'messageB',
+            'messageC',
+            'messageA',
+            'messageD'
+        ]
+
+    Afterwards, the current data message will contain ' data '
+
+    End characters without a matching start character are considered data.
+    Newlines inside an annotation are part of the annotation,
+    and do not end the current data message.
+    """
 
     def __init__(self):
-        self._buffer: str = ''
-        self._events = Queue()
-        self._data = Queue()
-        self._messages: list[str] = []
+        self._data_buffer = bytearray()
+        self._event_buffers: list[bytearray] = []
+        self._events: deque[str] = deque()
+        self._data: deque[str] = deque()
 
     def event_messages(self) -> Generator[str, None, None]:
-        while self._events.qsize() > 0:
-            yield self._events.get_nowait()
+        while self._events:
+            yield self._events.popleft()
 
     def data_messages(self) -> Generator[str, None, None]:
-        while self._data.qsize() > 0:
-            yield self._data.get_nowait()
-
-    def push(self, recv: str):
-        self._buffer += recv
-
-        # Annotations use < and > as start/end characters
-        # Most annotations can be discarded, except for event messages
-        # Event messages are annotations that start with !
-        for msg in self._coerce_message_from_buffer(EVENT_PATTERN, EVENT_END):
-            self._events.put(msg)
-
-        # Once annotations are filtered, all that remains is data
-        # Data is newline-separated
-        for msg in self._coerce_message_from_buffer(DATA_PATTERN, DATA_END):
-            self._data.put(msg)
-
-    def _extract_message(self, matchobj: re.Match) -> str:
-        msg = matchobj.group('message').rstrip()
-        self._messages.append(msg)
-        return ''
-
-    def _coerce_message_from_buffer(self, pattern: re.Pattern, end: str):
-        """ Filters separate messages from the buffer.
-
-        It makes some assumptions about messages:
-        * They have a fixed start/end special character
-        * Start/end characters should not be included in yielded messages
-        * Messages do not include start/end characters of other message types
-        * Messages can be nested
-
-        Returned messages are ordered on the position of their end character.
-        Given the buffer: (< and > are start/end characters)
-
-            '<messageA <messageB> <messageC> > data <messageD>'
-
-        Yielded messages will be:
-
-            [
-                'messageB',
-                'messageC',
-                'messageA   ',
-                'messageD'
-            ]
-
-        Afterwards, the buffer will contain ' data '
-        """
-        prev_len = 0
-
-        # Don't bother checking if end char is not in buffer
-        # Break the loop when buffer is unchanged after re.sub()
-        # The break is required if the buffer receives malformed data
-        while end in self._buffer and prev_len != len(self._buffer):
-            prev_len = len(self._buffer)
-            self._buffer = re.sub(
-                pattern=pattern,
-                repl=self._extract_message,
-                string=self._buffer,
-                count=1)
-
-        yield from self._messages
-        self._messages = []
+        while self._data:
+            yield self._data.popleft()
+
+    def push(self, recv: bytes | str):
+        if isinstance(recv, str):
+            recv = recv.encode()
+
+        view = memoryview(recv)
+        pos = 0
+
+        for match in DELIMITER_PATTERN.finditer(recv):
+            idx = match.start()
+            target = self._event_buffers[-1] if self._event_buffers else self._data_buffer
+            target += view[pos:idx]
+            pos = idx + 1
+            char = recv[idx]
+
+            if char == EVENT_START:
+                self._event_buffers.append(bytearray())
+
+            elif char == EVENT_END:
+                if self._event_buffers:
+                    self._events.append(self._decode(self._event_buffers.pop()))
+                else:
+                    self._data_buffer.append(char)
+
+            elif self._event_buffers:
+                self._event_buffers[-1].append(char)
+
+            else:
+                self._data.append(self._decode(self._data_buffer))
+                self._data_buffer = bytearray()
+
+        target = self._event_buffers[-1] if self._event_buffers else self._data_buffer
+        target += view[pos:]
+
+    def _decode(self, buffer: bytearray) -> str:
+        return buffer.decode(errors='replace').rstrip()
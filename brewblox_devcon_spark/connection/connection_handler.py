@@ -3,14 +3,21 @@ import logging
 from contextlib import asynccontextmanager, suppress
 from contextvars import ContextVar
 from datetime import timedelta
+from time import perf_counter
+from typing import Awaitable, Callable
 
 from .. import exceptions, state_machine, utils
-from ..models import DiscoveryType
+from ..models import ConnectionKind_, DiscoveryKind_, DiscoveryType
+from . import wire_recorder
 from .connection_impl import ConnectionCallbacks, ConnectionImplBase
+from .dispatch import DispatchMetrics
+from .emulated_connection import connect_emulated
 from .mock_connection import connect_mock
 from .mqtt_connection import discover_mqtt
+from .replay_connection import connect_replay
 from .stream_connection import (connect_simulation, connect_tcp, discover_mdns,
                                 discover_usb)
+from .wire_recorder import RecordKind
 
 LOGGER = logging.getLogger(__name__)
 
@@ -35,12 +42,18 @@ class ConnectionHandler(ConnectionCallbacks):
         self._last_ok: bool = True
         self._interval: timedelta = calc_interval(None)
         self._impl: ConnectionImplBase = None
+        self._last_discovered: tuple[ConnectionKind_, str] | None = None
+        self.discovery_times: dict[DiscoveryKind_ | ConnectionKind_, float] = {}
 
     @property
     def connected(self) -> bool:
         return self._impl is not None \
             and self._impl.connected.is_set()
 
+    @property
+    def dispatch_metrics(self) -> dict[str, DispatchMetrics]:
+        return self._impl.dispatch_metrics if self._impl is not None else {}
+
     async def on_event(self, msg: str):
         """
         This function can be replaced by whoever wants to receive
@@ -53,40 +66,106 @@ class ConnectionHandler(ConnectionCallbacks):
         the actual response.
         """
 
+    async def _discover_last(self) -> ConnectionImplBase | None:
+        """
+        Reconnects to the address and transport of the last discovered connection.
+        The duration is recorded under the connection kind.
+        """
+        kind, address = self._last_discovered
+        start = perf_counter()
+        try:
+            async with asyncio.timeout(self.config.discovery_timeout_last.total_seconds()):
+                if kind == 'MQTT':
+                    result = await discover_mqtt(self)
+                else:
+                    host, port = address.rsplit(':', 1)
+                    result = await connect_tcp(self, host, int(port), kind)
+            if result:
+                self.discovery_times[kind] = perf_counter() - start
+            return result
+        except Exception as ex:
+            LOGGER.debug(f'Failed to reconnect to {kind} {address}: {utils.strex(ex)}')
+            return None
+
+    async def _discover_repeat(self,
+                               kind: DiscoveryKind_,
+                               func: Callable[['ConnectionHandler'], Awaitable[ConnectionImplBase | None]],
+                               ) -> tuple[DiscoveryKind_, ConnectionImplBase]:
+        start = perf_counter()
+        while True:
+            try:
+                result = await func(self)
+                if result:
+                    self.discovery_times[kind] = perf_counter() - start
+                    return kind, result
+            except Exception as ex:
+                LOGGER.info(f'{kind} discovery failed: {utils.strex(ex)}')
+
+            await asyncio.sleep(self.config.discovery_interval.total_seconds())
+
     async def discover(self) -> ConnectionImplBase:
         discovery_type = self.config.discovery
         LOGGER.info(f'Discovering devices... ({discovery_type})')
 
+        # Try the last successful transport and address first
+        if self._last_discovered:
+            result = await self._discover_last()
+            if result:
+                return result
+            self._last_discovered = None
+
+        methods = {
+            'USB': (DiscoveryType.usb, discover_usb),
+            'MDNS': (DiscoveryType.mdns, discover_mdns),
+            'MQTT': (DiscoveryType.mqtt, discover_mqtt),
+        }
+        tasks = [
+            asyncio.create_task(self._discover_repeat(kind, func))
+            for kind, (method_type, func) in methods.items()
+            if discovery_type in [DiscoveryType.all, method_type]
+        ]
+
+        timed_out = False
         try:
             async with asyncio.timeout(self.config.discovery_timeout.total_seconds()):
-                while True:
-                    if discovery_type in [DiscoveryType.all, DiscoveryType.usb]:
-                        result = await discover_usb(self)
-                        if result:
-                            return result
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
 
-                    if discovery_type in [DiscoveryType.all, DiscoveryType.mdns]:
-                        result = await discover_mdns(self)
-                        if result:
-                            return result
+        except asyncio.TimeoutError:
+            timed_out = True
 
-                    if discovery_type in [DiscoveryType.all, DiscoveryType.mqtt]:
-                        result = await discover_mqtt(self)
-                        if result:
-                            return result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
 
-                    await asyncio.sleep(self.config.discovery_interval.total_seconds())
+        # Multiple methods may have succeeded before the others were cancelled
+        results = [task.result() for task in tasks if not task.cancelled()]
 
-        except asyncio.TimeoutError:
+        if timed_out:
+            for _, conn in results:
+                await conn.close()
             raise ConnectionAbortedError('Discovery timeout')
 
+        (kind, result), *extra = results
+        for _, conn in extra:
+            await conn.close()
+
+        LOGGER.info(f'Discovered {result.kind} {result.address} using {kind}'
+                    f' in {self.discovery_times[kind]:.2f}s')
+        self._last_discovered = (result.kind, result.address)
+        return result
+
     async def connect(self) -> ConnectionImplBase:
         mock = self.config.mock
         simulation = self.config.simulation
         device_host = self.config.device_host
         device_port = self.config.device_port
 
-        if mock:
+        if self.config.wire_replay:
+            return await connect_replay(self)
+        elif mock and self.config.mock_link:
+            return await connect_emulated(self)
+        elif mock:
             return await connect_mock(self)
         elif simulation:
             return await connect_simulation(self)
@@ -140,6 +219,7 @@ class ConnectionHandler(ConnectionCallbacks):
         if not self.connected:
             raise exceptions.NotConnected()
 
+        wire_recorder.record(RecordKind.REQUEST, msg)
         await self._impl.send_request(msg)
 
     async def reset(self):
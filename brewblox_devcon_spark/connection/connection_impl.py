@@ -3,6 +3,10 @@ from abc import abstractmethod
 
 from brewblox_devcon_spark.models import ConnectionKind_
 
+from . import wire_recorder
+from .dispatch import DispatchMetrics
+from .wire_recorder import RecordKind
+
 
 class ConnectionCallbacks:
 
@@ -50,10 +54,20 @@ class ConnectionImplBase(ConnectionCallbacks):
     def disconnected(self) -> asyncio.Event:
         return self._disconnected
 
+    @property
+    def dispatch_metrics(self) -> dict[str, DispatchMetrics]:
+        """
+        Metrics for received messages, per message class.
+        Connections that do not queue received messages have no metrics.
+        """
+        return {}
+
     async def on_response(self, msg: str):
+        wire_recorder.record(RecordKind.RESPONSE, msg)
         await self._callbacks.on_response(msg)
 
     async def on_event(self, msg: str):
+        wire_recorder.record(RecordKind.EVENT, msg)
         await self._callbacks.on_event(msg)
 
     @abstractmethod
@@ -0,0 +1,110 @@
+"""
+Ordered dispatch of received messages to their handlers
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from .. import utils
+from ..models import DispatchStats
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DispatchMetrics:
+    depth: int = 0
+    max_depth: int = 0
+    dispatched: int = 0
+    latency_total: float = 0
+    latency_max: float = 0
+
+    @property
+    def latency_avg(self) -> float:
+        """
+        Average time in seconds between a message being queued, and its handler returning.
+        """
+        return self.latency_total / self.dispatched if self.dispatched else 0
+
+    def stats(self) -> DispatchStats:
+        return DispatchStats(
+            depth=self.depth,
+            max_depth=self.max_depth,
+            dispatched=self.dispatched,
+            latency_avg=self.latency_avg,
+            latency_max=self.latency_max,
+        )
+
+
+class MessageDispatcher:
+    """
+    Calls `handler` for every queued message, in order of arrival.
+
+    Messages are handled by a single consumer task.
+    Queued messages are never dropped, but the queue is `full`
+    when `maxsize` or more messages are waiting.
+    Producers are expected to stop receiving new messages while the queue is full.
+
+    `on_drained` is called when a full queue is reduced to half its maximum size.
+    """
+
+    def __init__(self,
+                 handler: Callable[[str], Awaitable],
+                 maxsize: int,
+                 on_drained: Callable[[], None] = None):
+        self._handler = handler
+        self._maxsize = maxsize
+        self._on_drained = on_drained
+        self._queue: asyncio.Queue[tuple[str, float]] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._was_full = False
+        self.metrics = DispatchMetrics()
+
+    @property
+    def full(self) -> bool:
+        return self._queue.qsize() >= self._maxsize
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._consume())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def put(self, msg: str):
+        self._queue.put_nowait((msg, perf_counter()))
+
+        depth = self._queue.qsize()
+        self.metrics.depth = depth
+        self.metrics.max_depth = max(depth, self.metrics.max_depth)
+        self._was_full = self._was_full or depth >= self._maxsize
+
+    async def join(self):
+        await self._queue.join()
+
+    async def _consume(self):
+        while True:
+            msg, queued = await self._queue.get()
+
+            try:
+                await self._handler(msg)
+            except Exception as ex:
+                LOGGER.error(f'Error handling message `{msg}`: {utils.strex(ex)}')
+
+            latency = perf_counter() - queued
+            depth = self._queue.qsize()
+            self.metrics.depth = depth
+            self.metrics.dispatched += 1
+            self.metrics.latency_total += latency
+            self.metrics.latency_max = max(latency, self.metrics.latency_max)
+            self._queue.task_done()
+
+            if self._was_full and depth <= self._maxsize // 2:
+                self._was_full = False
+                if self._on_drained:
+                    self._on_drained()
@@ -0,0 +1,164 @@
+"""
+A MockConnection that emulates the behavior of a physical link.
+
+Requests and responses are delayed, chunked, and optionally dropped
+according to the `mock_link_*` service settings.
+The emulated controller handles one request at a time,
+and takes `mock_processing_time` to handle requests with the given opcode.
+
+Responses are framed as on a controlbox stream,
+and are reassembled using the same parser as StreamConnection.
+"""
+
+import asyncio
+import logging
+import random
+from contextlib import suppress
+from datetime import timedelta
+
+from .. import utils
+from ..models import Opcode
+from .cbox_parser import CboxParser
+from .connection_impl import ConnectionCallbacks
+from .mock_connection import MockConnection
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LinkModel:
+    """
+    Calculates delivery times for messages sent over a single link direction.
+
+    Messages are transmitted one at a time, limited by `bandwidth` (bytes per second).
+    After transmission, messages arrive after `latency` + a random `jitter`.
+    Messages are always delivered in order, and are dropped with a chance of `drop_rate`.
+    """
+
+    def __init__(self,
+                 latency: float,
+                 jitter: float = 0,
+                 bandwidth: int = 0,
+                 drop_rate: float = 0,
+                 rand: random.Random | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.drop_rate = drop_rate
+        self._rand = rand or random.Random()
+        self._transmitted = 0.0
+        self._delivered = 0.0
+
+    def schedule(self, size: int) -> float | None:
+        """
+        Returns the event loop time at which a message of `size` bytes is delivered,
+        or None if the message is dropped.
+        """
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._transmitted)
+        self._transmitted = start + (size / self.bandwidth if self.bandwidth else 0)
+
+        delivered = self._transmitted + self.latency + self._rand.uniform(0, self.jitter)
+        self._delivered = max(delivered, self._delivered)
+
+        if self.drop_rate and self._rand.random() < self.drop_rate:
+            return None
+        return self._delivered
+
+
+async def sleep_until(when: float):
+    await asyncio.sleep(when - asyncio.get_running_loop().time())
+
+
+class EmulatedConnection(MockConnection):
+    def __init__(self,
+                 device_id: str,
+                 callbacks: ConnectionCallbacks,
+                 ) -> None:
+        super().__init__(device_id, callbacks)
+        config = utils.get_config()
+
+        def link() -> LinkModel:
+            return LinkModel(latency=config.mock_link_rtt.total_seconds() / 2,
+                             jitter=config.mock_link_jitter.total_seconds(),
+                             bandwidth=config.mock_link_bandwidth,
+                             drop_rate=config.mock_link_drop_rate)
+
+        self.uplink = link()
+        self.downlink = link()
+        self.chunk_size = max(config.mock_link_chunk_size, 1)
+        self.processing_time: dict[Opcode, timedelta] = dict(config.mock_processing_time)
+
+        self._parser = CboxParser()
+        self._requests: asyncio.Queue[tuple[float, str]] = asyncio.Queue()
+        self._responses: asyncio.Queue[tuple[float, bytes]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def _run_controller(self):
+        while True:
+            delivered, request_b64 = await self._requests.get()
+            await sleep_until(delivered)
+
+            try:
+                self.update_systime()
+                request = self._codec.decode_request(request_b64)
+                delay = self.processing_time.get(request.opcode, timedelta())
+                await asyncio.sleep(delay.total_seconds())
+                response = await self.handle_command(request)
+
+            except Exception as ex:
+                LOGGER.error(f'Error handling request `{request_b64}`: {utils.strex(ex)}')
+                continue
+
+            if not response:
+                continue
+
+            data = (self._codec.encode_response(response) + '\n').encode()
+            for idx in range(0, len(data), self.chunk_size):
+                chunk = data[idx:idx+self.chunk_size]
+                delivered = self.downlink.schedule(len(chunk))
+                if delivered is not None:
+                    self._responses.put_nowait((delivered, chunk))
+
+    async def _run_receiver(self):
+        while True:
+            delivered, chunk = await self._responses.get()
+            await sleep_until(delivered)
+            self._parser.push(chunk)
+
+            try:
+                for msg in self._parser.event_messages():
+                    await self.on_event(msg)
+
+                for msg in self._parser.data_messages():
+                    await self.on_response(msg)
+
+            except Exception as ex:
+                LOGGER.error(f'Error handling received message: {utils.strex(ex)}')
+
+    async def send_request(self, request_b64: str):
+        delivered = self.uplink.schedule(len(request_b64) + 1)
+        if delivered is not None:
+            self._requests.put_nowait((delivered, request_b64))
+
+    async def connect(self):
+        self._tasks = [
+            asyncio.create_task(self._run_controller()),
+            asyncio.create_task(self._run_receiver()),
+        ]
+        await super().connect()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        await super().close()
+
+
+async def connect_emulated(callbacks: ConnectionCallbacks) -> EmulatedConnection:
+    config = utils.get_config()
+    conn = EmulatedConnection(config.device_id, callbacks)
+    await conn.connect()
+    return conn
@@ -6,7 +6,9 @@ Messages are published to and read from the relevant topics on the eventbus.
 
 import asyncio
 import logging
+from collections import OrderedDict
 from contextvars import ContextVar
+from time import monotonic
 
 from .. import mqtt, utils
 from .connection_impl import ConnectionCallbacks, ConnectionImplBase
@@ -20,6 +22,85 @@ _DEVICES: ContextVar[dict[str, asyncio.Event]] = ContextVar('mqtt_connection.dev
 LOGGER = logging.getLogger(__name__)
 
 
+class PartialMessage:
+
+    def __init__(self):
+        self.started = monotonic()
+        self.chunks: list[memoryview] = []
+
+
+class MessageAssembler:
+    """
+    Reassembles chunked response messages.
+
+    Chunks from different messages may be interleaved.
+    Chunks are kept as views on the received payload,
+    and are only joined when the message is complete.
+
+    At most `maxsize` incomplete messages are kept.
+    When exceeded, the oldest incomplete message is discarded.
+    Incomplete messages are also discarded after `timeout` seconds.
+    """
+
+    def __init__(self, maxsize: int, timeout: float):
+        self._maxsize = maxsize
+        self._timeout = timeout
+        self._partials: OrderedDict[int, PartialMessage] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._partials)
+
+    def _expire(self):
+        deadline = monotonic() - self._timeout
+        while self._partials:
+            msg_id, partial = next(iter(self._partials.items()))
+            if partial.started > deadline:
+                break
+            LOGGER.error(f'Discarded incomplete MQTT message {msg_id}: timed out')
+            del self._partials[msg_id]
+
+    def push(self, payload: bytes) -> str | None:
+        """
+        Adds a received `{msg_id};{chunk_idx};{chunk}` payload.
+        Returns the message if it is complete.
+
+        Raises ValueError if the payload is malformed.
+        If the message ID could be parsed, its incomplete message is discarded.
+        """
+        id_end = payload.index(b';')
+        msg_id = int(payload[:id_end])
+
+        try:
+            idx_end = payload.index(b';', id_end + 1)
+            chunk_idx = int(payload[id_end+1:idx_end])
+        except ValueError:
+            self._partials.pop(msg_id, None)
+            raise
+
+        self._expire()
+        partial = self._partials.get(msg_id)
+
+        if partial is None and chunk_idx == 0:
+            if len(self._partials) >= self._maxsize:
+                oldest, _ = self._partials.popitem(last=False)
+                LOGGER.error(f'Discarded incomplete MQTT message {oldest}: too many pending messages')
+            partial = self._partials[msg_id] = PartialMessage()
+
+        if partial is None or len(partial.chunks) != chunk_idx:
+            LOGGER.error(f'Received unexpected MQTT message chunk with idx {chunk_idx}')
+            self._partials.pop(msg_id, None)
+            return None
+
+        partial.chunks.append(memoryview(payload)[idx_end+1:])
+
+        # we found a message separator - message is done
+        if payload.find(b'\n', idx_end) >= 0:
+            del self._partials[msg_id]
+            return b''.join(partial.chunks).decode(errors='replace').rstrip()
+
+        return None
+
+
 class MqttConnection(ConnectionImplBase):
 
     def __init__(self,
@@ -35,12 +116,9 @@ class MqttConnection(ConnectionImplBase):
         self._handshake_topic = HANDSHAKE_TOPIC + device_id
         self._log_topic = LOG_TOPIC + device_id
 
-        self._recv_msg_id: int = 0
-        self._recv_chunks: list[str]
-
-    def _reset_recv_buffer(self, msg_id: int):
-        self._recv_msg_id = msg_id
-        self._recv_chunks = []
+        config = utils.get_config()
+        self._assembler = MessageAssembler(config.mqtt_reassembly_size,
+                                           config.mqtt_reassembly_timeout.total_seconds())
 
     async def _handshake_cb(self, client, topic, payload: bytes, qos, properties):
         if not payload:
@@ -48,28 +126,12 @@ class MqttConnection(ConnectionImplBase):
 
     async def _resp_cb(self, client, topic, payload: bytes, qos, properties):
         try:
-            (msg_id, chunk_idx, chunk) = payload.decode().split(';')
-            msg_id = int(msg_id)
-            chunk_idx = int(chunk_idx)
+            msg = self._assembler.push(payload)
         except ValueError as ex:
             LOGGER.error(f'Failed to parse MQTT payload "{payload}" with error {utils.strex(ex)}')
-            self._reset_recv_buffer(0)
             return
 
-        if msg_id != self._recv_msg_id:
-            self._reset_recv_buffer(msg_id)
-
-        if len(self._recv_chunks) != chunk_idx:
-            LOGGER.error(f'Received unexpected MQTT message chunk with idx {chunk_idx}')
-            self._reset_recv_buffer(0)
-            return
-
-        self._recv_chunks.append(chunk)
-
-        # we found a message separator - message is done
-        if '\n' in chunk:
-            msg = ''.join(self._recv_chunks).rstrip()
-            self._reset_recv_buffer(0)
+        if msg is not None:
             await self.on_response(msg)
 
     async def _log_cb(self, client, topic, payload: bytes, qos, properties):
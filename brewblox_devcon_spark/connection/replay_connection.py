@@ -0,0 +1,108 @@
+"""
+Replays a wire recording made by the wire recorder.
+
+Recorded events are replayed at their recorded time after connecting.
+Requests are answered with the recorded response to an identical request,
+after the recorded response time.
+If a request was recorded multiple times, the recorded responses are used in order.
+The last response is repeated once all others are used.
+
+All delays are divided by `wire_replay_speed`.
+If the speed is 0, events and responses are replayed immediately.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict, deque
+from contextlib import suppress
+from pathlib import Path
+
+from .. import codec, utils
+from ..models import IntermediateRequest, IntermediateResponse
+from .connection_impl import ConnectionCallbacks, ConnectionImplBase
+from .wire_recorder import RecordKind, WireRecord, read_records
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReplayConnection(ConnectionImplBase):
+    def __init__(self,
+                 path: Path,
+                 speed: float,
+                 callbacks: ConnectionCallbacks,
+                 ) -> None:
+        super().__init__('MOCK', str(path), callbacks)
+        self._speed = speed
+        self._codec = codec.Codec(filter_values=False)
+        self._events: list[WireRecord] = []
+        self._responses: dict[str, deque[tuple[float, IntermediateResponse]]] = defaultdict(deque)
+        self._tasks: set[asyncio.Task] = set()
+        self._load(path)
+
+    def _key(self, request: IntermediateRequest) -> str:
+        return self._codec.encode_request(request.model_copy(update={'msgId': 0}))
+
+    def _load(self, path: Path):
+        requests: dict[int, tuple[float, str]] = {}
+
+        for record in read_records(path):
+            if record.kind == RecordKind.EVENT:
+                self._events.append(record)
+
+            elif record.kind == RecordKind.REQUEST:
+                request = self._codec.decode_request(record.msg)
+                requests[request.msgId] = (record.timestamp, self._key(request))
+
+            elif record.kind == RecordKind.RESPONSE:
+                response = self._codec.decode_response(record.msg)
+                if response.msgId in requests:
+                    sent, key = requests.pop(response.msgId)
+                    self._responses[key].append((record.timestamp - sent, response))
+
+    def _delay(self, seconds: float) -> float:
+        return seconds / self._speed if self._speed else 0
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _replay_events(self):
+        start = asyncio.get_running_loop().time()
+        for record in self._events:
+            await asyncio.sleep(start + self._delay(record.timestamp) - asyncio.get_running_loop().time())
+            await self.on_event(record.msg)
+
+    async def _respond(self, delay: float, response: IntermediateResponse):
+        await asyncio.sleep(self._delay(delay))
+        await self.on_response(self._codec.encode_response(response))
+
+    async def send_request(self, msg: str):
+        request = self._codec.decode_request(msg)
+        recorded = self._responses.get(self._key(request))
+
+        if not recorded:
+            LOGGER.warning(f'No recorded response for {request.opcode.name} request')
+            return
+
+        delay, response = recorded.popleft() if len(recorded) > 1 else recorded[0]
+        response = response.model_copy(update={'msgId': request.msgId})
+        self._spawn(self._respond(delay, response))
+
+    async def connect(self):
+        self._spawn(self._replay_events())
+        self.connected.set()
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self.disconnected.set()
+
+
+async def connect_replay(callbacks: ConnectionCallbacks) -> ConnectionImplBase:
+    config = utils.get_config()
+    conn = ReplayConnection(config.wire_replay, config.wire_replay_speed, callbacks)
+    await conn.connect()
+    return conn
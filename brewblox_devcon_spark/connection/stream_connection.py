@@ -20,6 +20,7 @@ from .. import const, exceptions, mdns, utils
 from .cbox_parser import CboxParser
 from .connection_impl import (ConnectionCallbacks, ConnectionImplBase,
                               ConnectionKind_)
+from .dispatch import DispatchMetrics, MessageDispatcher
 
 USB_BAUD_RATE = 115200
 
@@ -41,35 +42,77 @@ class StreamConnection(ConnectionImplBase):
                  address: str,
                  callbacks: ConnectionCallbacks):
         super().__init__(kind, address, callbacks)
+        config = utils.get_config()
 
         self._transport: asyncio.Transport = None
         self._parser = CboxParser()
+        self._reading_paused = False
+        self._writing_resumed = asyncio.Event()
+        self._writing_resumed.set()
+
+        # Events and responses are each handled in order of arrival
+        self._events = MessageDispatcher(self.on_event,
+                                         config.dispatch_queue_size,
+                                         self._check_reading)
+        self._responses = MessageDispatcher(self.on_response,
+                                            config.dispatch_queue_size,
+                                            self._check_reading)
+
+    @property
+    def dispatch_metrics(self) -> dict[str, DispatchMetrics]:
+        return {
+            'events': self._events.metrics,
+            'responses': self._responses.metrics,
+        }
+
+    def _check_reading(self):
+        # Stop reading from the transport while handlers can't keep up
+        full = self._events.full or self._responses.full
+
+        if full and not self._reading_paused:
+            LOGGER.debug(f'{self} pause_reading')
+            self._reading_paused = True
+            self._transport.pause_reading()
+
+        elif not full and self._reading_paused:
+            LOGGER.debug(f'{self} resume_reading')
+            self._reading_paused = False
+            self._transport.resume_reading()
 
     def connection_made(self, transport: asyncio.Transport):
         self._transport = transport
+        self._events.start()
+        self._responses.start()
         self.connected.set()
 
     def data_received(self, recv: bytes):
-        self._parser.push(recv.decode())
+        self._parser.push(recv)
 
-        # Drain parsed messages
         for msg in self._parser.event_messages():
-            asyncio.create_task(self.on_event(msg))
+            self._events.put(msg)
         for msg in self._parser.data_messages():
-            asyncio.create_task(self.on_response(msg))
+            self._responses.put(msg)
 
-    def pause_writing(self):  # pragma: no cover
+        self._check_reading()
+
+    def pause_writing(self):
         LOGGER.debug(f'{self} pause_writing')
+        self._writing_resumed.clear()
 
-    def resume_writing(self):  # pragma: no cover
+    def resume_writing(self):
         LOGGER.debug(f'{self} resume_writing')
+        self._writing_resumed.set()
 
     def connection_lost(self, ex: Exception | None):
         if ex:
             LOGGER.error(f'Connection closed with error: {utils.strex(ex)}')
+        self._events.stop()
+        self._responses.stop()
+        self._writing_resumed.set()
         self.disconnected.set()
 
     async def send_request(self, msg: str):
+        await self._writing_resumed.wait()
         self._transport.write(msg.encode() + b'\n')
 
     async def close(self):
@@ -97,8 +140,9 @@ class SubprocessConnection(StreamConnection):  # pragma: no cover
 async def connect_tcp(callbacks: ConnectionCallbacks,
                       host: str,
                       port: int,
+                      kind: ConnectionKind_ = 'TCP',
                       ) -> ConnectionImplBase:
-    factory = partial(StreamConnection, 'TCP', f'{host}:{port}', callbacks)
+    factory = partial(StreamConnection, kind, f'{host}:{port}', callbacks)
     _, protocol = await asyncio.get_event_loop().create_connection(factory, host, port)
     return protocol
 
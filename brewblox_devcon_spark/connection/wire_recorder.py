@@ -0,0 +1,107 @@
+"""
+Records all messages sent to and received from the controller.
+
+Recordings are a binary file, starting with a magic header.
+Each message is a record with a fixed-size prefix, followed by the UTF-8 encoded message.
+The prefix contains the record kind, the number of seconds since the start of the recording,
+and the length of the message.
+"""
+
+import logging
+import struct
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from time import monotonic
+from typing import BinaryIO, Generator
+
+from .. import utils
+
+MAGIC = b'BBXWIRE1'
+RECORD_PREFIX = struct.Struct('<BdI')
+
+LOGGER = logging.getLogger(__name__)
+
+CV: ContextVar['WireRecorder | None'] = ContextVar('wire_recorder.WireRecorder', default=None)
+
+
+class RecordKind(IntEnum):
+    REQUEST = 1
+    RESPONSE = 2
+    EVENT = 3
+
+
+@dataclass
+class WireRecord:
+    kind: RecordKind
+    timestamp: float
+    msg: str
+
+
+class WireRecorder:
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file: BinaryIO | None = None
+        self._start = 0.0
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open('wb')
+        self._file.write(MAGIC)
+        self._start = monotonic()
+        LOGGER.info(f'Recording controller messages to {self.path}')
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def write(self, kind: RecordKind, msg: str):
+        if self._file:
+            data = msg.encode()
+            self._file.write(RECORD_PREFIX.pack(kind, monotonic() - self._start, len(data)))
+            self._file.write(data)
+
+
+def read_records(path: Path) -> Generator[WireRecord, None, None]:
+    with path.open('rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a wire recording')
+
+        while len(prefix := f.read(RECORD_PREFIX.size)) == RECORD_PREFIX.size:
+            kind, timestamp, length = RECORD_PREFIX.unpack(prefix)
+            data = f.read(length)
+            if len(data) < length:
+                break  # The recording was interrupted
+            yield WireRecord(kind=RecordKind(kind),
+                             timestamp=timestamp,
+                             msg=data.decode())
+
+
+def record(kind: RecordKind, msg: str):
+    recorder = CV.get()
+    if recorder:
+        recorder.write(kind, msg)
+
+
+@asynccontextmanager
+async def lifespan():
+    recorder = CV.get()
+    if recorder:
+        recorder.open()
+    try:
+        yield
+    finally:
+        if recorder:
+            recorder.close()
+
+
+def setup():
+    config = utils.get_config()
+    if config.wire_recording:
+        CV.set(WireRecorder(config.wire_recording))
+    else:
+        CV.set(None)
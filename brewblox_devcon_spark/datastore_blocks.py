@@ -1,18 +1,57 @@
 """
 Stores sid/nid relations for blocks
+
+The relations are snapshotted to disk after they are synchronized with the controller,
+and again whenever they change.
+On reconnect or restart, the snapshot can be used instead of reading all names from the controller.
 """
+import hashlib
+import json
 import logging
 from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Iterable
 
 from bidict import OnDup, OnDupAction, bidict
 from httpx import AsyncClient
 
 from . import const, state_machine, utils
-from .models import DatastoreSingleQuery, TwinKeyEntriesBox
+from .models import (BlockNameSnapshot, DatastoreSingleQuery,
+                     TwinKeyEntriesBox)
 
 LOGGER = logging.getLogger(__name__)
 
-CV: ContextVar[bidict[str, int]] = ContextVar('datastore_blocks.bidict')
+CV: ContextVar['BlockStore'] = ContextVar('datastore_blocks.bidict')
+
+
+class BlockStore(bidict[str, int]):
+    """
+    A bidict that calls `on_change` after it is modified
+    by item assignment, item deletion, `update()`, or `clear()`.
+    """
+    on_change: Callable[[], None] | None = None
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def __setitem__(self, key: str, val: int):
+        changed = self.get(key) != val
+        super().__setitem__(key, val)
+        if changed:
+            self._changed()
+
+    def __delitem__(self, key: str):
+        super().__delitem__(key)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
 
 
 def get_legacy_redis_block_db_name() -> str:  # pragma: no cover
@@ -31,41 +70,112 @@ def get_legacy_redis_block_db_name() -> str:  # pragma: no cover
         return f'{desc.controller.device.device_id}-blocks-db'
 
 
-async def extract_legacy_redis_block_names() -> list[tuple[str, int]]:  # pragma: no cover
+async def extract_legacy_redis_block_names(client: AsyncClient) -> list[tuple[str, int]]:  # pragma: no cover
     """
     Block names were historically stored in Redis.
     To migrate the stored block names to the controller we must do a one-time
     load of the old name table.
+
+    Datastore errors are retried until the caller cancels.
+    A response without a valid name table yields an empty list.
     """
-    config = utils.get_config()
-    client = AsyncClient(base_url=config.datastore_url)
-    data: list[tuple[str, int]] = []
+    query = DatastoreSingleQuery(id=get_legacy_redis_block_db_name(),
+                                 namespace=const.SERVICE_NAMESPACE)
+    content = query.model_dump(mode='json')
+    resp = await utils.httpx_retry(lambda: client.post('/get', json=content))
 
     try:
-        query = DatastoreSingleQuery(id=get_legacy_redis_block_db_name(),
-                                     namespace=const.SERVICE_NAMESPACE)
-        content = query.model_dump(mode='json')
-        resp = await utils.httpx_retry(lambda: client.post('/get', json=content))
         box = TwinKeyEntriesBox.model_validate_json(resp.text)
-        data = [entry.keys for entry in box.value.data]
+        return [entry.keys for entry in box.value.data]
     except Exception:
-        pass
-
-    return data
+        return []
 
 
-async def remove_legacy_redis_block_names():  # pragma: no cover
-    config = utils.get_config()
-    client = AsyncClient(base_url=config.datastore_url)
-
+async def remove_legacy_redis_block_names(client: AsyncClient):  # pragma: no cover
     query = DatastoreSingleQuery(id=get_legacy_redis_block_db_name(),
                                  namespace=const.SERVICE_NAMESPACE)
     content = query.model_dump(mode='json')
     await client.post('/delete', json=content)
 
 
+def get_legacy_marker_path() -> Path:
+    config = utils.get_config()
+    return config.backup_root_dir / '.names' / f'{get_legacy_redis_block_db_name()}.migrated'
+
+
+def is_legacy_migrated() -> bool:
+    return get_legacy_marker_path().exists()
+
+
+def set_legacy_migrated():
+    path = get_legacy_marker_path()
+    path.parent.mkdir(mode=0o777, parents=True, exist_ok=True)
+    path.touch()
+
+
+def name_table_digest(names: Iterable[tuple[str, int]]) -> str:
+    content = json.dumps(sorted((sid, nid) for sid, nid in names))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_snapshot_path() -> Path:
+    config = utils.get_config()
+    return config.backup_root_dir / '.names' / f'{config.name}.json'
+
+
+def load_snapshot() -> BlockNameSnapshot | None:
+    """
+    Reads the last saved name table.
+    Returns None if snapshots are disabled, or no valid snapshot exists.
+    """
+    config = utils.get_config()
+    path = get_snapshot_path()
+
+    if not config.name_snapshot or not path.exists():
+        return None
+
+    try:
+        snapshot = BlockNameSnapshot.model_validate_json(path.read_text())
+    except Exception as ex:
+        LOGGER.warning(f'Failed to read block name snapshot: {utils.strex(ex)}')
+        return None
+
+    if snapshot.digest != name_table_digest(snapshot.names):
+        LOGGER.warning('Discarding block name snapshot with invalid digest')
+        return None
+
+    return snapshot
+
+
+def save_snapshot(device_id: str, boot_time: float) -> BlockNameSnapshot | None:
+    """
+    Writes the current name table to disk.
+    The file is replaced atomically, to prevent partial snapshots from being read.
+    """
+    config = utils.get_config()
+    if not config.name_snapshot:
+        return None
+
+    names = list(CV.get().items())
+    snapshot = BlockNameSnapshot(device_id=device_id,
+                                 boot_time=boot_time,
+                                 digest=name_table_digest(names),
+                                 names=names)
+
+    path = get_snapshot_path()
+    path.parent.mkdir(mode=0o777, parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(snapshot.model_dump_json())
+    tmp.replace(path)
+    return snapshot
+
+
+def remove_snapshot():
+    get_snapshot_path().unlink(missing_ok=True)
+
+
 def setup():
-    bd = bidict()
+    bd = BlockStore()
     bd.on_dup = OnDup(key=OnDupAction.DROP_OLD,
                       val=OnDupAction.DROP_OLD)
     CV.set(bd)
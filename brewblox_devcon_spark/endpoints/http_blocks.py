@@ -2,14 +2,19 @@
 REST endpoints for Spark blocks
 """
 
+import asyncio
 import logging
+from typing import Awaitable, Callable, TypeVar
 
 from fastapi import APIRouter
 
-from .. import mqtt, spark_api, utils
+from .. import exceptions, mqtt, spark_api, utils
 from ..models import (Block, BlockIdentity, BlockNameChange, ServicePatchEvent,
                       ServicePatchEventData)
 
+ArgT = TypeVar('ArgT', Block, BlockIdentity)
+ResultT = TypeVar('ResultT', Block, BlockIdentity)
+
 LOGGER = logging.getLogger(__name__)
 
 router = APIRouter(prefix='/blocks', tags=['Blocks'])
@@ -21,6 +26,9 @@ def publish(changed: list[Block] = None,
     mqtt_client = mqtt.CV.get()
     changed = changed or []
     deleted = [v.id for v in (deleted or [])]
+
+    if not changed and not deleted:
+        return
     mqtt_client.publish(f'{config.state_topic}/{config.name}/patch',
                         ServicePatchEvent(
                             key=config.name,
@@ -30,6 +38,67 @@ def publish(changed: list[Block] = None,
                         ).model_dump(mode='json'))
 
 
+def _block_keys(item: Block | BlockIdentity) -> set[str | int]:
+    return {key for key in [item.id, item.nid] if key}
+
+
+def _block_links(item: Block | BlockIdentity) -> set[str | int]:
+    links = set()
+
+    def collect(v):
+        links.add(v)
+        return v
+
+    if isinstance(item, Block):
+        spark_api.resolve_data_ids(item.data, collect)
+    return links
+
+
+async def run_batch(func: Callable[[ArgT], Awaitable[ResultT]],
+                    args: list[ArgT],
+                    ) -> tuple[list[ResultT | None], list[Exception | None]]:
+    """
+    Calls `func` for all items in `args`, and returns results and errors in order.
+    Both lists have an entry for every item, which is None if not applicable.
+
+    Items are submitted concurrently, with at most `batch_concurrency` active calls.
+    Items wait for earlier items with the same block ID,
+    and for earlier items with the ID of a block they link to.
+    All items are completed, even if some fail.
+    """
+    config = utils.get_config()
+    sem = asyncio.Semaphore(config.batch_concurrency)
+    latest: dict[str | int, asyncio.Task] = {}
+    tasks: list[asyncio.Task] = []
+
+    async def run(item: ArgT, deps: list[asyncio.Task]) -> ResultT:
+        if deps:
+            await asyncio.wait(deps)
+        async with sem:
+            return await func(item)
+
+    for item in args:
+        keys = _block_keys(item)
+        deps = [latest[key] for key in keys | _block_links(item) if key in latest]
+        task = asyncio.create_task(run(item, deps))
+        latest.update({key: task for key in keys})
+        tasks.append(task)
+
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    results = [None if isinstance(v, BaseException) else v for v in outcomes]
+    errors = [v if isinstance(v, BaseException) else None for v in outcomes]
+    return results, errors
+
+
+def succeeded(results: list[ResultT | None]) -> list[ResultT]:
+    return [v for v in results if v is not None]
+
+
+def check_batch(results: list[ResultT | None], errors: list[Exception | None]):
+    if any(errors):
+        raise exceptions.BatchException(results, errors)
+
+
 @router.post('/create', status_code=201)
 async def blocks_create(args: Block) -> Block:
     """
@@ -41,11 +110,12 @@ async def blocks_create(args: Block) -> Block:
 
 
 @router.post('/read')
-async def blocks_read(args: BlockIdentity) -> Block:
+async def blocks_read(args: BlockIdentity, max_age: float = 0) -> Block:
     """
     Read existing block.
+    If `max_age` is set, the block may be up to `max_age` seconds old.
     """
-    block = await spark_api.CV.get().read_block(args)
+    block = await spark_api.CV.get().read_block(args, max_age)
     return block
 
 
@@ -103,20 +173,21 @@ async def blocks_batch_create(args: list[Block]) -> list[Block]:
     Create multiple new blocks.
     """
     api = spark_api.CV.get()
-    blocks = [await api.create_block(block)
-              for block in args]
-    publish(changed=blocks)
+    blocks, errors = await run_batch(api.create_block, args)
+    publish(changed=succeeded(blocks))
+    check_batch(blocks, errors)
     return blocks
 
 
 @router.post('/batch/read')
-async def blocks_batch_read(args: list[BlockIdentity]) -> list[Block]:
+async def blocks_batch_read(args: list[BlockIdentity], max_age: float = 0) -> list[Block]:
     """
     Read multiple existing blocks.
+    If `max_age` is set, blocks may be up to `max_age` seconds old.
     """
     api = spark_api.CV.get()
-    blocks = [await api.read_block(ident)
-              for ident in args]
+    blocks, errors = await run_batch(lambda ident: api.read_block(ident, max_age), args)
+    check_batch(blocks, errors)
     return blocks
 
 
@@ -126,9 +197,9 @@ async def blocks_batch_write(args: list[Block]) -> list[Block]:
     Write multiple existing blocks. This will replace all fields.
     """
     api = spark_api.CV.get()
-    blocks = [await api.write_block(block)
-              for block in args]
-    publish(changed=blocks)
+    blocks, errors = await run_batch(api.write_block, args)
+    publish(changed=succeeded(blocks))
+    check_batch(blocks, errors)
     return blocks
 
 
@@ -138,9 +209,9 @@ async def blocks_batch_patch(args: list[Block]) -> list[Block]:
     Write multiple existing blocks. This will only replace provided fields.
     """
     api = spark_api.CV.get()
-    blocks = [await api.patch_block(block)
-              for block in args]
-    publish(changed=blocks)
+    blocks, errors = await run_batch(api.patch_block, args)
+    publish(changed=succeeded(blocks))
+    check_batch(blocks, errors)
     return blocks
 
 
@@ -150,18 +221,19 @@ async def blocks_batch_delete(args: list[BlockIdentity]) -> list[BlockIdentity]:
     Delete multiple existing user blocks.
     """
     api = spark_api.CV.get()
-    idents = [await api.delete_block(ident)
-              for ident in args]
-    publish(deleted=idents)
+    idents, errors = await run_batch(api.delete_block, args)
+    publish(deleted=succeeded(idents))
+    check_batch(idents, errors)
     return idents
 
 
 @router.post('/all/read')
-async def blocks_all_read() -> list[Block]:
+async def blocks_all_read(max_age: float = 0) -> list[Block]:
     """
     Read all existing blocks.
+    If `max_age` is set, blocks may be up to `max_age` seconds old.
     """
-    blocks = await spark_api.CV.get().read_all_blocks()
+    blocks = await spark_api.CV.get().read_all_blocks(max_age)
     return blocks
 
 
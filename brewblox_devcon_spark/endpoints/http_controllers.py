@@ -0,0 +1,22 @@
+"""
+REST endpoints for the controllers hosted in multi-controller mode
+"""
+
+import logging
+
+from fastapi import APIRouter
+
+from .. import multi_controller
+from ..models import ControllerSummary
+
+LOGGER = logging.getLogger(__name__)
+
+router = APIRouter(prefix='/controllers', tags=['Controllers'])
+
+
+@router.get('')
+async def controllers_get() -> list[ControllerSummary]:
+    """
+    Get name, status, and memory usage for all hosted controllers.
+    """
+    return [controller.summary() for controller in multi_controller.CV.get()]
@@ -6,9 +6,11 @@ import logging
 
 from fastapi import APIRouter
 
-from .. import codec
-from ..models import (DecodedPayload, EncodedMessage, EncodedPayload,
-                      IntermediateRequest, IntermediateResponse)
+from .. import codec, command, connection, spark_api
+from ..models import (BlockCacheStats, CodecCacheStats, CommandLatency,
+                      CommandStats, DecodedPayload, DispatchStats,
+                      EncodedMessage, EncodedPayload, IntermediateRequest,
+                      IntermediateResponse)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -97,3 +99,75 @@ async def debug_decode_payload(args: EncodedPayload) -> DecodedPayload:
     """
     payload = codec.CV.get().decode_payload(args)
     return payload
+
+
+@router.get('/command_latency')
+async def debug_command_latency() -> dict[str, CommandLatency]:
+    """
+    Get controller command latency in seconds per priority class.
+
+    Latency includes time spent waiting for other commands to complete.
+    Percentiles are calculated over the most recent commands.
+    """
+    return command.CV.get().scheduler.latency()
+
+
+@router.get('/command_stats')
+async def debug_command_stats() -> CommandStats:
+    """
+    Get the number of active and queued controller commands.
+
+    `coalesced_reads` is the number of controller round trips saved
+    by sharing the result of identical concurrent reads.
+    """
+    cmder = command.CV.get()
+    return CommandStats(
+        in_flight=cmder.scheduler.in_flight,
+        waiting=cmder.scheduler.waiting,
+        coalesced_reads=cmder.coalesced_reads,
+    )
+
+
+@router.get('/discovery_times')
+async def debug_discovery_times() -> dict[str, float]:
+    """
+    Get the time in seconds it took to discover the controller, per discovery method.
+
+    Only the most recent successful discovery per method is included.
+    """
+    return connection.CV.get().discovery_times
+
+
+@router.get('/dispatch')
+async def debug_dispatch() -> dict[str, DispatchStats]:
+    """
+    Get queue depth and dispatch latency for received messages, per message class.
+
+    Latency is the time in seconds between a message being received, and its handler returning.
+    Only stream connections queue received messages.
+    """
+    return {
+        k: v.stats()
+        for k, v in connection.CV.get().dispatch_metrics.items()
+    }
+
+
+@router.get('/block_cache')
+async def debug_block_cache() -> BlockCacheStats:
+    """
+    Get block cache statistics.
+
+    Only reads with a `max_age` count as hits or misses.
+    Hit ages are the age in seconds of the cached data that was returned.
+    """
+    return spark_api.CV.get().cache.stats()
+
+
+@router.get('/codec_cache')
+async def debug_codec_cache() -> CodecCacheStats:
+    """
+    Get statistics for the cache of decoded block payloads.
+
+    The cache is cleared when the user temperature unit changes.
+    """
+    return codec.CV.get().cache.stats()
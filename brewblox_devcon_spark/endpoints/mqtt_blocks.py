@@ -4,8 +4,8 @@ MQTT endpoints for Spark blocks
 
 import logging
 
-from .. import mqtt, spark_api, utils
-from ..models import Block, BlockIdentity
+from .. import command_scheduler, mqtt, spark_api, utils
+from ..models import Block, BlockIdentity, CommandPriority
 
 LOGGER = logging.getLogger(__name__)
 
@@ -19,22 +19,26 @@ def setup():
     async def on_create(client, topic, payload, qos, properties):
         block = Block.model_validate_json(payload)
         if block.serviceId == config.name:
-            await api.create_block(block)
+            with command_scheduler.priority(CommandPriority.CONTROL):
+                await api.create_block(block)
 
     @mqtt_client.subscribe(config.blocks_topic + '/write')
     async def on_write(client, topic, payload, qos, properties):
         block = Block.model_validate_json(payload)
         if block.serviceId == config.name:
-            await api.write_block(block)
+            with command_scheduler.priority(CommandPriority.CONTROL):
+                await api.write_block(block)
 
     @mqtt_client.subscribe(config.blocks_topic + '/patch')
     async def on_patch(client, topic, payload, qos, properties):
         block = Block.model_validate_json(payload)
         if block.serviceId == config.name:
-            await api.patch_block(block)
+            with command_scheduler.priority(CommandPriority.CONTROL):
+                await api.patch_block(block)
 
     @mqtt_client.subscribe(config.blocks_topic + '/delete')
     async def on_delete(client, topic, payload, qos, properties):
         ident = BlockIdentity.model_validate_json(payload)
         if ident.serviceId == config.name:
-            await api.delete_block(ident)
+            with command_scheduler.priority(CommandPriority.CONTROL):
+                await api.delete_block(ident)
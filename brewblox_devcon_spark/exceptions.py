@@ -6,6 +6,8 @@ This improves clarity as to what actually went wrong.
 
 from fastapi import HTTPException, status
 
+from . import utils
+
 
 class BrewbloxException(HTTPException):
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -28,6 +30,24 @@ class MissingInput(InvalidInput):
     pass
 
 
+class BatchException(BrewbloxException):
+    """
+    One or more items in a batch request failed.
+    `results` and `errors` have an entry for every item.
+    `results` is None for items that failed, and `errors` is None for items that succeeded.
+    The status code is that of the first failed item.
+    """
+
+    def __init__(self, results: list, errors: list[Exception | None]) -> None:
+        self.results = results
+        self.errors = [utils.strex(ex) if ex is not None else None
+                       for ex in errors]
+        failed = [ex for ex in errors if ex is not None]
+        first = self.errors[errors.index(failed[0])]
+        super().__init__(f'{len(failed)} of {len(errors)} batch items failed, first error: {first}')
+        self.status_code = getattr(failed[0], 'status_code', status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 ##################################################################################################
 # ID exceptions
 ##################################################################################################
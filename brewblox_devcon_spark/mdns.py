@@ -1,17 +1,24 @@
 """
 mDNS discovery of Spark devices
+
+After setup(), a long-lived browser is kept for every queried service type.
+Browsers cache discovered devices, and answer queries from the cache first.
+Without setup(), every query uses a temporary browser.
 """
 
 import asyncio
 import logging
 from collections import namedtuple
-from contextlib import suppress
+from contextlib import aclosing, asynccontextmanager, suppress
+from contextvars import ContextVar
 from datetime import timedelta
 from socket import AF_INET, inet_aton, inet_ntoa
+from time import monotonic
 from typing import AsyncGenerator
 
 from aiozeroconf import ServiceBrowser, ServiceStateChange, Zeroconf
-from aiozeroconf.aiozeroconf import ServiceInfo
+
+from . import utils
 
 SIM_ADDR = inet_aton('0.0.0.0')
 
@@ -19,43 +26,141 @@ LOGGER = logging.getLogger(__name__)
 
 ConnectInfo = namedtuple('ConnectInfo', ['address', 'port', 'id'])
 
+CV: ContextVar[dict[str, 'MdnsBrowser'] | None] = ContextVar('mdns.browsers', default=None)
+
+
+class MdnsBrowser:
+    """
+    Keeps track of all devices that announce service `dns_type`.
+
+    Cached devices are removed when they announce their removal.
+    Cached devices older than `ttl` are not used until they are resolved again.
+    """
+
+    def __init__(self, dns_type: str, ttl: timedelta):
+        self.dns_type = dns_type
+        self._ttl = ttl.total_seconds()
+        self._conf: Zeroconf | None = None
+        self._entries: dict[str, tuple[ConnectInfo, float]] = {}
+        self._listeners: set[asyncio.Queue[ConnectInfo]] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self):
+        if self._conf is None:
+            self._conf = Zeroconf(asyncio.get_running_loop(), address_family=[AF_INET])
+            ServiceBrowser(self._conf, self.dns_type, handlers=[self._on_change])
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        if self._conf is not None:
+            await self._conf.close()
+            self._conf = None
+        self._entries.clear()
+
+    def _resolve(self, service_type: str, name: str):
+        task = asyncio.create_task(self._add(service_type, name))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _on_change(self, _, service_type: str, name: str, state_change: ServiceStateChange):
+        if state_change is ServiceStateChange.Added:
+            self._resolve(service_type, name)
+        elif state_change is ServiceStateChange.Removed:
+            self._entries.pop(name, None)
+
+    async def _add(self, service_type: str, name: str):
+        try:
+            info = await self._conf.get_service_info(service_type, name)
+        except Exception as ex:
+            LOGGER.debug(f'Failed to resolve {name}: {utils.strex(ex)}')
+            return
+
+        if info is None:
+            self._entries.pop(name, None)
+            return
+
+        if info.address in [None, SIM_ADDR]:
+            return  # discard unknown addresses and simulators
+
+        addr = inet_ntoa(info.address)
+        id = info.properties.get(b'ID', b'').decode().lower()
+
+        if not id:
+            LOGGER.error(f'Invalid device: {info.name} @ {addr}:{info.port} has no ID TXT property')
+            return
+
+        entry = ConnectInfo(addr, info.port, id)
+        if name not in self._entries:
+            LOGGER.info(f'Discovered {id} @ {addr}:{info.port}')
+
+        self._entries[name] = (entry, monotonic() + self._ttl)
+        for queue in self._listeners:
+            queue.put_nowait(entry)
+
+    def cached(self) -> list[ConnectInfo]:
+        """
+        Returns all cached devices that are not expired.
+        Expired devices are resolved again.
+        """
+        now = monotonic()
+        valid: list[ConnectInfo] = []
+
+        for name, (entry, expires) in self._entries.items():
+            if expires > now:
+                valid.append(entry)
+            else:
+                self._resolve(self.dns_type, name)
 
-async def _discover(
-    desired_id: str | None,
-    dns_type: str,
-) -> AsyncGenerator[ConnectInfo, None]:
-    queue: asyncio.Queue[ServiceInfo] = asyncio.Queue()
-    conf = Zeroconf(asyncio.get_event_loop(), address_family=[AF_INET])
+        return valid
 
-    async def add_service(service_type, name):
-        info = await conf.get_service_info(service_type, name)
-        await queue.put(info)
+    async def discover(self, desired_id: str | None) -> AsyncGenerator[ConnectInfo, None]:
+        """
+        Yields matching cached devices, and then waits for new announcements.
+        Every device is yielded at most once.
+        """
+        self.start()
+        queue: asyncio.Queue[ConnectInfo] = asyncio.Queue()
+        self._listeners.add(queue)
+        seen: set[ConnectInfo] = set()
 
-    def sync_change_handler(_, service_type, name, state_change):
-        if state_change is ServiceStateChange.Added:
-            asyncio.create_task(add_service(service_type, name))
+        try:
+            for entry in self.cached():
+                queue.put_nowait(entry)
 
-    try:
-        ServiceBrowser(conf, dns_type, handlers=[sync_change_handler])
-
-        while True:
-            info = await queue.get()
-            if info.address in [None, SIM_ADDR]:
-                continue  # discard unknown addresses and simulators
-
-            addr = inet_ntoa(info.address)
-            id = info.properties.get(b'ID', b'').decode().lower()
-
-            if not id:
-                LOGGER.error(f'Invalid device: {info.name} @ {addr}:{info.port} has no ID TXT property')
-                continue
-            elif desired_id is None or desired_id.lower() == id:
-                LOGGER.info(f'Discovered {id} @ {addr}:{info.port}')
-                yield ConnectInfo(addr, info.port, id)
-            else:
-                LOGGER.info(f'Discarding {info.name} @ {addr}:{info.port}')
-    finally:
-        await conf.close()
+            while True:
+                entry = await queue.get()
+                if entry in seen:
+                    continue
+                seen.add(entry)
+
+                if desired_id is None or desired_id.lower() == entry.id:
+                    yield entry
+                else:
+                    LOGGER.debug(f'Discarding {entry.id} @ {entry.address}:{entry.port}')
+
+        finally:
+            self._listeners.discard(queue)
+
+
+@asynccontextmanager
+async def _browser(dns_type: str) -> AsyncGenerator[MdnsBrowser, None]:
+    config = utils.get_config()
+    browsers = CV.get()
+
+    if browsers is None:
+        browser = MdnsBrowser(dns_type, config.mdns_cache_ttl)
+        try:
+            yield browser
+        finally:
+            await browser.close()
+        return
+
+    if dns_type not in browsers:
+        browsers[dns_type] = MdnsBrowser(dns_type, config.mdns_cache_ttl)
+    yield browsers[dns_type]
 
 
 async def discover_all(
@@ -63,10 +168,19 @@ async def discover_all(
     dns_type: str,
     timeout: timedelta,
 ) -> AsyncGenerator[ConnectInfo, None]:
-    with suppress(asyncio.TimeoutError):
-        async with asyncio.timeout(timeout.total_seconds()):
-            async for res in _discover(desired_id, dns_type):  # pragma: no branch
+    async with _browser(dns_type) as browser, aclosing(browser.discover(desired_id)) as gen:
+        # Only wait for new announcements if no matching devices are cached
+        cached = [entry for entry in browser.cached()
+                  if desired_id is None or desired_id.lower() == entry.id]
+        if cached:
+            for res in cached:
                 yield res
+            return
+
+        with suppress(asyncio.TimeoutError):
+            async with asyncio.timeout(timeout.total_seconds()):
+                async for res in gen:  # pragma: no branch
+                    yield res
 
 
 async def discover_one(
@@ -74,6 +188,20 @@ async def discover_one(
     dns_type: str,
     timeout: timedelta,
 ) -> ConnectInfo:
-    async with asyncio.timeout(timeout.total_seconds()):
-        async for res in _discover(desired_id, dns_type):  # pragma: no branch
-            return res
+    async with _browser(dns_type) as browser, aclosing(browser.discover(desired_id)) as gen:
+        async with asyncio.timeout(timeout.total_seconds()):
+            async for res in gen:  # pragma: no branch
+                return res
+
+
+@asynccontextmanager
+async def lifespan():
+    try:
+        yield
+    finally:
+        for browser in (CV.get() or {}).values():
+            await browser.close()
+
+
+def setup():
+    CV.set({})
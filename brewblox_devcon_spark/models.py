@@ -173,6 +173,14 @@ class MaskMode(enum.Enum):
     EXCLUSIVE = 2
 
 
+class CommandPriority(enum.Enum):
+    # Ordered from highest to lowest priority
+    INTERACTIVE = 0
+    CONTROL = 1
+    BROADCAST = 2
+    MAINTENANCE = 3
+
+
 def parse_enum(cls: type[enum.Enum], v: Any):
     """Return enum value if `v` matches either name or value"""
     try:
@@ -204,6 +212,11 @@ class ServiceConfig(BaseSettings):
     trace: bool = False
     debugger: bool = False
 
+    # Multi-controller options
+    # Maps controller names to their option overrides.
+    # If set, a separate controller stack is created for each controller.
+    controllers: dict[str, dict[str, Any]] = Field(default_factory=dict)
+
     # MQTT options
     mqtt_protocol: Literal['mqtt', 'mqtts'] = 'mqtt'
     mqtt_host: str = 'eventbus'
@@ -225,6 +238,7 @@ class ServiceConfig(BaseSettings):
     datastore_path: str = '/history/datastore'
 
     datastore_fetch_timeout: timedelta_field = timedelta(minutes=5)
+    datastore_migration_timeout: timedelta_field = timedelta(seconds=30)
     datastore_flush_delay: timedelta_field = timedelta(seconds=5)
     datastore_shutdown_timeout: timedelta_field = timedelta(seconds=2)
 
@@ -239,6 +253,13 @@ class ServiceConfig(BaseSettings):
     usb_proxy_port: int = 5000
 
     mock: bool = False
+    mock_link: bool = False
+    mock_link_rtt: timedelta_field = timedelta(milliseconds=20)
+    mock_link_jitter: timedelta_field = timedelta()
+    mock_link_bandwidth: int = 0  # bytes per second, 0 is unlimited
+    mock_link_chunk_size: int = 1024
+    mock_link_drop_rate: float = 0
+    mock_processing_time: dict[Opcode_field, timedelta_field] = Field(default_factory=dict)
 
     simulation: bool = False
     simulation_port: int = 0  # any free port
@@ -254,15 +275,36 @@ class ServiceConfig(BaseSettings):
     discovery_timeout: timedelta_field = timedelta(minutes=2)
     discovery_timeout_mqtt: timedelta_field = timedelta(seconds=3)
     discovery_timeout_mdns: timedelta_field = timedelta(seconds=20)
+    discovery_timeout_last: timedelta_field = timedelta(seconds=5)
+
+    mdns_cache_ttl: timedelta_field = timedelta(minutes=5)
 
     subprocess_connect_interval: timedelta_field = timedelta(milliseconds=200)
     subprocess_connect_timeout: timedelta_field = timedelta(seconds=10)
 
     handshake_timeout: timedelta_field = timedelta(minutes=2)
     handshake_ping_interval: timedelta_field = timedelta(seconds=2)
+    handshake_ping_interval_min: timedelta_field = timedelta(milliseconds=50)
+    handshake_ping_backoff: float = 2
+
+    dispatch_queue_size: int = 100
+
+    wire_recording: Path | None = None
+    wire_replay: Path | None = None
+    wire_replay_speed: float = 1  # 0 is as fast as possible
+
+    mqtt_reassembly_size: int = 32
+    mqtt_reassembly_timeout: timedelta_field = timedelta(seconds=20)
 
     # Command options
     command_timeout: timedelta_field = timedelta(seconds=20)
+    command_window: int = 4
+    batch_concurrency: int = 8
+
+    # Codec options
+    codec_direct_encode: bool = True
+    codec_direct_decode: bool = True
+    codec_cache_size: int = 512
 
     # Broadcast options
     broadcast_interval: timedelta_field = timedelta(seconds=5)
@@ -275,6 +317,10 @@ class ServiceConfig(BaseSettings):
     backup_retry_interval: timedelta_field = timedelta(minutes=5)
     backup_root_dir: Path = Path('./backup')
 
+    # Block name snapshot options
+    name_snapshot: bool = True
+    name_snapshot_reboot_margin: timedelta_field = timedelta(seconds=30)
+
     # Time sync options
     time_sync_interval: timedelta_field = timedelta(minutes=15)
     time_sync_retry_interval: timedelta_field = timedelta(seconds=10)
@@ -390,6 +436,46 @@ class DecodedResponse(BaseResponse):
     payload: list[DecodedPayload]
 
 
+class CommandLatency(BaseModel):
+    count: int
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+
+class CommandStats(BaseModel):
+    in_flight: int
+    waiting: int
+    coalesced_reads: int
+
+
+class DispatchStats(BaseModel):
+    depth: int
+    max_depth: int
+    dispatched: int
+    latency_avg: float  # seconds
+    latency_max: float  # seconds
+
+
+class CodecCacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class BlockCacheStats(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    age: float | None  # seconds since all blocks were read
+    hit_age_mean: float  # seconds
+    hit_age_max: float  # seconds
+
+
 class EncodedMessage(BaseModel):
     message: str
 
@@ -490,6 +576,15 @@ IdentityError_ = Literal[
 ]
 
 
+class SynchronizationTimes(BaseModel):
+    # All values are in seconds
+    handshake: float | None = None  # CONNECTED to ACKNOWLEDGED
+    sysinfo: float | None = None  # ACKNOWLEDGED to controller settings synchronized
+    block_names: float | None = None  # ACKNOWLEDGED to block names synchronized
+    synchronized: float | None = None  # CONNECTED to SYNCHRONIZED
+    startup: float | None = None  # service startup to first SYNCHRONIZED
+
+
 class StatusDescription(BaseModel):
     enabled: bool
     service: ServiceDescription
@@ -501,6 +596,13 @@ class StatusDescription(BaseModel):
     connection_status: ConnectionStatus_
     firmware_error: FirmwareError_ | None = None
     identity_error: IdentityError_ | None = None
+    sync_times: SynchronizationTimes | None = None
+
+
+class ControllerSummary(BaseModel):
+    name: str
+    status: StatusDescription
+    memory: int  # bytes added to process RSS during controller startup
 
 
 class BlockRelation(BaseModel):
@@ -538,6 +640,13 @@ class BackupApplyResult(BaseModel):
     messages: list[str]
 
 
+class BlockNameSnapshot(BaseModel):
+    device_id: str
+    boot_time: float  # UNIX timestamp, derived from controller uptime
+    digest: str
+    names: list[tuple[str, int]]
+
+
 class AutoconnectSettings(BaseModel):
     enabled: bool
 
@@ -545,6 +654,8 @@ class AutoconnectSettings(BaseModel):
 class ErrorResponse(BaseModel):
     error: str
     validation: list | None = None
+    results: list | None = None  # per item in batch requests
+    errors: list[str | None] | None = None  # per item in batch requests
     traceback: list[str] | None = None
 
 
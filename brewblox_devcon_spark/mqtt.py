@@ -1,6 +1,7 @@
+import asyncio
 import json
 from contextlib import asynccontextmanager
-from contextvars import ContextVar
+from contextvars import Context, ContextVar
 
 from fastapi_mqtt.config import MQTTConfig
 from fastapi_mqtt.fastmqtt import FastMQTT
@@ -9,6 +10,36 @@ from . import utils
 
 CV: ContextVar[FastMQTT] = ContextVar('mqtt.client')
 
+# Set in multi-controller mode.
+# Handlers subscribed in a controller context are called in that context.
+CONTEXT: ContextVar[Context | None] = ContextVar('mqtt.context', default=None)
+
+
+class ContextFastMQTT(FastMQTT):
+    """
+    FastMQTT client that can be shared between controller contexts.
+
+    Message handlers are normally called in the context of the client.
+    If a handler is subscribed in a controller context,
+    it is called in a copy of that context instead.
+    """
+
+    def subscribe(self, *topics: str, **kwargs):
+        decorator = super().subscribe(*topics, **kwargs)
+        ctx = CONTEXT.get()
+
+        if ctx is None:
+            return decorator
+
+        def subscribe_handler(handler):
+            async def wrapper(*args):
+                return await asyncio.create_task(handler(*args), context=ctx.copy())
+
+            decorator(wrapper)
+            return handler
+
+        return subscribe_handler
+
 
 def setup():
     config = utils.get_config()
@@ -22,7 +53,7 @@ def setup():
                                  'type': 'Spark.state',
                                  'data': None,
                              }))
-    fmqtt = FastMQTT(config=mqtt_config)
+    fmqtt = ContextFastMQTT(config=mqtt_config)
     CV.set(fmqtt)
 
 
@@ -0,0 +1,133 @@
+"""
+Hosts multiple independent controller stacks in a single service process.
+
+Modules store their singletons in ContextVars.
+Each controller gets its own context, with its own config and singletons.
+The MQTT client, codec, and unit registry are created once,
+and are shared by all controllers.
+
+HTTP requests for a controller are handled in a copy of its context,
+and MQTT message handlers are called in the context where they were subscribed.
+"""
+
+import asyncio
+import logging
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import AsyncContextManager, AsyncGenerator, Callable
+
+from fastapi import FastAPI
+
+from . import mqtt, state_machine, utils
+from .models import ControllerSummary, ServiceConfig
+
+LOGGER = logging.getLogger(__name__)
+
+CV: ContextVar[list['Controller']] = ContextVar('multi_controller.controllers')
+
+
+def controller_configs(base: ServiceConfig) -> list[ServiceConfig]:
+    """
+    Creates a config for every controller declared in `base.controllers`.
+    Controller configs inherit all values from `base`,
+    and then apply the overrides declared for the controller.
+    """
+    configs: list[ServiceConfig] = []
+    values = base.model_dump(exclude={'controllers', *type(base).model_computed_fields})
+
+    for name, overrides in base.controllers.items():
+        config = type(base)(**{**values,
+                               'simulation_port': 0,
+                               'simulation_display_port': 0,
+                               **overrides,
+                               'name': name})
+        configs.append(utils.resolve_config_defaults(config))
+
+    return configs
+
+
+class Controller:
+    """
+    A single controller stack, and the context in which it runs.
+
+    `factory` is called in the controller context,
+    and should call all setup functions and return the app with controller endpoints.
+    The controller itself is an ASGI app that handles requests in the controller context.
+    """
+
+    def __init__(self,
+                 config: ServiceConfig,
+                 factory: Callable[[], FastAPI]):
+        self.config = config
+        self.context: Context = copy_context()
+        self.memory = 0
+
+        rss = utils.get_rss()
+        self.app: FastAPI = self.context.run(self._setup, factory)
+        self.memory = utils.get_rss() - rss
+
+    def _setup(self, factory: Callable[[], FastAPI]) -> FastAPI:
+        utils.CONFIG.set(self.config)
+        mqtt.CONTEXT.set(self.context)
+        return factory()
+
+    def summary(self) -> ControllerSummary:
+        return ControllerSummary(
+            name=self.config.name,
+            status=self.context.run(state_machine.CV.get).desc(),
+            memory=self.memory,
+        )
+
+    async def __call__(self, scope, receive, send):
+        await asyncio.create_task(self.app(scope, receive, send),
+                                  context=self.context.copy())
+
+    @asynccontextmanager
+    async def lifespan(self, func: Callable[[], AsyncContextManager]) -> AsyncGenerator[None, None]:
+        """
+        Runs the `func` lifespan in the controller context.
+        """
+        started = asyncio.Event()
+        stopped = asyncio.Event()
+        rss = utils.get_rss()
+
+        async def run():
+            async with func():
+                started.set()
+                await stopped.wait()
+
+        task = asyncio.create_task(run(), context=self.context)
+        waiter = asyncio.create_task(started.wait())
+
+        try:
+            await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                task.result()  # raises startup errors
+
+            self.memory += utils.get_rss() - rss
+            LOGGER.info(f'Started controller {self.config.name} (+{self.memory // 1024} kB)')
+            yield
+
+        finally:
+            waiter.cancel()
+            stopped.set()
+            await asyncio.wait([task])
+            if not task.cancelled() and task.exception():
+                LOGGER.error(f'Controller {self.config.name} failed: {utils.strex(task.exception())}')
+
+
+@asynccontextmanager
+async def lifespan(func: Callable[[], AsyncContextManager]) -> AsyncGenerator[None, None]:
+    """
+    Runs the `func` lifespan for all controllers.
+    Controllers are started one at a time, to measure their memory usage.
+    """
+    async with AsyncExitStack() as stack:
+        for controller in CV.get():
+            await stack.enter_async_context(controller.lifespan(func))
+        yield
+
+
+def setup(factory: Callable[[], FastAPI]):
+    base = utils.get_config()
+    CV.set([Controller(config, factory) for config in controller_configs(base)])
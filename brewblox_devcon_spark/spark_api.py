@@ -7,14 +7,15 @@ import logging
 from contextlib import asynccontextmanager
 from contextvars import ContextVar
 from datetime import datetime, timezone
+from time import monotonic
 from typing import Callable, Union
 
-from . import (command, const, datastore_blocks, exceptions, state_machine,
-               utils)
+from . import (command, const, datastore_blocks, datastore_settings,
+               exceptions, state_machine, utils)
 from .codec import bloxfield, sequence
-from .models import (Backup, BackupApplyResult, Block, BlockIdentity,
-                     BlockNameChange, FirmwareBlock, FirmwareBlockIdentity,
-                     ReadMode)
+from .models import (Backup, BackupApplyResult, Block, BlockCacheStats,
+                     BlockIdentity, BlockNameChange, FirmwareBlock,
+                     FirmwareBlockIdentity, ReadMode)
 
 LOGGER = logging.getLogger(__name__)
 CV: ContextVar['SparkApi'] = ContextVar('spark_api.SparkApi')
@@ -53,6 +54,99 @@ def resolve_data_ids(data: dict | list | tuple,
             resolve_data_ids(v, replacer)
 
 
+class BlockCache:
+    """
+    Stores the most recent known state of blocks, indexed by nid.
+
+    Entries are timestamped with the time the command was sent for reads,
+    and the time the response was received for writes.
+    Older data never replaces newer data.
+    Deleted blocks are remembered, to prevent concurrent reads from restoring them.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, tuple[float, FirmwareBlock | None]] = {}
+        self._complete: float | None = None
+        self._cleared = monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+
+    def _set(self, nid: int, block: FirmwareBlock | None, timestamp: float):
+        existing = self._entries.get(nid)
+        if timestamp >= self._cleared and (existing is None or existing[0] <= timestamp):
+            self._entries[nid] = (timestamp, block)
+
+    def _hit(self, timestamp: float):
+        age = monotonic() - timestamp
+        self.hits += 1
+        self._hit_age_total += age
+        self._hit_age_max = max(self._hit_age_max, age)
+
+    def clear(self):
+        self._entries.clear()
+        self._complete = None
+        self._cleared = monotonic()
+
+    def put(self, block: FirmwareBlock, timestamp: float):
+        self._set(block.nid, block.model_copy(deep=True), timestamp)
+
+    def put_all(self, blocks: list[FirmwareBlock], timestamp: float):
+        nids = set()
+        for block in blocks:
+            self.put(block, timestamp)
+            nids.add(block.nid)
+
+        # Blocks that were not returned have been removed
+        for nid in self._entries.keys() - nids:
+            self._set(nid, None, timestamp)
+
+        if timestamp >= self._cleared and (self._complete is None or self._complete <= timestamp):
+            self._complete = timestamp
+
+    def discard(self, nid: int, timestamp: float):
+        self._set(nid, None, timestamp)
+
+    def get(self, nid: int, max_age: float) -> FirmwareBlock | None:
+        if max_age <= 0:
+            return None
+
+        timestamp, block = self._entries.get(nid, (None, None))
+        if block is None or monotonic() - timestamp > max_age:
+            self.misses += 1
+            return None
+
+        self._hit(timestamp)
+        return block.model_copy(deep=True)
+
+    def get_all(self, max_age: float) -> list[FirmwareBlock] | None:
+        if max_age <= 0:
+            return None
+
+        if self._complete is None or monotonic() - self._complete > max_age:
+            self.misses += 1
+            return None
+
+        self._hit(self._complete)
+        return [block.model_copy(deep=True)
+                for _, block in self._entries.values()
+                if block is not None]
+
+    def stats(self) -> BlockCacheStats:
+        total = self.hits + self.misses
+        return BlockCacheStats(
+            size=len([block for _, block in self._entries.values() if block is not None]),
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=self.hits / total if total else 0,
+            age=monotonic() - self._complete if self._complete is not None else None,
+            hit_age_mean=self._hit_age_total / self.hits if self.hits else 0,
+            hit_age_max=self._hit_age_max,
+        )
+
+
 class SparkApi:
 
     def __init__(self):
@@ -61,6 +155,8 @@ class SparkApi:
         self.cmder = command.CV.get()
         self.block_store = datastore_blocks.CV.get()
 
+        self.cache = BlockCache()
+
         self._discovery_lock = asyncio.Lock()
         self._conn_check_lock = asyncio.Lock()
 
@@ -170,6 +266,19 @@ class SparkApi:
                 except Exception:
                     await self.cmder.reset_connection()
 
+    async def _invalidate_cache(self):
+        """
+        Block state is not preserved between connections,
+        and unit settings determine the format of block data.
+        """
+        while True:
+            await self.state.wait_disconnected()
+            self.cache.clear()
+            await self.state.wait_connected()
+
+    async def _on_global_settings(self):
+        self.cache.clear()
+
     @asynccontextmanager
     async def _execute(self, desc: str):
         """
@@ -213,7 +322,7 @@ class SparkApi:
         async with self._execute('Noop'):
             await self.cmder.noop()
 
-    async def read_block(self, block: BlockIdentity) -> Block:
+    async def read_block(self, block: BlockIdentity, max_age: float = 0) -> Block:
         """
         Read block on controller.
 
@@ -223,13 +332,22 @@ class SparkApi:
                 It is valid for `block` to be a complete block,
                 but all fields except the id and type will be ignored.
 
+            max_age (float):
+                If set, the block is returned from cache
+                if it was read or written less than `max_age` seconds ago.
+
         Returns:
             Block:
                 The desired block, as present on the controller.
         """
         async with self._execute('Read block'):
             block = self._to_firmware_block_identity(block)
+            if (cached := self.cache.get(block.nid, max_age)) is not None:
+                return self._to_block(cached)
+
+            timestamp = monotonic()
             block = await self.cmder.read_block(block)
+            self.cache.put(block, timestamp)
             block = self._to_block(block)
             return block
 
@@ -297,6 +415,7 @@ class SparkApi:
         async with self._execute('Write block'):
             block = self._to_firmware_block(block)
             block = await self.cmder.write_block(block)
+            self.cache.put(block, monotonic())
             block = self._to_block(block)
             return block
 
@@ -317,6 +436,7 @@ class SparkApi:
         async with self._execute('Patch block'):
             block = self._to_firmware_block(block)
             block = await self.cmder.patch_block(block)
+            self.cache.put(block, monotonic())
             block = self._to_block(block)
             return block
 
@@ -340,6 +460,7 @@ class SparkApi:
                 block.nid = 0
             block = self._to_firmware_block(block)
             block = await self.cmder.create_block(block)
+            self.cache.put(block, monotonic())
             block = self._to_block(block)
             return block
 
@@ -363,6 +484,7 @@ class SparkApi:
             await self.cmder.delete_block(block)
 
             nid = block.nid
+            self.cache.discard(nid, monotonic())
             sid = self.block_store.inverse[nid]
             del self.block_store[sid]
             ident = BlockIdentity(
@@ -373,17 +495,27 @@ class SparkApi:
             )
             return ident
 
-    async def read_all_blocks(self) -> list[Block]:
+    async def read_all_blocks(self, max_age: float = 0) -> list[Block]:
         """
         Read all blocks on the controller.
         No particular order is guaranteed.
 
+        Args:
+            max_age (float):
+                If set, blocks are returned from cache
+                if all blocks were read less than `max_age` seconds ago.
+
         Returns:
             list[Block]:
                 All present blocks on the controller.
         """
         async with self._execute('Read all blocks'):
+            if (cached := self.cache.get_all(max_age)) is not None:
+                return [self._to_block(block) for block in cached]
+
+            timestamp = monotonic()
             blocks = await self.cmder.read_all_blocks()
+            self.cache.put_all(blocks, timestamp)
             blocks = [self._to_block(block) for block in blocks]
             return blocks
 
@@ -433,6 +565,8 @@ class SparkApi:
         async with self._execute('Discover blocks'):
             async with self._discovery_lock:
                 blocks = await self.cmder.discover_blocks()
+            for block in blocks:
+                self.cache.put(block, monotonic())
             blocks = [self._to_block(block) for block in blocks]
             return blocks
 
@@ -448,6 +582,7 @@ class SparkApi:
         """
         async with self._execute('Remove all blocks'):
             blocks = await self.cmder.clear_blocks()
+            self.cache.clear()
             identities = [self._to_block_identity(v) for v in blocks]
             await self.load_block_names()
             await self.cmder.write_block(FirmwareBlock(
@@ -580,6 +715,7 @@ class SparkApi:
             # Sync block names with reality
             await self.cmder.discover_blocks()
             await self.load_block_names()
+            self.cache.clear()
 
             return BackupApplyResult(messages=error_log)
 
@@ -631,5 +767,13 @@ class SparkApi:
             return block
 
 
+@asynccontextmanager
+async def lifespan():
+    api = CV.get()
+    datastore_settings.CV.get().global_settings_listeners.add(api._on_global_settings)
+    async with utils.task_context(api._invalidate_cache()):
+        yield
+
+
 def setup():
     CV.set(SparkApi())
@@ -11,7 +11,7 @@ from typing import Literal
 from . import exceptions, utils
 from .models import (ConnectionKind_, ControllerDescription, DeviceDescription,
                      DiscoveryKind_, FirmwareDescription, ServiceDescription,
-                     StatusDescription)
+                     StatusDescription, SynchronizationTimes)
 
 LOGGER = logging.getLogger(__name__)
 CV: ContextVar['StateMachine'] = ContextVar('state_machine.StateMachine')
@@ -162,6 +162,9 @@ class StateMachine:
     async def wait_acknowledged(self) -> Literal[True]:
         return await self._acknowledged_ev.wait()
 
+    def set_sync_times(self, times: SynchronizationTimes):
+        self._status_desc.sync_times = times
+
     def set_synchronized(self):
         if not self._acknowledged_ev.is_set():
             raise RuntimeError('Failed to set synchronized status: '
@@ -26,28 +26,43 @@ The synchronization process consists of:
 - Set enabled flag to `service_settings.enabled` value.
 - Wait for CONNECTED status.
 - Synchronize handshake:
-    - Repeatedly prompt the controller to send a handshake,
+    - Prompt the controller to send a handshake at increasing intervals,
         until status is ACKNOWLEDGED.
     - Verify that the service is compatible with the controller.
     - If the controller is not compatible, abort synchronization.
-- Synchronize controller settings:
-    - Send timezone to controller.
-    - Send temperature display units to controller.
-    - Get block names from controller.
-- Set status to SYNCHRONIZED.
+- Concurrently:
+    - Synchronize controller settings:
+        - Send timezone to controller.
+        - Send temperature display units to controller.
+        - Get controller uptime.
+    - Synchronize block names:
+        - If the controller did not reboot since the last name table snapshot,
+            load block names from the snapshot.
+        - Otherwise, get block names from controller.
+- Set status to SYNCHRONIZED, and publish the duration of each phase.
+- If block names were loaded from the snapshot,
+    get block names from controller in the background, and replace them if changed.
+- If not yet done for this device, migrate legacy block names from the datastore in the background.
 - Wait for DISCONNECTED status.
+    - Save the name table snapshot whenever block names change.
+        If block names were not yet verified, discard the snapshot instead.
+- Save the name table snapshot.
 - Repeat
 """
 
 import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from functools import wraps
 
-from . import (codec, command, const, datastore_blocks, datastore_settings,
-               exceptions, state_machine, utils)
-from .codec.time_utils import serialize_duration
-from .models import FirmwareBlock, FirmwareBlockIdentity
+from httpx import AsyncClient
+
+from . import (codec, command, command_scheduler, const, datastore_blocks,
+               datastore_settings, exceptions, state_machine, utils)
+from .codec.time_utils import parse_duration, serialize_duration
+from .models import (CommandPriority, FirmwareBlock, FirmwareBlockIdentity,
+                     SynchronizationTimes)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -80,6 +95,18 @@ class StateSynchronizer:
         self.converter = codec.unit_conversion.CV.get()
         self.commander = command.CV.get()
 
+        # Identifies the controller boot for which the name table is valid
+        self._boot: tuple[str, float] | None = None
+        self._unverified = False
+
+        # Digest of the name table in the current snapshot
+        self._digest: str | None = None
+        self._save_pending = False
+        self.block_store.on_change = self._on_block_store_change
+
+        self._created = time.monotonic()
+        self.startup_latency: float | None = None
+
     @subroutine('apply global settings')
     async def _apply_global_settings(self):
         await self.set_converter_units()
@@ -103,51 +130,183 @@ class StateSynchronizer:
 
     @subroutine('sync handshake')
     async def _sync_handshake(self):
-        # Periodically prompt a handshake until acknowledged by the controller
-        async with asyncio.timeout(self.config.handshake_timeout.total_seconds()):
-            async with utils.task_context(self.state.wait_acknowledged()) as ack_task:
-                while not ack_task.done():
-                    await self._prompt_handshake()
-                    # Returns early if acknowledged before timeout elapsed
-                    await asyncio.wait([ack_task],
-                                       timeout=self.config.handshake_ping_interval.total_seconds())
+        # Prompt a handshake until acknowledged by the controller
+        # Prompts are sent at increasing intervals, and do not wait for earlier prompts to complete
+        interval = self.config.handshake_ping_interval_min.total_seconds()
+        interval_max = self.config.handshake_ping_interval.total_seconds()
+        prompts: set[asyncio.Task] = set()
+
+        try:
+            async with asyncio.timeout(self.config.handshake_timeout.total_seconds()):
+                async with utils.task_context(self.state.wait_acknowledged()) as ack_task:
+                    while not ack_task.done():
+                        prompts.add(asyncio.create_task(self._prompt_handshake()))
+                        # Returns early if acknowledged before timeout elapsed
+                        await asyncio.wait([ack_task], timeout=interval)
+                        interval = min(interval * self.config.handshake_ping_backoff, interval_max)
+
+        finally:
+            for task in prompts:
+                task.cancel()
+            if prompts:
+                await asyncio.wait(prompts)
 
         self.state.check_compatible()
 
     @subroutine('sync block store')
-    async def _sync_block_store(self):
-        state = state_machine.CV.get()
-        blocks = await self.commander.read_all_block_names()
-        self.block_store.clear()
-        for block in blocks:
-            self.block_store[block.id] = block.nid
-
-        # Check if redis still contains a name table for this controller's blocks
-        # If it does, attempt to load block names
-        legacy_names = await datastore_blocks.extract_legacy_redis_block_names()
-
-        for entry in legacy_names:  # pragma: no cover
-            sid, nid = entry
-            LOGGER.info(f'Renaming block to legacy name: {sid=}, {nid=}')
-            try:
-                await self.commander.write_block_name(FirmwareBlockIdentity(id=sid, nid=nid))
-                self.block_store[sid] = nid
-            except Exception as ex:
-                LOGGER.info(f'Failed to rename block {entry}: {utils.strex(ex)}')
+    async def _sync_block_store(self, boot_task: asyncio.Task[float]):
+        """
+        Loads block names from the snapshot, or reads them from the controller.
+        The controller boot time is only required to decide whether the snapshot can be used.
+        Without a snapshot, names are read while the boot time is still being retrieved.
+        """
+        device_id = self.state.desc().controller.device.device_id
+        margin = self.config.name_snapshot_reboot_margin.total_seconds()
+        snapshot = datastore_blocks.load_snapshot()
+
+        # The name table is not saved until it is synchronized
+        self._boot = None
+
+        if snapshot is not None \
+                and snapshot.device_id == device_id \
+                and abs(snapshot.boot_time - await boot_task) <= margin:
+            LOGGER.info(f'Using block name snapshot ({len(snapshot.names)} names)')
+            self.block_store.clear()
+            self.block_store.update(snapshot.names)
+            self._unverified = True
+            self._digest = snapshot.digest
+        else:
+            blocks = await self.commander.read_all_block_names()
+            self.block_store.clear()
+            for block in blocks:
+                self.block_store[block.id] = block.nid
+            self._unverified = False
+
+        self._boot = (device_id, await boot_task)
+        self.save_snapshot()
+
+    async def _verify_block_store(self):
+        """
+        Compares block names loaded from the snapshot with those on the controller.
+        The controller is the source of truth.
+        """
+        if not self._unverified or not self.state.is_synchronized():
+            return
 
-        # Remove the name table if the controller didn't crash or disconnect during migration
-        if legacy_names and state.is_acknowledged():  # pragma: no cover
-            await datastore_blocks.remove_legacy_redis_block_names()
+        try:
+            with command_scheduler.priority(CommandPriority.MAINTENANCE):
+                blocks = await self.commander.read_all_block_names()
+
+            names = [(block.id, block.nid) for block in blocks]
+            if datastore_blocks.name_table_digest(names) == \
+                    datastore_blocks.name_table_digest(self.block_store.items()):
+                LOGGER.info('Block name snapshot verified')
+            else:
+                LOGGER.warning('Block name snapshot was outdated, and has been replaced')
+                self.block_store.clear()
+                self.block_store.update(names)
+
+            self._unverified = False
+            self.save_snapshot()
+
+        except Exception as ex:
+            LOGGER.error(f'Failed to verify block name snapshot: {utils.strex(ex)}')
+
+    async def _migrate_legacy_names(self):
+        """
+        Block names were historically stored in Redis.
+        They are written to the controller once per device,
+        and the migration is recorded locally to prevent further datastore queries.
+        The migration is done in the background, and is retried on the next sync if it fails.
+        """
+        if not self.state.is_synchronized() or datastore_blocks.is_legacy_migrated():
+            return
+
+        start = time.monotonic()
+        timeout = self.config.datastore_migration_timeout.total_seconds()
+
+        try:
+            async with asyncio.timeout(timeout), \
+                    AsyncClient(base_url=self.config.datastore_url) as client:
+                legacy_names = await datastore_blocks.extract_legacy_redis_block_names(client)
+
+                with command_scheduler.priority(CommandPriority.MAINTENANCE):
+                    for entry in legacy_names:
+                        sid, nid = entry
+                        LOGGER.info(f'Renaming block to legacy name: {sid=}, {nid=}')
+                        try:
+                            await self.commander.write_block_name(FirmwareBlockIdentity(id=sid, nid=nid))
+                            self.block_store[sid] = nid
+                        except Exception as ex:
+                            LOGGER.info(f'Failed to rename block {entry}: {utils.strex(ex)}')
+
+                # Keep the name table if the controller crashed or disconnected during migration
+                if not self.state.is_synchronized():
+                    return
+
+                if legacy_names:
+                    await datastore_blocks.remove_legacy_redis_block_names(client)
+                    self.save_snapshot()
+
+            datastore_blocks.set_legacy_migrated()
+            LOGGER.info(f'Legacy block names migrated in {time.monotonic() - start:.3f}s ({len(legacy_names)} names)')
+
+        except TimeoutError:
+            LOGGER.warning(f'Legacy block name migration timed out after {timeout}s')
+
+        except Exception as ex:
+            LOGGER.error(f'Failed to migrate legacy block names: {utils.strex(ex)}')
+
+    async def _sync_background(self):
+        await self._verify_block_store()
+        await self._migrate_legacy_names()
 
     @subroutine('sync controller settings')
-    async def _sync_sysinfo(self):
-        await self.set_sysinfo_settings()
+    async def _sync_sysinfo(self) -> float:
+        """
+        Returns the controller boot time as UNIX timestamp.
+        """
+        sysinfo = await self.set_sysinfo_settings()
+        uptime = parse_duration(sysinfo.data['uptime'])
+        return time.time() - uptime.total_seconds()
+
+    def _on_block_store_change(self):
+        # Changes made in the same event loop iteration are saved together
+        if not self._save_pending and self.config.name_snapshot:
+            self._save_pending = True
+            asyncio.get_running_loop().call_soon(self._save_changed_snapshot)
+
+    def _save_changed_snapshot(self):
+        self._save_pending = False
+
+        # The name table is synchronized again after reconnecting
+        if not self.state.is_synchronized():
+            return
+
+        if datastore_blocks.name_table_digest(self.block_store.items()) == self._digest:
+            return
+
+        # The snapshot is outdated, but the name table can't be saved until verified
+        if self._unverified:
+            datastore_blocks.remove_snapshot()
+            self._digest = None
+        else:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        # Unverified names are not saved, to prevent confirming an outdated snapshot
+        if self._boot is not None and not self._unverified:
+            try:
+                snapshot = datastore_blocks.save_snapshot(*self._boot)
+                self._digest = snapshot.digest if snapshot else None
+            except Exception as ex:
+                LOGGER.error(f'Failed to save block name snapshot: {utils.strex(ex)}')
 
     async def set_converter_units(self):
         self.converter.temperature = self.settings_store.unit_settings.temperature
         LOGGER.info(f'Service temperature unit set to {self.converter.temperature}')
 
-    async def set_sysinfo_settings(self):
+    async def set_sysinfo_settings(self) -> FirmwareBlock:
         # Get time zone
         tz_name = self.settings_store.timezone_settings.name
         tz_posix = self.settings_store.timezone_settings.posixValue
@@ -177,14 +336,44 @@ class StateSynchronizer:
         update_freq = sysinfo.data['updatesPerSecond']
         LOGGER.info(f'Spark updates per second: {update_freq}')
 
+        return sysinfo
+
     async def synchronize(self):
         await self._apply_global_settings()
         await self._apply_service_settings()
         await self.state.wait_connected()
-        await self._sync_handshake()
-        await self._sync_block_store()
-        await self._sync_sysinfo()
+
+        start = time.monotonic()
+        times = SynchronizationTimes(startup=self.startup_latency)
+
+        def lap(since: float) -> float:
+            return round(time.monotonic() - since, 6)
+
+        async def timed_sysinfo() -> float:
+            boot_time = await self._sync_sysinfo()
+            times.sysinfo = lap(acknowledged)
+            return boot_time
+
+        with command_scheduler.priority(CommandPriority.CONTROL):
+            await self._sync_handshake()
+            times.handshake = lap(start)
+            acknowledged = time.monotonic()
+
+            # Controller settings and block names are synchronized concurrently
+            async with utils.task_context(timed_sysinfo()) as sysinfo_task:
+                await self._sync_block_store(sysinfo_task)
+                times.block_names = lap(acknowledged)
+                await sysinfo_task
+
+        times.synchronized = lap(start)
+        if self.startup_latency is None:
+            self.startup_latency = times.startup = lap(self._created)
+            LOGGER.info(f'Service startup to SYNCHRONIZED: {self.startup_latency:.3f}s')
+
+        self.state.set_sync_times(times)
         self.state.set_synchronized()
+        source = 'snapshot' if self._unverified else 'controller'
+        LOGGER.info(f'Synchronized in {times.synchronized:.3f}s (block names from {source})')
 
     async def run(self):
         try:
@@ -200,7 +389,10 @@ class StateSynchronizer:
             LOGGER.error(f'Failed to sync: {utils.strex(ex)}')
             await self.commander.reset_connection()
 
-        await self.state.wait_disconnected()
+        async with utils.task_context(self._sync_background()):
+            await self.state.wait_disconnected()
+
+        self.save_snapshot()
 
     async def repeat(self):
         self.settings_store.service_settings_listeners.add(self._apply_service_settings)
@@ -212,5 +404,8 @@ class StateSynchronizer:
 @asynccontextmanager
 async def lifespan():
     sync = StateSynchronizer()
-    async with utils.task_context(sync.repeat()):
-        yield
+    try:
+        async with utils.task_context(sync.repeat()):
+            yield
+    finally:
+        sync.save_snapshot()
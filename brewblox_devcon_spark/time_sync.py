@@ -8,8 +8,8 @@ import logging
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
-from . import const, spark_api, state_machine, utils
-from .models import Block
+from . import command_scheduler, const, spark_api, state_machine, utils
+from .models import Block, CommandPriority
 
 LOGGER = logging.getLogger(__name__)
 
@@ -24,11 +24,12 @@ class TimeSync:
     async def run(self):
         await self.state.wait_synchronized()
         now = datetime.now()
-        await self.api.patch_block(Block(
-            nid=const.SYS_BLOCK_IDS['SysInfo'],
-            type=const.SYSINFO_BLOCK_TYPE,
-            data={'systemTime': now},
-        ))
+        with command_scheduler.priority(CommandPriority.MAINTENANCE):
+            await self.api.patch_block(Block(
+                nid=const.SYS_BLOCK_IDS['SysInfo'],
+                type=const.SYSINFO_BLOCK_TYPE,
+                data={'systemTime': now},
+            ))
         LOGGER.debug(f'Time sync: {now=}')
 
     async def repeat(self):
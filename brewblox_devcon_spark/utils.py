@@ -6,6 +6,7 @@ import signal
 import socket
 from configparser import ConfigParser
 from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
 from datetime import timedelta
 from functools import lru_cache
 from ipaddress import ip_address
@@ -23,14 +24,25 @@ DVT = TypeVar('DVT')
 LOGGER = logging.getLogger(__name__)
 
 
-@lru_cache
-def get_config() -> ServiceConfig:  # pragma: no cover
+CONFIG: ContextVar[ServiceConfig] = ContextVar('utils.config')
+
+
+def get_config() -> ServiceConfig:
     """
-    Globally cached getter for service config.
-    When first called, config is parsed from env.
+    Getter for service config.
+    In multi-controller mode, each controller context has its own config.
+    Otherwise, the globally cached config is returned.
     """
-    config = ServiceConfig()
+    try:
+        return CONFIG.get()
+    except LookupError:
+        return load_config()
+
 
+def resolve_config_defaults(config: ServiceConfig) -> ServiceConfig:
+    """
+    Assigns values to config fields that default to `None` or 0.
+    """
     if not config.device_id and (config.simulation or config.mock):
         config.device_id = '123456789012345678901234'
 
@@ -40,6 +52,17 @@ def get_config() -> ServiceConfig:  # pragma: no cover
     if not config.simulation_display_port:
         config.simulation_display_port = get_free_port()
 
+    return config
+
+
+@lru_cache
+def load_config() -> ServiceConfig:  # pragma: no cover
+    """
+    Globally cached loader for service config.
+    When first called, config is parsed from env.
+    """
+    config = resolve_config_defaults(ServiceConfig())
+
     if not config.name:
         config.name = autodetect_service_name()
 
@@ -128,6 +151,18 @@ def autodetect_service_name() -> str:  # pragma: no cover
     raise RuntimeError(f'No service name found for {host=}, {ip=}, {candidates=}')
 
 
+def get_rss() -> int:
+    """
+    Returns the resident set size of the current process in bytes.
+    Returns 0 if this is not supported by the OS.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):  # pragma: no cover
+        return 0
+
+
 def get_free_port() -> int:
     """
     Returns the next free port that is available on the OS
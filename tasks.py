@@ -100,6 +100,29 @@ def testclean(ctx: Context):
         ctx.run('sudo pkill -ef -9 brewblox-amd64.sim')
 
 
+@task
+def benchmark(ctx: Context, blocks=100, rounds=10, output='', compare=''):
+    """
+    Measures codec performance for a generated READ_ALL_BLOCKS response,
+    codec startup and lookup performance, stream parsing, and commander round trips.
+
+    The codec suite results can be saved as JSON using `--output`,
+    and compared against a saved baseline using `--compare`.
+    """
+    suite_args = f'--rounds {rounds}'
+    if output:
+        suite_args += f' --output {output}'
+    if compare:
+        suite_args += f' --compare {compare}'
+
+    with ctx.cd(ROOT):
+        ctx.run(f'python3 -m benchmark.codec --blocks {blocks} --rounds {rounds}')
+        ctx.run(f'python3 -m benchmark.lookup --rounds {rounds}')
+        ctx.run(f'python3 -m benchmark.commander --blocks {blocks} --rounds {rounds}')
+        ctx.run(f'python3 -m benchmark.cbox_parser --rounds {rounds}')
+        ctx.run(f'python3 -m benchmark.suite {suite_args}')
+
+
 @task
 def build(ctx: Context):
     with ctx.cd(ROOT):
@@ -79,7 +79,7 @@ def config(monkeypatch: pytest.MonkeyPatch,
         backup_root_dir=tmp_path / 'backup',
     )
     print(cfg)
-    monkeypatch.setattr(utils, 'get_config', lambda: cfg)
+    monkeypatch.setattr(utils, 'load_config', lambda: cfg)
     yield cfg
 
 
@@ -1,12 +1,17 @@
+from base64 import b64encode
 from contextlib import asynccontextmanager
 
 import pytest
 from fastapi import FastAPI
+from google.protobuf.descriptor import FieldDescriptor
 
+from benchmark.corpus import populate
 from brewblox_devcon_spark import codec, connection, exceptions
-from brewblox_devcon_spark.codec import Codec
+from brewblox_devcon_spark.codec import Codec, lookup, pb2
 from brewblox_devcon_spark.models import (DecodedPayload, EncodedPayload,
-                                          MaskField, MaskMode, ReadMode)
+                                          ErrorCode, IntermediateRequest,
+                                          IntermediateResponse, MaskField,
+                                          MaskMode, Opcode, ReadMode)
 
 TEMP_SENSOR_TYPE_INT = 302
 
@@ -368,3 +373,218 @@ async def test_map_fields():
             },
         }
     }
+
+
+@pytest.mark.parametrize('populated', [False, True])
+@pytest.mark.parametrize('mode', list(ReadMode))
+async def test_direct_decoding(populated: bool, mode: ReadMode):
+    direct_cdc = Codec(direct_decode=True)
+    json_cdc = Codec(direct_decode=False)
+
+    for impl in lookup.CV.get().objects():
+        message = impl.message_cls()
+        if populated:
+            populate(message)
+
+        fields = list(message.DESCRIPTOR.fields)
+        mask_fields = [MaskField(address=[f.number]) for f in fields[:2]]
+        mask_fields += [MaskField(address=[f.number, f.message_type.fields[0].number])
+                        for f in fields
+                        if f.message_type and f.label != FieldDescriptor.LABEL_REPEATED]
+
+        for mask_mode in MaskMode:
+            payload = EncodedPayload(
+                blockId=1,
+                blockType=impl.type_str,
+                content=b64encode(message.SerializeToString()).decode(),
+                maskMode=mask_mode,
+                maskFields=mask_fields if mask_mode != MaskMode.NO_MASK else [],
+            )
+
+            for filter_values in [True, False]:
+                direct = direct_cdc.decode_payload(payload, mode=mode, filter_values=filter_values)
+                converted = json_cdc.decode_payload(payload, mode=mode, filter_values=filter_values)
+                assert direct == converted, f'{impl.type_str} {mask_mode} {filter_values=}'
+
+
+@pytest.mark.parametrize('mode', list(ReadMode))
+async def test_direct_encoding(mode: ReadMode):
+    rw_cdc = Codec(filter_values=False)
+    direct_cdc = Codec(direct_encode=True)
+    json_cdc = Codec(direct_encode=False)
+
+    for impl in lookup.CV.get().objects():
+        message = populate(impl.message_cls())
+        decoded = rw_cdc.decode_payload(EncodedPayload(
+            blockId=1,
+            blockType=impl.type_str,
+            content=b64encode(message.SerializeToString()).decode(),
+        ), mode=mode)
+
+        for mask_mode in MaskMode:
+            payload = decoded.model_copy(update={
+                'maskMode': mask_mode,
+                'maskFields': [MaskField(address=[1])],
+            })
+            original = payload.model_dump()
+
+            for filter_values in [True, False]:
+                direct = direct_cdc.encode_payload(payload, filter_values=filter_values)
+                converted = json_cdc.encode_payload(payload, filter_values=filter_values)
+                assert direct == converted, f'{impl.type_str} {mask_mode} {filter_values=}'
+
+            # Content is not modified by the direct encoder
+            assert payload.model_dump() == original
+
+
+@pytest.mark.parametrize('block_type, content', [
+    ('TempSensorOneWire', {'offset': 'text'}),
+    ('TempSensorOneWire', {'offset': [1, 2]}),
+    ('TempSensorOneWire', {'offset[bananas]': 10}),
+    ('TempSensorOneWire', {'address': 'not hex'}),
+    ('TempSensorOneWire', {'magic': 1}),
+    ('Pid', {'enabled': 'maybe'}),
+    ('Pid', {'kp': 'text'}),
+    ('Variables', {'variables': [{'digital': 'STATE_ACTIVE'}]}),
+    ('Variables', {'variables': {'k1': {'digital': 'STATE_ACTIVE', 'analog': 1}}}),
+    ('Variables', {'variables': {'k1': {'digital': 'STATE_MAYBE'}}}),
+    ('TempSensorCombi', {'sensors': 10}),
+    ('TempSensorCombi', {'sensors': ['text']}),
+    ('ActuatorLogic', {'digital': [{'id': 'text'}]}),
+])
+async def test_direct_encoding_errors(block_type: str, content: dict):
+    errors = []
+    for cdc in [Codec(direct_encode=True), Codec(direct_encode=False)]:
+        with pytest.raises(exceptions.EncodeException) as excinfo:
+            cdc.encode_payload(DecodedPayload(
+                blockId=1,
+                blockType=block_type,
+                content=content,
+            ))
+        errors.append(str(excinfo.value))
+
+    # Errors include the same field path as json_format.ParseDict()
+    direct, converted = errors
+    assert direct == converted
+
+
+async def test_direct_encoding_nested_errors():
+    for cdc in [Codec(direct_encode=True), Codec(direct_encode=False)]:
+        with pytest.raises(exceptions.EncodeException):
+            cdc.encode_payload(DecodedPayload(
+                blockId=1,
+                blockType='ActuatorLogic',
+                content={'digital': {'id': 10}},
+            ))
+
+    with pytest.raises(exceptions.EncodeException, match=r'Failed to parse enabled field: .* at Block.enabled.'):
+        Codec(direct_encode=True).encode_payload(DecodedPayload(
+            blockId=1,
+            blockType='Pid',
+            content={'enabled': 'maybe'},
+        ))
+
+
+async def test_decode_cache():
+    converter = codec.unit_conversion.CV.get()
+    cdc = Codec(cache_size=2)
+    uncached_cdc = Codec(cache_size=0)
+
+    payload = EncodedPayload(
+        blockId=1,
+        blockType='TempSensorOneWire',
+        content=b64encode(populate(pb2.TempSensorOneWire_pb2.Block()).SerializeToString()).decode(),
+    )
+    expected = uncached_cdc.decode_payload(payload)
+
+    first = cdc.decode_payload(payload)
+    second = cdc.decode_payload(payload)
+    assert first == second == expected
+    assert (cdc.cache.hits, cdc.cache.misses) == (1, 1)
+
+    # Returned payloads are copies
+    second.content['value']['value'] = 'modified'
+    second.maskFields.append(MaskField(address=[1]))
+    assert cdc.decode_payload(payload) == expected
+    assert (cdc.cache.hits, cdc.cache.misses) == (2, 1)
+
+    # Decode arguments are part of the key
+    assert cdc.decode_payload(payload, mode=ReadMode.STORED) == \
+        uncached_cdc.decode_payload(payload, mode=ReadMode.STORED)
+    assert (cdc.cache.hits, cdc.cache.misses) == (2, 2)
+
+    # Least recently used entries are evicted
+    cdc.decode_payload(payload.model_copy(update={'blockId': 2}))
+    assert len(cdc.cache) == 2
+    cdc.decode_payload(payload)
+    assert (cdc.cache.hits, cdc.cache.misses) == (2, 4)
+
+    stats = cdc.cache.stats()
+    assert (stats.size, stats.maxsize) == (2, 2)
+    assert stats.hit_ratio == pytest.approx(1 / 3)
+    assert uncached_cdc.cache.stats().hit_ratio == 0
+
+    # Changing the user temperature unit clears the cache
+    converter.temperature = 'degF'
+    expected_f = uncached_cdc.decode_payload(payload)
+    assert expected_f != expected
+    assert len(cdc.cache) == 2
+    assert cdc.decode_payload(payload) == expected_f
+    assert len(cdc.cache) == 1
+    assert cdc.decode_payload(payload) == expected_f
+    assert (cdc.cache.hits, cdc.cache.misses) == (3, 5)
+
+    converter.temperature = 'degC'
+    assert cdc.decode_payload(payload) == expected
+    assert (cdc.cache.hits, cdc.cache.misses) == (3, 6)
+
+
+async def test_direct_transcoding():
+    direct_cdc = Codec(direct_encode=True, direct_decode=True)
+    json_cdc = Codec(direct_encode=False, direct_decode=False)
+
+    payloads = [
+        EncodedPayload(blockId=1),
+        EncodedPayload(
+            blockId=2,
+            blockType=TEMP_SENSOR_TYPE_INT,
+            name='sensor',
+            content='CgQIARAC',
+            maskMode=MaskMode.EXCLUSIVE,
+            maskFields=[MaskField(address=[1, 2]), MaskField(address=[3])],
+        ),
+        EncodedPayload(blockId=3, blockType='Pid', name='pid'),
+        EncodedPayload(blockId=4, blockType=9001, name='edge case'),
+    ]
+
+    requests = [
+        IntermediateRequest(msgId=1, opcode=Opcode.NONE),
+        *(IntermediateRequest(msgId=idx, opcode=Opcode.BLOCK_WRITE, mode=ReadMode.STORED, payload=v)
+          for idx, v in enumerate(payloads)),
+    ]
+    responses = [
+        IntermediateResponse(msgId=1, error=ErrorCode.INVALID_BLOCK, payload=[]),
+        IntermediateResponse(msgId=2, error=ErrorCode.OK, mode=ReadMode.LOGGED, payload=payloads),
+    ]
+
+    for request in requests:
+        encoded = direct_cdc.encode_request(request)
+        assert encoded == json_cdc.encode_request(request)
+        assert direct_cdc.decode_request(encoded) == json_cdc.decode_request(encoded)
+
+    for response in responses:
+        encoded = direct_cdc.encode_response(response)
+        assert encoded == json_cdc.encode_response(response)
+        assert direct_cdc.decode_response(encoded) == json_cdc.decode_response(encoded)
+
+    decoded = direct_cdc.decode_response(direct_cdc.encode_response(responses[1]))
+    assert decoded.payload[1].blockType == 'TempSensorOneWire'
+    assert decoded.payload[3].blockType == 9001
+
+    for cdc in [direct_cdc, json_cdc]:
+        with pytest.raises(exceptions.EncodeException):
+            cdc.encode_request(IntermediateRequest(
+                msgId=1,
+                opcode=Opcode.BLOCK_WRITE,
+                payload=EncodedPayload(blockId=1, blockType='MAGIC'),
+            ))
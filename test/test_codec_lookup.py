@@ -0,0 +1,67 @@
+from brewblox_devcon_spark.codec import lookup, pb2, processor
+
+
+def test_find_object():
+    registry = lookup.TypeRegistry()
+
+    impl = registry.find_object('Pid')
+    assert impl.type_int == 304
+    assert impl.message_cls is pb2.Pid_pb2.Block
+    assert registry.find_object(304) is impl
+
+    # Only the conventional module was imported
+    assert not registry._complete
+    assert registry._loaded_modules == {'Pid_pb2'}
+
+    # Field plans are compiled when the module is imported
+    assert pb2.Pid_pb2.Block.DESCRIPTOR in processor._FIELD_PLANS
+
+    # Interface types are resolved without importing modules
+    assert registry.find_object('TempSensorInterface') is None
+    assert registry.find_object(2) is None
+    assert registry._loaded_modules == {'Pid_pb2'}
+
+    # Module names may omit the deprecation prefix
+    impl = registry.find_object('Deprecated_AnalogGpioModule')
+    assert impl.message_cls is pb2.AnalogGpioModule_pb2.Block
+    assert not registry._complete
+
+    # Custom test objects
+    impl = registry.find_object(9001)
+    assert impl.type_str == 'EdgeCase'
+    assert impl.message_cls is pb2.EdgeCase_pb2.Block
+
+    # Unknown types require all modules to be imported
+    assert registry.find_object('MAGIC') is None
+    assert registry._complete
+    assert registry.find_object(12345) is None
+
+
+def test_find_interface():
+    registry = lookup.TypeRegistry()
+
+    intf = registry.find_interface('TempSensorInterface')
+    assert intf.type_int == lookup.BlockType.Value('TempSensorInterface')
+    assert registry.find_interface(intf.type_int) is intf
+    assert registry.find_interface('EdgeCase').type_int == 9001
+    assert registry.find_interface('Pid') is None
+
+    assert registry.find_combined('Pid').message_cls is pb2.Pid_pb2.Block
+    assert registry.find_combined('TempSensorInterface') is intf
+    assert registry.find_combined('MAGIC') is None
+
+
+def test_listing():
+    registry = lookup.TypeRegistry()
+
+    objects = registry.objects()
+    assert registry._complete
+    assert len(objects) == len({v.type_int for v in objects})
+    assert 'SysInfo' in [v.type_str for v in objects]
+    assert 'EdgeCase' in [v.type_str for v in objects]
+
+    interfaces = registry.interfaces()
+    assert len(interfaces) == len({v.type_int for v in interfaces})
+    assert all(v.type_int <= lookup.BLOCK_INTERFACE_TYPE_END
+               for v in interfaces
+               if v.type_str != 'EdgeCase')
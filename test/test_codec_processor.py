@@ -1,7 +1,11 @@
+from itertools import product
+
 import pytest
 
-from brewblox_devcon_spark.codec import ProtobufProcessor, unit_conversion
-from brewblox_devcon_spark.codec.pb2 import TempSensorOneWire_pb2
+from brewblox_devcon_spark.codec import (ProtobufProcessor, processor,
+                                         unit_conversion)
+from brewblox_devcon_spark.codec.pb2 import (Pid_pb2, TempSensorOneWire_pb2,
+                                             Variables_pb2)
 from brewblox_devcon_spark.models import DecodedPayload, MaskField, MaskMode
 
 
@@ -108,3 +112,91 @@ def test_masking(degf_processor: ProtobufProcessor, desc):
     vals.maskFields = [MaskField(address=[1])]  # value
     degf_processor.post_decode(desc, vals, filter_values=False)
     assert vals.content['value']['value'] is None
+
+    # Duplicate mask addresses are only inserted once
+    vals = generate_encoding_data()
+    vals.content['value'] = 10
+    vals.maskMode = MaskMode.INCLUSIVE
+    vals.maskFields = [MaskField(address=[3])]
+    degf_processor.pre_encode(desc, vals, filter_values=False)
+    assert sorted(list((f.address for f in vals.maskFields))) == [
+        [1],  # value
+        [3],  # offset
+        [4],  # address
+    ]
+
+
+def test_mask_trie():
+    tags = [None, 1, 2]
+    # Wildcards are not accepted by the model, but are supported by the matcher
+    fields = [
+        MaskField(address=[]),
+        MaskField(address=[1]),
+        MaskField(address=[2, 1]),
+        MaskField.model_construct(address=[None, 2]),
+        MaskField.model_construct(address=[1, None, 1]),
+    ]
+    addresses = [
+        address
+        for length in range(4)
+        for address in product(tags, repeat=length)
+    ]
+
+    assert not processor.MaskTrie().matches(())
+    assert not processor.MaskTrie().matches((1,))
+
+    # Compare against the brute-force match for every subset of fields
+    for count in range(len(fields) + 1):
+        for start in range(len(fields) - count + 1):
+            subset = fields[start:start + count]
+            trie = processor.MaskTrie(subset)
+            for address in addresses:
+                expected = any(ProtobufProcessor.matches_address(f, address) for f in subset)
+                assert trie.matches(address) == expected, f'{subset=} {address=}'
+
+    trie = processor.MaskTrie()
+    assert trie.insert((1, 2))
+    assert not trie.insert((1, 2))
+    assert trie.insert((1,))
+
+
+def test_split_postfix():
+    assert processor.split_postfix('value') == ('value', '')
+    assert processor.split_postfix('value[degC]') == ('value', 'degC')
+    assert processor.split_postfix('sensor<TempSensorInterface>') == ('sensor', 'TempSensorInterface')
+    assert processor.split_postfix('sensor<TempSensorInterface,driven>') == ('sensor', 'TempSensorInterface')
+    assert processor.split_postfix('sensor<>') == ('sensor', '')
+
+
+def test_field_plans(desc):
+    plans = processor.field_plans(desc)
+    assert plans is processor.field_plans(desc)
+
+    offset = plans['offset']
+    assert offset.number == 3
+    assert offset.unit_type == 'DeltaCelsius'
+    assert offset.options.scale == 4096
+    assert offset.is_int
+    assert not offset.repeated
+    assert offset.message_type is None
+
+    assert plans['address'].options.hexed
+
+    pid_plans = processor.field_plans(Pid_pb2.Block.DESCRIPTOR)
+    assert pid_plans['inputId'].link_type == 'SetpointSensorPairInterface'
+    assert pid_plans['outputId'].link_type == 'ActuatorAnalogInterface'
+
+    var_plans = processor.field_plans(Variables_pb2.Block.DESCRIPTOR)
+    variables = var_plans['variables']
+    assert variables.repeated
+    assert variables.is_map
+    assert variables.message_type is Variables_pb2.VarContainer.DESCRIPTOR
+
+
+def test_warm_field_plans():
+    processor._FIELD_PLANS.clear()
+    processor.warm_field_plans([Variables_pb2.Block.DESCRIPTOR])
+
+    # Nested messages are included
+    assert Variables_pb2.Block.DESCRIPTOR in processor._FIELD_PLANS
+    assert Variables_pb2.VarContainer.DESCRIPTOR in processor._FIELD_PLANS
@@ -47,3 +47,49 @@ def test_update_config(unit_ids):
 
     assert cv.to_sys_unit('Celsius') == 'degC'
     assert cv.to_user_unit('Celsius') == 'degF'
+
+
+@pytest.mark.parametrize('temp', ['degC', 'degF'])
+def test_affine_conversion(temp: str):
+    cv = unit_conversion.UnitConverter()
+    cv.temperature = temp
+    ureg = unit_conversion._UREG
+
+    for id in unit_conversion.FORMATS:
+        sys_unit = cv.to_sys_unit(id)
+        user_unit = cv.to_user_unit(id)
+
+        assert cv._to_sys[id] is not None
+        assert cv._to_user[id] is not None
+
+        for amount in [-40, 0, 1, 10, 21.5, 1e6]:
+            assert cv.to_sys_value(amount, id) == \
+                pytest.approx(ureg.Quantity(amount, user_unit).to(sys_unit).magnitude)
+            assert cv.to_sys_value(amount, id, user_unit) == \
+                pytest.approx(ureg.Quantity(amount, user_unit).to(sys_unit).magnitude)
+            assert cv.to_user_value(amount, id) == \
+                pytest.approx(ureg.Quantity(amount, sys_unit).to(user_unit).magnitude)
+
+
+def test_affine_types():
+    cv = unit_conversion.UnitConverter()
+
+    # Integer values remain integers if pint would return an integer
+    assert type(cv.to_user_value(10, 'Celsius')) is int
+    assert type(cv.to_sys_value(10, 'Second')) is int
+    assert type(cv.to_sys_value(10.0, 'Second')) is float
+
+    # Custom units are converted by pint
+    assert cv.to_sys_value(10, 'Second', 'hour') == 36000
+    assert cv.to_sys_value(10, 'Celsius', 'degF') == pytest.approx(-12.2222222)
+
+    # Non-numeric values are passed to pint
+    assert cv.to_user_value('10', 'Second') == '10'
+
+    # Logarithmic units are not affine
+    assert unit_conversion.affine_conversion('dBm', 'mW') is None
+
+    assert unit_conversion.affine_conversion('minute', 'second') == \
+        unit_conversion.AffineConversion(60, 0)
+    assert unit_conversion.affine_conversion('degC', 'kelvin') == \
+        unit_conversion.AffineConversion(pytest.approx(1), pytest.approx(273.15))
@@ -6,10 +6,12 @@ import pytest
 from asgi_lifespan import LifespanManager
 from fastapi import FastAPI
 
-from brewblox_devcon_spark import (codec, command, connection, state_machine,
-                                   utils)
+from brewblox_devcon_spark import (codec, command, command_scheduler,
+                                   connection, const, state_machine, utils)
 from brewblox_devcon_spark.connection import connection_handler
-from brewblox_devcon_spark.models import ErrorCode, IntermediateResponse
+from brewblox_devcon_spark.models import (CommandPriority, ErrorCode,
+                                          FirmwareBlock, FirmwareBlockIdentity,
+                                          IntermediateResponse, ReadMode)
 
 TESTED = command.__name__
 
@@ -91,3 +93,70 @@ async def test_firmware_update_call(manager: LifespanManager):
     await asyncio.wait_for(state.wait_connected(), timeout=5)
     await cmdr.firmware_update()
     await cmdr.wait_empty()
+
+
+async def test_coalesced_reads(manager: LifespanManager):
+    state = state_machine.CV.get()
+    cmdr = command.CV.get()
+
+    state.set_enabled(True)
+    await asyncio.wait_for(state.wait_connected(), timeout=5)
+
+    ident = FirmwareBlockIdentity(nid=const.SYS_BLOCK_IDS['SysInfo'])
+
+    # Identical concurrent reads share a command
+    blocks = await asyncio.gather(*[cmdr.read_block(ident) for _ in range(3)])
+    assert blocks[0] == blocks[1] == blocks[2]
+    assert blocks[0] is not blocks[1]
+    assert cmdr.coalesced_reads == 2
+
+    # Different read modes are separate commands
+    await asyncio.gather(cmdr.read_block(ident),
+                         cmdr.read_block(ident, ReadMode.STORED))
+    assert cmdr.coalesced_reads == 2
+
+    await asyncio.gather(*[cmdr.read_all_blocks() for _ in range(2)])
+    assert cmdr.coalesced_reads == 3
+
+    # Writes are a barrier for reads
+    await asyncio.gather(cmdr.read_block(ident),
+                         cmdr.patch_block(FirmwareBlock(
+                             nid=const.SYS_BLOCK_IDS['SysInfo'],
+                             type=const.SYSINFO_BLOCK_TYPE,
+                             data={},
+                         )),
+                         cmdr.read_block(ident))
+    assert cmdr.coalesced_reads == 3
+
+    # Cancelling a caller does not cancel the shared read
+    first = asyncio.create_task(cmdr.read_all_blocks())
+    second = asyncio.create_task(cmdr.read_all_blocks())
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second
+    assert cmdr.coalesced_reads == 4
+
+
+async def test_coalesced_reads_priority(manager: LifespanManager):
+    state = state_machine.CV.get()
+    cmdr = command.CV.get()
+
+    state.set_enabled(True)
+    await asyncio.wait_for(state.wait_connected(), timeout=5)
+
+    async def read_all(prio: CommandPriority):
+        with command_scheduler.priority(prio):
+            return await cmdr.read_all_blocks()
+
+    # Reads only join reads with the same priority class
+    await asyncio.gather(read_all(CommandPriority.BROADCAST),
+                         read_all(CommandPriority.INTERACTIVE))
+    assert cmdr.coalesced_reads == 0
+
+    await asyncio.gather(read_all(CommandPriority.BROADCAST),
+                         read_all(CommandPriority.BROADCAST))
+    assert cmdr.coalesced_reads == 1
+
+    latency = cmdr.scheduler.latency()
+    assert latency['INTERACTIVE'].count == 1
+    assert latency['BROADCAST'].count == 2
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+from brewblox_devcon_spark import command_scheduler
+from brewblox_devcon_spark.command_scheduler import CommandScheduler
+from brewblox_devcon_spark.models import CommandPriority
+
+
+async def test_priority_context():
+    assert command_scheduler.PRIORITY.get() == CommandPriority.INTERACTIVE
+
+    with command_scheduler.priority(CommandPriority.BROADCAST):
+        assert command_scheduler.PRIORITY.get() == CommandPriority.BROADCAST
+
+        with command_scheduler.priority(CommandPriority.MAINTENANCE):
+            assert command_scheduler.PRIORITY.get() == CommandPriority.MAINTENANCE
+
+        assert command_scheduler.PRIORITY.get() == CommandPriority.BROADCAST
+
+    assert command_scheduler.PRIORITY.get() == CommandPriority.INTERACTIVE
+
+
+async def test_window():
+    scheduler = CommandScheduler(2)
+    release = asyncio.Event()
+    max_in_flight = 0
+
+    async def send():
+        nonlocal max_in_flight
+        async with scheduler.slot(CommandPriority.INTERACTIVE):
+            max_in_flight = max(max_in_flight, scheduler.in_flight)
+            await release.wait()
+
+    tasks = [asyncio.create_task(send()) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert scheduler.in_flight == 2
+    assert scheduler.waiting == 3
+
+    release.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+    assert max_in_flight == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.waiting == 0
+
+
+async def test_priority_order():
+    scheduler = CommandScheduler(1)
+    release = asyncio.Event()
+    order = []
+
+    async def send(prio: CommandPriority, name: str):
+        async with scheduler.slot(prio):
+            order.append(name)
+            await release.wait()
+
+    blocker = asyncio.create_task(send(CommandPriority.INTERACTIVE, 'blocker'))
+    await asyncio.sleep(0)
+
+    tasks = [
+        asyncio.create_task(send(CommandPriority.MAINTENANCE, 'maintenance')),
+        asyncio.create_task(send(CommandPriority.BROADCAST, 'broadcast')),
+        asyncio.create_task(send(CommandPriority.CONTROL, 'control')),
+        asyncio.create_task(send(CommandPriority.INTERACTIVE, 'interactive')),
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    await asyncio.wait_for(asyncio.gather(blocker, *tasks), timeout=5)
+    assert order == ['blocker', 'interactive', 'control', 'broadcast', 'maintenance']
+
+
+async def test_fair_queuing():
+    scheduler = CommandScheduler(1)
+    release = asyncio.Event()
+    order = []
+
+    async def send(name: str, count: int):
+        for i in range(count):
+            async with scheduler.slot(CommandPriority.INTERACTIVE):
+                order.append(f'{name}{i}')
+                await release.wait()
+
+    blocker = asyncio.create_task(send('x', 1))
+    await asyncio.sleep(0)
+
+    # Both tasks are queued before the slot is released
+    greedy = asyncio.create_task(send('a', 3))
+    polite = asyncio.create_task(send('b', 1))
+    await asyncio.sleep(0)
+    release.set()
+
+    await asyncio.wait_for(asyncio.gather(blocker, greedy, polite), timeout=5)
+    assert order == ['x0', 'a0', 'b0', 'a1', 'a2']
+
+
+async def test_flows():
+    scheduler = CommandScheduler(1)
+    release = asyncio.Event()
+    order = []
+
+    async def send(name: str):
+        async with scheduler.slot(CommandPriority.INTERACTIVE):
+            order.append(name)
+            await release.wait()
+
+    blocker = asyncio.create_task(send('x'))
+    await asyncio.sleep(0)
+
+    # Concurrent tasks in a flow are served as a single caller
+    with command_scheduler.flow():
+        batch = [asyncio.create_task(send(f'a{i}')) for i in range(3)]
+    single = asyncio.create_task(send('b0'))
+    await asyncio.sleep(0)
+    release.set()
+
+    await asyncio.wait_for(asyncio.gather(blocker, *batch, single), timeout=5)
+    assert order == ['x', 'a0', 'b0', 'a1', 'a2']
+
+
+async def test_cancel_waiting():
+    scheduler = CommandScheduler(1)
+    release = asyncio.Event()
+
+    async def send():
+        async with scheduler.slot(CommandPriority.INTERACTIVE):
+            await release.wait()
+
+    blocker = asyncio.create_task(send())
+    await asyncio.sleep(0)
+
+    cancelled = asyncio.create_task(send())
+    await asyncio.sleep(0)
+    assert scheduler.waiting == 1
+
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert scheduler.waiting == 0
+
+    release.set()
+    await asyncio.wait_for(blocker, timeout=5)
+    assert scheduler.in_flight == 0
+
+    # The slot is released if the command is cancelled after being granted
+    release.clear()
+    blocker = asyncio.create_task(send())
+    await asyncio.sleep(0)
+    granted = asyncio.create_task(send())
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.sleep(0)
+    granted.cancel()
+    await asyncio.wait_for(blocker, timeout=5)
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    assert scheduler.in_flight == 0
+
+
+async def test_latency():
+    scheduler = CommandScheduler(1)
+    for i in range(100):
+        scheduler.record(CommandPriority.INTERACTIVE, (i + 1) / 1000)
+
+    latency = scheduler.latency()
+    assert set(latency.keys()) == {v.name for v in CommandPriority}
+    assert latency['INTERACTIVE'].count == 100
+    assert latency['INTERACTIVE'].p50 == pytest.approx(0.05)
+    assert latency['INTERACTIVE'].p99 == pytest.approx(0.099)
+    assert latency['INTERACTIVE'].max == pytest.approx(0.1)
+    assert latency['INTERACTIVE'].mean == pytest.approx(0.0505)
+    assert latency['MAINTENANCE'].count == 0
+    assert latency['MAINTENANCE'].p99 == 0
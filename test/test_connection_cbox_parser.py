@@ -63,3 +63,47 @@ def test_parser_partial():
     parser.push(chunks[1])
     assert [msg for msg in parser.event_messages()] == ['!connected:sensor']
     assert [msg for msg in parser.data_messages()] == []
+
+
+def test_parser_nested():
+    parser = CboxParser()
+    parser.push('<messageA <messageB> <messageC> > data <messageD>')
+    assert [msg for msg in parser.event_messages()] == [
+        'messageB',
+        'messageC',
+        'messageA',
+        'messageD',
+    ]
+    assert [msg for msg in parser.data_messages()] == []
+
+    parser.push(' more data\n')
+    assert [msg for msg in parser.data_messages()] == [' data  more data']
+
+
+def test_parser_malformed():
+    parser = CboxParser()
+
+    # Unmatched end characters are data
+    parser.push('data>more\n')
+    assert [msg for msg in parser.data_messages()] == ['data>more']
+
+    # Newlines do not end annotations
+    parser.push('data<!multi\nline> <open\n')
+    assert [msg for msg in parser.event_messages()] == ['!multi\nline']
+    assert [msg for msg in parser.data_messages()] == []
+
+    parser.push('<nested>still open>more\n')
+    assert [msg for msg in parser.event_messages()] == ['nested', 'open\nstill open']
+    assert [msg for msg in parser.data_messages()] == ['data more']
+
+
+def test_parser_bytes():
+    parser = CboxParser()
+    data = '<!Brauerei Größe>groß\n'.encode()
+
+    # Multi-byte characters may be split between chunks
+    for idx in range(len(data)):
+        parser.push(data[idx:idx+1])
+
+    assert [msg for msg in parser.event_messages()] == ['!Brauerei Größe']
+    assert [msg for msg in parser.data_messages()] == ['groß']
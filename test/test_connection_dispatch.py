@@ -0,0 +1,79 @@
+import asyncio
+
+from brewblox_devcon_spark.connection.dispatch import MessageDispatcher
+
+
+async def test_dispatch_order():
+    received = []
+
+    async def handler(msg: str):
+        await asyncio.sleep(0.001 if int(msg) % 2 else 0)
+        received.append(msg)
+
+    dispatcher = MessageDispatcher(handler, 10)
+    dispatcher.start()
+
+    for i in range(20):
+        dispatcher.put(str(i))
+
+    await asyncio.wait_for(dispatcher.join(), timeout=5)
+    assert received == [str(i) for i in range(20)]
+
+    metrics = dispatcher.metrics
+    assert metrics.depth == 0
+    assert metrics.max_depth == 20
+    assert metrics.dispatched == 20
+    assert metrics.latency_max >= metrics.latency_avg > 0
+
+    stats = metrics.stats()
+    assert stats.dispatched == 20
+    assert stats.latency_avg == metrics.latency_avg
+
+    dispatcher.stop()
+    dispatcher.stop()  # Can safely be called again
+
+
+async def test_dispatch_drained():
+    drained = asyncio.Event()
+    release = asyncio.Event()
+
+    async def handler(msg: str):
+        await release.wait()
+
+    dispatcher = MessageDispatcher(handler, 4, drained.set)
+    dispatcher.start()
+
+    for i in range(3):
+        dispatcher.put(str(i))
+    assert not dispatcher.full
+
+    dispatcher.put('3')
+    assert dispatcher.full
+
+    release.set()
+    await asyncio.wait_for(drained.wait(), timeout=5)
+    assert not dispatcher.full
+    assert dispatcher.metrics.depth <= 2
+
+    await asyncio.wait_for(dispatcher.join(), timeout=5)
+    dispatcher.stop()
+
+
+async def test_dispatch_error():
+    received = []
+
+    async def handler(msg: str):
+        if msg == 'error':
+            raise RuntimeError(msg)
+        received.append(msg)
+
+    dispatcher = MessageDispatcher(handler, 10)
+    dispatcher.start()
+
+    for msg in ['a', 'error', 'b']:
+        dispatcher.put(msg)
+
+    await asyncio.wait_for(dispatcher.join(), timeout=5)
+    assert received == ['a', 'b']
+    assert dispatcher.metrics.dispatched == 3
+    dispatcher.stop()
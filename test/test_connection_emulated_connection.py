@@ -0,0 +1,141 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from time import perf_counter
+
+import pytest
+from asgi_lifespan import LifespanManager
+from fastapi import FastAPI
+from pytest_mock import MockerFixture
+
+from brewblox_devcon_spark import (codec, command, connection, exceptions,
+                                   state_machine, utils)
+from brewblox_devcon_spark.connection import (connection_handler,
+                                              emulated_connection,
+                                              mock_connection)
+from brewblox_devcon_spark.models import IntermediateRequest, Opcode, ReadMode
+
+TESTED = emulated_connection.__name__
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with connection_handler.lifespan():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def app() -> FastAPI:
+    config = utils.get_config()
+    config.command_timeout = timedelta(seconds=1)
+    config.mock_link = True
+    config.mock_link_rtt = timedelta(milliseconds=50)
+    config.mock_link_chunk_size = 16
+    config.mock_processing_time = {
+        Opcode.BLOCK_READ_ALL: timedelta(milliseconds=50),
+        Opcode.NAME_READ_ALL: timedelta(milliseconds=50),
+    }
+
+    state_machine.setup()
+    codec.setup()
+    connection_handler.setup()
+    command.setup()
+    return FastAPI(lifespan=lifespan)
+
+
+@pytest.fixture(autouse=True)
+async def manager(manager: LifespanManager):
+    state = state_machine.CV.get()
+    state.set_enabled(True)
+    await asyncio.wait_for(state.wait_connected(), timeout=5)
+    yield manager
+
+
+async def test_link_model():
+    link = emulated_connection.LinkModel(latency=1, bandwidth=100)
+    now = asyncio.get_running_loop().time()
+    assert link.schedule(100) == pytest.approx(now + 2, abs=0.01)
+    assert link.schedule(50) == pytest.approx(now + 2.5, abs=0.01)
+
+    link.drop_rate = 1
+    assert link.schedule(100) is None
+
+
+async def test_emulated_latency():
+    conn = connection.CV.get()
+    cmder = command.CV.get()
+    assert isinstance(conn._impl, emulated_connection.EmulatedConnection)
+
+    # Lower bounds follow from the link schedule.
+    # Upper bounds are relative, and only check that requests overlap.
+    rtt = 0.05
+    processing_time = 0.05
+
+    start = perf_counter()
+    await cmder.noop()
+    single = perf_counter() - start
+    assert single >= rtt * 0.9
+
+    # Requests are pipelined
+    start = perf_counter()
+    await asyncio.gather(*(cmder.noop() for _ in range(4)))
+    elapsed = perf_counter() - start
+    assert elapsed >= rtt * 0.9
+    assert elapsed < 4 * rtt
+
+    # Requests are handled one at a time
+    start = perf_counter()
+    blocks, names = await asyncio.gather(cmder.read_all_blocks(),
+                                         cmder.read_all_block_names())
+    elapsed = perf_counter() - start
+    assert elapsed >= (rtt + 2 * processing_time) * 0.9
+    assert [b.id for b in blocks] == [b.id for b in names]
+
+
+async def wait_logged(caplog: pytest.LogCaptureFixture, text: str):
+    async def poll():
+        while text not in caplog.text:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout=1)
+
+
+async def test_emulated_errors(caplog: pytest.LogCaptureFixture,
+                               mocker: MockerFixture):
+    conn = connection.CV.get()
+    cmder = command.CV.get()
+    impl: emulated_connection.EmulatedConnection = conn._impl
+    cdc = codec.CV.get()
+
+    # Requests that fail to decode are logged and skipped
+    await impl.send_request('invalid')
+    await cmder.noop()
+    assert 'Error handling request `invalid`' in caplog.text
+
+    # The controller may not respond at all
+    mock_connection.NEXT_ERROR.append(None)
+    await impl.send_request(cdc.encode_request(IntermediateRequest(
+        msgId=0,
+        opcode=Opcode.NONE,
+        mode=ReadMode.DEFAULT,
+    )))
+    await cmder.noop()
+    assert not mock_connection.NEXT_ERROR
+
+    # Errors in received message handlers do not stop the receiver
+    m_on_response = mocker.patch.object(impl, 'on_response', autospec=True,
+                                        side_effect=RuntimeError('boom'))
+    impl._responses.put_nowait((0, b'response\n'))
+    await wait_logged(caplog, 'Error handling received message')
+    m_on_response.assert_awaited_once_with('response')
+
+    mocker.stopall()
+    await cmder.noop()
+
+
+async def test_emulated_drop():
+    conn = connection.CV.get()
+    cmder = command.CV.get()
+    conn._impl.uplink.drop_rate = 1
+
+    with pytest.raises(exceptions.CommandTimeout):
+        await cmder.noop()
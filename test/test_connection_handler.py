@@ -9,6 +9,8 @@ from pytest_mock import MockerFixture
 from brewblox_devcon_spark import exceptions, state_machine, utils
 from brewblox_devcon_spark.codec import unit_conversion
 from brewblox_devcon_spark.connection import connection_handler
+from brewblox_devcon_spark.connection.connection_impl import \
+    ConnectionImplBase
 from brewblox_devcon_spark.models import DiscoveryType
 
 TESTED = connection_handler.__name__
@@ -56,11 +58,20 @@ async def test_calc_interval(value: timedelta | None, expected: timedelta):
     assert connection_handler.calc_interval(value) == expected
 
 
+def make_conn(kind: str, address: str) -> Mock:
+    return Mock(spec=ConnectionImplBase, kind=kind, address=address)
+
+
 async def test_handler_discovery(mocker: MockerFixture):
     config = utils.get_config()
     m_discover_usb: AsyncMock = mocker.patch(TESTED + '.discover_usb', autospec=True)
     m_discover_mdns: AsyncMock = mocker.patch(TESTED + '.discover_mdns', autospec=True)
     m_discover_mqtt: AsyncMock = mocker.patch(TESTED + '.discover_mqtt', autospec=True)
+    m_connect_tcp: AsyncMock = mocker.patch(TESTED + '.connect_tcp', autospec=True)
+
+    usb_conn = make_conn('USB', 'usb-proxy:9999')
+    tcp_conn = make_conn('TCP', 'hostface:8332')
+    mqtt_conn = make_conn('MQTT', '1234')
 
     def reset():
         config.discovery = DiscoveryType.all
@@ -68,67 +79,117 @@ async def test_handler_discovery(mocker: MockerFixture):
         config.discovery_interval = timedelta()
         config.discovery_timeout = timedelta(seconds=1)
 
-        m_discover_usb.reset_mock()
-        m_discover_mdns.reset_mock()
-        m_discover_mqtt.reset_mock()
+        for m in [m_discover_usb, m_discover_mdns, m_discover_mqtt, m_connect_tcp]:
+            m.reset_mock()
+            m.side_effect = None
+            m.return_value = None
 
-        m_discover_usb.side_effect = None
-        m_discover_mdns.side_effect = None
-        m_discover_mqtt.side_effect = None
+    async def slow_mdns(callbacks):
+        await asyncio.sleep(0.1)
+        return tcp_conn
 
+    reset()
     handler = connection_handler.ConnectionHandler()
 
-    # Discovery order is USB -> mDNS -> MQTT
-    config.discovery = DiscoveryType.all
+    # All methods run concurrently, and the first result wins
+    m_discover_mdns.side_effect = slow_mdns
+    m_discover_mqtt.return_value = mqtt_conn
+
+    assert await handler.discover() is mqtt_conn
+    m_discover_usb.assert_awaited_with(handler)
+    m_discover_mdns.assert_awaited_once_with(handler)
+    m_discover_mqtt.assert_awaited_once_with(handler)
+    assert 'MQTT' in handler.discovery_times
+
+    reset()
+    handler.discovery_times.clear()
+
+    # The last discovered MQTT device is tried first
+    m_discover_mqtt.return_value = mqtt_conn
 
-    await handler.discover()
-    m_discover_usb.assert_awaited_once_with(handler)
+    assert await handler.discover() is mqtt_conn
+    m_discover_mqtt.assert_awaited_once_with(handler)
+    m_discover_usb.assert_not_awaited()
     m_discover_mdns.assert_not_awaited()
-    m_discover_mqtt.assert_not_awaited()
+    assert 'MQTT' in handler.discovery_times
 
     reset()
+    handler = connection_handler.ConnectionHandler()
 
-    # Only discover mDNS
-    config.discovery = DiscoveryType.mdns
-    m_discover_mdns.return_value = 'tcp_result'
+    # Methods that succeed at the same time are closed
+    m_discover_usb.return_value = usb_conn
+    m_discover_mqtt.return_value = mqtt_conn
+
+    assert await handler.discover() is usb_conn
+    usb_conn.close.assert_not_awaited()
+    mqtt_conn.close.assert_awaited_once()
+
+    reset()
+
+    # The last discovered transport and address are tried first
+    handler.discovery_times.clear()
+    m_connect_tcp.return_value = usb_conn
 
-    assert await handler.discover() == 'tcp_result'
+    assert await handler.discover() is usb_conn
+    m_connect_tcp.assert_awaited_once_with(handler, 'usb-proxy', 9999, 'USB')
     m_discover_usb.assert_not_awaited()
-    m_discover_mqtt.assert_not_awaited()
+    assert list(handler.discovery_times) == ['USB']
 
     reset()
 
+    # If the last address fails, all methods are tried again
+    m_connect_tcp.side_effect = ConnectionRefusedError
+    m_discover_mdns.return_value = tcp_conn
+
+    assert await handler.discover() is tcp_conn
+    m_connect_tcp.assert_awaited_once()
+    m_discover_mdns.assert_awaited_once_with(handler)
+
+    reset()
+    handler = connection_handler.ConnectionHandler()
+
     # Only discover MQTT
     config.discovery = DiscoveryType.mqtt
-    m_discover_mqtt.return_value = 'mqtt_result'
+    m_discover_mqtt.return_value = mqtt_conn
 
-    assert await handler.discover() == 'mqtt_result'
+    assert await handler.discover() is mqtt_conn
     m_discover_usb.assert_not_awaited()
     m_discover_mdns.assert_not_awaited()
 
     reset()
+    handler = connection_handler.ConnectionHandler()
 
     # Retry if discovery fails the first time
     config.discovery = DiscoveryType.mdns
-    m_discover_mdns.side_effect = [None, None, 'tcp_result']
+    m_discover_mdns.side_effect = [None, RuntimeError('boo'), tcp_conn]
 
-    assert await handler.discover() == 'tcp_result'
+    assert await handler.discover() is tcp_conn
     assert m_discover_mdns.await_count == 3
     m_discover_usb.assert_not_awaited()
     m_discover_mqtt.assert_not_awaited()
 
     reset()
+    handler = connection_handler.ConnectionHandler()
 
     # Throw a timeout error after a while
     config.discovery_timeout = timedelta(milliseconds=1)
     config.discovery = DiscoveryType.all
-    m_discover_usb.return_value = None
-    m_discover_mdns.return_value = None
-    m_discover_mqtt.return_value = None
 
     with pytest.raises(ConnectionAbortedError):
         await handler.discover()
 
+    reset()
+    handler = connection_handler.ConnectionHandler()
+
+    # Connections made just before the timeout are closed
+    config.discovery_timeout = timedelta()
+    late_conn = make_conn('USB', 'usb-proxy:9999')
+    m_discover_usb.return_value = late_conn
+
+    with pytest.raises(ConnectionAbortedError):
+        await handler.discover()
+    late_conn.close.assert_awaited_once()
+
 
 async def test_handler_connect_order(mocker: MockerFixture):
     config = utils.get_config()
@@ -154,17 +215,21 @@ async def test_handler_connect_order(mocker: MockerFixture):
     handler = connection_handler.ConnectionHandler()
 
     # Lowest prio: discovery
-    # Discovery order is USB -> TCP -> MQTT
+    # USB, mDNS and MQTT discovery run concurrently
     config.mock = False
     config.simulation = False
     config.device_host = None
     config.discovery = DiscoveryType.all
     config.device_id = '01ab23ce'
+    m_funcs['discover_usb'].return_value = make_conn('USB', 'usb-proxy:9999')
+    m_funcs['discover_mdns'].return_value = None
+    m_funcs['discover_mqtt'].return_value = None
 
     await handler.connect()
 
-    m_funcs['discover_usb'].assert_awaited_once_with(handler)
-    for f in without('discover_usb'):
+    for f in ['discover_usb', 'discover_mdns', 'discover_mqtt']:
+        m_funcs[f].assert_awaited_once_with(handler)
+    for f in without('discover_usb', 'discover_mdns', 'discover_mqtt'):
         f.assert_not_awaited()
 
     reset()
@@ -212,12 +277,16 @@ async def test_handler_run():
 
     with pytest.raises(exceptions.NotConnected):
         await handler.send_request('')
+    assert handler.dispatch_metrics == {}
 
     async with utils.task_context(handler.run()) as task:
         state.set_enabled(True)
         await asyncio.wait_for(state.wait_connected(),
                                timeout=5)
 
+        # The mock connection does not queue received messages
+        assert handler.dispatch_metrics == {}
+
         # We're assuming here that mock_connection.send_request()
         # immediately calls the on_response() callback
         await handler.send_request('')
@@ -1,4 +1,5 @@
 import asyncio
+import random
 from contextlib import asynccontextmanager
 from datetime import timedelta
 from unittest.mock import AsyncMock, call
@@ -139,4 +140,63 @@ async def test_mqtt_message_handling():
     await impl._resp_cb(None, None, 'garbled'.encode(), 0, None)
     await impl._resp_cb(None, None, '6;1;sixth-second\n'.encode(), 0, None)
 
-    assert callbacks.on_response.await_args_list == [call('fourth'), call('fifth,fifth-second')]
+    # Malformed chunks only discard the message with the same ID
+    await impl._resp_cb(None, None, '7;0;seventh,'.encode(), 0, None)
+    await impl._resp_cb(None, None, '8;0;eighth,'.encode(), 0, None)
+    await impl._resp_cb(None, None, '7;garbled'.encode(), 0, None)
+    await impl._resp_cb(None, None, '7;1;seventh-second\n'.encode(), 0, None)
+    await impl._resp_cb(None, None, '8;1;eighth-second\n'.encode(), 0, None)
+
+    assert callbacks.on_response.await_args_list == [
+        call('fourth'),
+        call('fifth,fifth-second'),
+        call('sixth,sixth-second'),
+        call('eighth,eighth-second'),
+    ]
+
+
+async def test_mqtt_interleaved_messages():
+    callbacks = AsyncMock(spec=connection_handler.ConnectionHandler)
+    impl = mqtt_connection.MqttConnection('1234', callbacks)
+    rand = random.Random(0)
+
+    # Many concurrent responses are chunked, and chunks are interleaved
+    # Chunks of a single message are still received in order
+    expected = {}
+    pending = []
+    for msg_id in range(1, 31):
+        msg = ','.join(f'{msg_id}-{v}' for v in range(rand.randint(1, 20)))
+        expected[msg_id] = msg
+        chunks = [msg[i:i+7] for i in range(0, len(msg), 7)]
+        chunks[-1] += '\n'
+        pending.append([f'{msg_id};{idx};{chunk}'.encode() for idx, chunk in enumerate(chunks)])
+
+    while pending:
+        chunks = rand.choice(pending)
+        await impl._resp_cb(None, None, chunks.pop(0), 0, None)
+        if not chunks:
+            pending.remove(chunks)
+
+    received = [args[0] for args, _ in callbacks.on_response.await_args_list]
+    assert sorted(received) == sorted(expected.values())
+    assert len(impl._assembler) == 0
+
+
+async def test_mqtt_reassembly_limits():
+    assembler = mqtt_connection.MessageAssembler(maxsize=2, timeout=0.1)
+
+    # Oldest incomplete message is discarded if too many are pending
+    assert assembler.push(b'1;0;one,') is None
+    assert assembler.push(b'2;0;two,') is None
+    assert assembler.push(b'3;0;three,') is None
+    assert len(assembler) == 2
+    assert assembler.push(b'1;1;one\n') is None
+    assert assembler.push(b'2;1;two;2\n') == 'two,two;2'
+
+    # Stale incomplete messages are discarded
+    await asyncio.sleep(0.15)
+    assert assembler.push(b'3;1;three\n') is None
+    assert len(assembler) == 0
+
+    with pytest.raises(ValueError):
+        assembler.push(b'1;one\n')
@@ -73,6 +73,77 @@ async def test_tcp_connection(random_port: int):
     assert callbacks.response_msg == 'world'
     assert callbacks.event_msg == 'event'
 
+    await impl.close()
+    await asyncio.wait_for(impl.disconnected.wait(), timeout=5)
+
+
+async def test_tcp_connection_order(random_port: int):
+    callbacks = DummyCallbacks()
+    received = []
+
+    async def on_response(msg: str):
+        await asyncio.sleep(0.001 if int(msg) % 2 else 0)
+        received.append(msg)
+
+    callbacks.on_response = on_response
+    impl = await stream_connection.connect_tcp(callbacks, 'localhost', random_port)
+
+    for i in range(20):
+        await impl.send_request(str(i))
+        await asyncio.sleep(0)
+
+    async def wait_received():
+        while len(received) < 20:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait_received(), timeout=5)
+    assert received == [str(i) for i in range(20)]
+    assert impl.dispatch_metrics['responses'].dispatched == 20
+    assert impl.dispatch_metrics['events'].dispatched >= 1
+    await impl.close()
+    await asyncio.wait_for(impl.disconnected.wait(), timeout=5)
+
+
+async def test_tcp_connection_backpressure(random_port: int):
+    config = utils.get_config()
+    config.dispatch_queue_size = 2
+
+    callbacks = DummyCallbacks()
+    release = asyncio.Event()
+
+    async def on_event(msg: str):
+        await release.wait()
+
+    callbacks.on_event = on_event
+    impl = await stream_connection.connect_tcp(callbacks, 'localhost', random_port)
+
+    # Events are blocked, and fill the queue
+    for i in range(5):
+        await impl.send_request(str(i))
+        await asyncio.sleep(0.01)
+    assert impl._reading_paused
+
+    release.set()
+
+    async def wait_dispatched():
+        while impl.dispatch_metrics['events'].dispatched < 5:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait_dispatched(), timeout=5)
+    assert not impl._reading_paused
+    assert impl.dispatch_metrics['events'].max_depth >= 2
+
+    # Writes wait until the transport resumes writing
+    impl.pause_writing()
+    task = asyncio.create_task(impl.send_request('paused'))
+    await asyncio.sleep(0.01)
+    assert not task.done()
+
+    impl.resume_writing()
+    await asyncio.wait_for(task, timeout=5)
+    await impl.close()
+    await asyncio.wait_for(impl.disconnected.wait(), timeout=5)
+
 
 async def test_tcp_connection_close(random_port: int):
     callbacks = DummyCallbacks()
@@ -103,6 +174,9 @@ async def test_discover_mdns(mocker: MockerFixture, random_port: int):
     assert callbacks.response_msg == 'mdns'
     assert callbacks.event_msg == 'event'
 
+    await impl.close()
+    await asyncio.wait_for(impl.disconnected.wait(), timeout=5)
+
 
 async def test_discover_mdns_none(mocker: MockerFixture):
     m_mdns_discover = mocker.patch(TESTED + '.mdns.discover_one', autospec=True)
@@ -0,0 +1,145 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from asgi_lifespan import LifespanManager
+from fastapi import FastAPI
+
+from brewblox_devcon_spark import codec, command, state_machine, utils
+from brewblox_devcon_spark.connection import (connection_handler,
+                                              replay_connection, wire_recorder)
+from brewblox_devcon_spark.connection.wire_recorder import RecordKind
+from brewblox_devcon_spark.models import (ErrorCode, FirmwareBlock,
+                                          IntermediateRequest,
+                                          IntermediateResponse, Opcode)
+
+TESTED = wire_recorder.__name__
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with wire_recorder.lifespan(), connection_handler.lifespan():
+        yield
+
+
+@pytest.fixture
+def recording(tmp_path: Path) -> Path:
+    return tmp_path / 'recording.bin'
+
+
+@pytest.fixture(autouse=True)
+def app(recording: Path) -> FastAPI:
+    config = utils.get_config()
+    config.wire_recording = recording
+
+    state_machine.setup()
+    codec.setup()
+    wire_recorder.setup()
+    connection_handler.setup()
+    command.setup()
+    return FastAPI(lifespan=lifespan)
+
+
+async def record(manager: LifespanManager):
+    state = state_machine.CV.get()
+    cmder = command.CV.get()
+
+    state.set_enabled(True)
+    await asyncio.wait_for(state.wait_connected(), timeout=5)
+
+    await cmder.version()
+    await cmder.create_block(FirmwareBlock(
+        id='setpoint',
+        nid=0,
+        type='SetpointSensorPair',
+        data={'storedSetting[degC]': 20},
+    ))
+    await cmder.read_all_blocks()
+    await cmder.read_all_blocks()
+
+
+async def test_record(manager: LifespanManager, recording: Path):
+    await record(manager)
+    wire_recorder.CV.get().close()
+
+    records = list(wire_recorder.read_records(recording))
+    assert [r.kind for r in records] == [
+        RecordKind.REQUEST,
+        RecordKind.EVENT,
+        RecordKind.RESPONSE,
+        *[RecordKind.REQUEST, RecordKind.RESPONSE] * 3,
+    ]
+    assert records[1].msg.startswith('!BREWBLOX')
+    assert sorted(records, key=lambda r: r.timestamp) == records
+
+    # Interrupted recordings are read up to the last complete record
+    recording.write_bytes(recording.read_bytes()[:-10])
+    assert len(list(wire_recorder.read_records(recording))) == len(records) - 1
+
+    recording.write_bytes(b'garbage')
+    with pytest.raises(ValueError):
+        list(wire_recorder.read_records(recording))
+
+
+async def test_replay(manager: LifespanManager, recording: Path):
+    await record(manager)
+    wire_recorder.CV.get().close()
+
+    cdc = codec.Codec()
+    callbacks = AsyncMock()
+    conn = replay_connection.ReplayConnection(recording, 0, callbacks)
+    await conn.connect()
+    await asyncio.sleep(0.01)
+    assert callbacks.on_event.await_count == 1
+
+    for msg_id in [100, 101, 102]:
+        await conn.send_request(cdc.encode_request(IntermediateRequest(
+            msgId=msg_id,
+            opcode=Opcode.BLOCK_READ_ALL,
+        )))
+        await asyncio.sleep(0.01)
+        response = cdc.decode_response(callbacks.on_response.await_args.args[0])
+        assert response.msgId == msg_id
+        assert 'setpoint' in [p.name for p in response.payload]
+
+    # Unknown requests are not answered
+    await conn.send_request(cdc.encode_request(IntermediateRequest(
+        msgId=103,
+        opcode=Opcode.REBOOT,
+    )))
+    await asyncio.sleep(0.01)
+    assert callbacks.on_response.await_count == 3
+
+    await conn.close()
+    assert conn.disconnected.is_set()
+
+
+async def test_replay_handler(manager: LifespanManager, recording: Path):
+    await record(manager)
+    wire_recorder.CV.get().close()
+
+    # Responses without a matching request are ignored
+    cdc = codec.Codec()
+    data = cdc.encode_response(IntermediateResponse(
+        msgId=999,
+        error=ErrorCode.OK,
+        payload=[],
+    )).encode()
+    with recording.open('ab') as f:
+        f.write(wire_recorder.RECORD_PREFIX.pack(RecordKind.RESPONSE, 100, len(data)))
+        f.write(data)
+
+    config = utils.get_config()
+    config.wire_replay = recording
+    config.wire_replay_speed = 0
+
+    handler = connection_handler.ConnectionHandler()
+    conn = await handler.connect()
+    assert isinstance(conn, replay_connection.ReplayConnection)
+    assert conn.connected.is_set()
+    assert sum(len(v) for v in conn._responses.values()) == 4
+
+    await conn.close()
+    assert conn.disconnected.is_set()
@@ -0,0 +1,190 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from brewblox_devcon_spark import (app_factory, codec, command, connection,
+                                   datastore_blocks, datastore_settings, mqtt,
+                                   spark_api, state_machine, synchronization,
+                                   utils)
+from brewblox_devcon_spark.endpoints import http_blocks
+from brewblox_devcon_spark.models import Block, BlockIdentity, ErrorResponse
+
+TESTED = http_blocks.__name__
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(mqtt.lifespan())
+        await stack.enter_async_context(connection.lifespan())
+        await stack.enter_async_context(synchronization.lifespan())
+        yield
+
+
+@pytest.fixture
+def app() -> FastAPI:
+    config = utils.get_config()
+    config.mock = True
+    config.mock_link = True
+    config.mock_link_rtt = timedelta(milliseconds=20)
+
+    mqtt.setup()
+    state_machine.setup()
+    datastore_settings.setup()
+    datastore_blocks.setup()
+    codec.setup()
+    connection.setup()
+    command.setup()
+    spark_api.setup()
+
+    app = FastAPI(lifespan=lifespan)
+    app_factory.add_exception_handlers(app)
+    app.include_router(http_blocks.router)
+    return app
+
+
+@pytest.fixture(autouse=True)
+async def synchronized(client: AsyncClient):
+    await asyncio.wait_for(state_machine.CV.get().wait_synchronized(), timeout=5)
+
+
+@pytest.fixture
+def s_publish(mocker: MockerFixture) -> Mock:
+    return mocker.spy(mqtt.CV.get(), 'publish')
+
+
+def sensor(id: str) -> Block:
+    return Block(
+        id=id,
+        type='TempSensorOneWire',
+        data={
+            'offset[delta_degC]': 0,
+            'address': 'FF',
+        },
+    )
+
+
+def setpoint(id: str, sensor_id: str) -> Block:
+    return Block(
+        id=id,
+        type='SetpointSensorPair',
+        data={
+            'sensorId<>': sensor_id,
+            'storedSetting[degC]': 20,
+        },
+    )
+
+
+async def test_run_batch():
+    active = 0
+    max_active = 0
+    order: list[str] = []
+
+    async def func(block: BlockIdentity) -> BlockIdentity:
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        order.append(block.id)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if block.type == 'error':
+            raise ValueError(block.id)
+        return block
+
+    args = [BlockIdentity(id=f'block-{i}') for i in range(20)]
+    args[3].type = 'error'
+    results, errors = await http_blocks.run_batch(func, args)
+    assert [v and v.id for v in results] == [None if v.type == 'error' else v.id for v in args]
+    assert http_blocks.succeeded(results) == [v for v in args if v.type != 'error']
+    assert [type(v) for v in errors] == [type(None)] * 3 + [ValueError] + [type(None)] * 16
+    assert max_active == utils.get_config().batch_concurrency
+
+    # Items with the same ID, or linking to an earlier item, are not concurrent
+    order.clear()
+    args = [
+        setpoint('setpoint', 'sensor'),
+        sensor('sensor'),
+        setpoint('setpoint-2', 'sensor'),
+        BlockIdentity(id='setpoint'),
+    ]
+    await http_blocks.run_batch(func, args)
+    assert order[:2] == ['setpoint', 'sensor']
+    assert set(order[2:]) == {'setpoint-2', 'setpoint'}
+
+
+async def test_batch_create_patch(client: AsyncClient, s_publish: Mock, mocker: MockerFixture):
+    args = [
+        sensor('sensor'),
+        setpoint('setpoint', 'sensor'),
+        *[sensor(f'sensor-{i}') for i in range(20)],
+    ]
+    resp = await client.post('/blocks/batch/create',
+                             json=[v.model_dump(mode='json') for v in args])
+    assert resp.status_code == 201
+    assert [v['id'] for v in resp.json()] == [v.id for v in args]
+    assert resp.json()[1]['data']['sensorId']['id'] == 'sensor'
+    assert s_publish.call_count == 1
+
+    # Patches are pipelined
+    cmder = command.CV.get()
+    in_flight: list[int] = []
+    send_request = cmder.conn.send_request
+
+    async def counting_send_request(msg: str):
+        in_flight.append(cmder.scheduler.in_flight)
+        await send_request(msg)
+
+    mocker.patch.object(cmder.conn, 'send_request', counting_send_request)
+
+    args = [Block(id=f'sensor-{i}', type='TempSensorOneWire', data={'offset[delta_degC]': i})
+            for i in range(20)]
+    resp = await client.post('/blocks/batch/patch',
+                             json=[v.model_dump(mode='json') for v in args])
+    assert resp.status_code == 200
+    assert max(in_flight) > 1
+    assert [v['data']['offset']['value'] for v in resp.json()] == list(range(20))
+    assert s_publish.call_count == 2
+
+    # Failed items do not prevent others from being patched
+    args = [
+        Block(id='sensor-0', type='TempSensorOneWire', data={'offset[delta_degC]': 100}),
+        Block(id='unknown', type='TempSensorOneWire', data={}),
+    ]
+    resp = await client.post('/blocks/batch/patch',
+                             json=[v.model_dump(mode='json') for v in args])
+    assert resp.status_code == 400
+    content = ErrorResponse.model_validate_json(resp.text)
+    assert content.errors[0] is None
+    assert 'unknown' in content.errors[1]
+    assert content.results[0]['data']['offset']['value'] == 100
+    assert content.results[1] is None
+    assert s_publish.call_count == 3
+
+    resp = await client.post('/blocks/read', json={'id': 'sensor-0'})
+    assert resp.json()['data']['offset']['value'] == 100
+
+    resp = await client.post('/blocks/batch/delete', json=[{'id': 'unknown'}])
+    assert resp.status_code == 400
+    assert s_publish.call_count == 3
+
+    # Created blocks are included in the response if other items fail
+    args = [
+        sensor('sensor-new'),
+        setpoint('setpoint-new', 'unknown'),
+    ]
+    resp = await client.post('/blocks/batch/create',
+                             json=[v.model_dump(mode='json') for v in args])
+    assert resp.status_code == 400
+    content = ErrorResponse.model_validate_json(resp.text)
+    assert content.results[0]['id'] == 'sensor-new'
+    assert content.results[0]['nid'] > 0
+    assert content.results[1] is None
+    assert content.errors[0] is None
+    assert 'unknown' in content.errors[1]
+    assert s_publish.call_count == 4
@@ -14,8 +14,10 @@ from brewblox_devcon_spark import (app_factory, block_backup, codec, command,
                                    datastore_settings, endpoints, mqtt,
                                    spark_api, state_machine, synchronization,
                                    utils)
-from brewblox_devcon_spark.models import (Backup, Block, BlockIdentity,
-                                          DatastoreMultiQuery, DecodedPayload,
+from brewblox_devcon_spark.models import (Backup, Block, BlockCacheStats,
+                                          BlockIdentity, CodecCacheStats,
+                                          DatastoreMultiQuery,
+                                          DecodedPayload, DispatchStats,
                                           EncodedMessage, EncodedPayload,
                                           ErrorCode, IntermediateRequest,
                                           IntermediateResponse, Opcode,
@@ -259,6 +261,37 @@ async def test_read(client: AsyncClient, block_args: Block):
     assert Block.model_validate_json(resp.text).id == 'testobj'
 
 
+async def test_read_cached(client: AsyncClient, block_args: Block):
+    resp = await client.post('/blocks/create', json=block_args.model_dump())
+    assert resp.status_code == 201
+
+    resp = await client.post('/blocks/read', json={'id': 'testobj'}, params={'max_age': 10})
+    assert Block.model_validate_json(resp.text).id == 'testobj'
+
+    resp = await client.post('/blocks/batch/read', json=[{'id': 'testobj'}], params={'max_age': 10})
+    assert ret_ids(resp.json()) == {'testobj'}
+
+    resp = await client.post('/blocks/all/read', params={'max_age': 10})
+    assert 'testobj' in ret_ids(resp.json())
+
+    resp = await client.get('/_debug/block_cache')
+    stats = BlockCacheStats.model_validate_json(resp.text)
+    assert stats.hits == 2
+    assert stats.misses == 1
+
+    resp = await client.get('/_debug/codec_cache')
+    codec_stats = CodecCacheStats.model_validate_json(resp.text)
+    assert codec_stats.maxsize == utils.get_config().codec_cache_size
+    assert codec_stats.size > 0
+
+
+async def test_dispatch_stats(client: AsyncClient):
+    resp = await client.get('/_debug/dispatch')
+    stats = {k: DispatchStats.model_validate(v) for k, v in resp.json().items()}
+    assert set(stats) == {'events', 'responses'}
+    assert stats['responses'].dispatched > 0
+
+
 async def test_read_performance(client: AsyncClient, block_args: Block):
     resp = await client.post('/blocks/create', json=block_args.model_dump())
     assert resp.status_code == 201
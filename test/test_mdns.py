@@ -1,4 +1,5 @@
 import asyncio
+from contextlib import aclosing
 from datetime import timedelta
 from socket import inet_aton
 from unittest.mock import Mock
@@ -7,7 +8,7 @@ import pytest
 from aiozeroconf import ServiceInfo, ServiceStateChange
 from pytest_mock import MockerFixture
 
-from brewblox_devcon_spark import const, mdns
+from brewblox_devcon_spark import const, mdns, utils
 
 TESTED = mdns.__name__
 
@@ -20,7 +21,7 @@ class ServiceBrowserMock():
         self.service_type = service_type
         self.handlers = handlers
 
-        for name in ['id0', 'id1', 'id2', 'id3']:
+        for name in ['id0', 'id1', 'id2', 'id3', 'id4', 'id5']:
             self.handlers[0](conf, service_type, name, ServiceStateChange.Added)
             self.handlers[0](conf, service_type, name, ServiceStateChange.Removed)
 
@@ -63,6 +64,11 @@ def conf_mock(mocker: MockerFixture) -> Mock:
                 port=4321,
                 properties={},  # Will be discarded
             )
+        if name == 'id4':
+            raise RuntimeError('Resolve failed')
+        if name == 'slow':
+            await asyncio.sleep(10)
+        # Other names are not resolved
 
     async def close():
         pass
@@ -78,6 +84,12 @@ def browser_mock(mocker: MockerFixture) -> Mock:
     return mocker.patch(TESTED + '.ServiceBrowser', ServiceBrowserMock)
 
 
+@pytest.fixture(autouse=True)
+def no_browsers():
+    # Other test modules may have called mdns.setup() in this context
+    mdns.CV.set(None)
+
+
 async def test_discover_one():
     assert await mdns.discover_one(None, const.BREWBLOX_DNS_TYPE, timedelta(seconds=1)) == ('1.2.3.4', 1234, 'id1')
     assert await mdns.discover_one('id2', const.BREWBLOX_DNS_TYPE, timedelta(seconds=1)) == ('4.3.2.1', 4321, 'id2')
@@ -94,3 +106,78 @@ async def test_discover_all():
     async for res in mdns.discover_all(None, const.BREWBLOX_DNS_TYPE, timedelta(milliseconds=100)):
         retv.append(res)
     assert len(retv) == 2
+
+
+async def test_lifespan_without_setup():
+    # Without setup(), browsers are not kept, and there is nothing to close
+    async with mdns.lifespan():
+        assert await mdns.discover_one(None, const.BREWBLOX_DNS_TYPE, timedelta(seconds=1)) == ('1.2.3.4', 1234, 'id1')
+    assert mdns.CV.get() is None
+
+
+async def test_persistent_browser(conf_mock: Mock):
+    config = utils.get_config()
+    config.mdns_cache_ttl = timedelta(minutes=1)
+    mdns.setup()
+
+    async with mdns.lifespan():
+        assert await mdns.discover_one('id2', const.BREWBLOX_DNS_TYPE, timedelta(seconds=1)) == ('4.3.2.1', 4321, 'id2')
+        assert conf_mock.call_count == 1
+
+        # Subsequent queries are answered from cache, without a new browser
+        browser = mdns.CV.get()[const.BREWBLOX_DNS_TYPE]
+        assert len(browser.cached()) == 2
+        res = await mdns.discover_one('id1', const.BREWBLOX_DNS_TYPE, timedelta(milliseconds=10))
+        assert res == ('1.2.3.4', 1234, 'id1')
+        retv = [res async for res in mdns.discover_all(None, const.BREWBLOX_DNS_TYPE, timedelta(milliseconds=10))]
+        assert len(retv) == 2
+        assert conf_mock.call_count == 1
+
+        # Removed devices are no longer cached
+        browser._on_change(None, const.BREWBLOX_DNS_TYPE, 'id1', ServiceStateChange.Removed)
+        with pytest.raises(asyncio.TimeoutError):
+            await mdns.discover_one('id1', const.BREWBLOX_DNS_TYPE, timedelta(milliseconds=10))
+
+        # Expired devices are resolved again before they are used
+        browser._entries = {k: (v, 0) for k, (v, _) in browser._entries.items()}
+        assert browser.cached() == []
+        assert await mdns.discover_one('id2', const.BREWBLOX_DNS_TYPE, timedelta(seconds=1)) == ('4.3.2.1', 4321, 'id2')
+
+        browser._entries = {k: (v, 0) for k, (v, _) in browser._entries.items()}
+        retv = [res async for res in mdns.discover_all(None, const.BREWBLOX_DNS_TYPE, timedelta(milliseconds=100))]
+        assert retv == [('4.3.2.1', 4321, 'id2')]
+
+        # Pending resolves are cancelled on close
+        browser._resolve(const.BREWBLOX_DNS_TYPE, 'slow')
+        tasks = set(browser._tasks)
+        assert tasks
+
+    assert all(task.done() for task in tasks)
+    assert browser._conf is None
+
+
+async def test_browser_resolve():
+    browser = mdns.MdnsBrowser(const.BREWBLOX_DNS_TYPE, timedelta(minutes=1))
+    browser.start()
+    await asyncio.sleep(0.01)
+    assert sorted(e.id for e in browser.cached()) == ['id1', 'id2']
+
+    # Failed resolves are ignored
+    await browser._add(const.BREWBLOX_DNS_TYPE, 'id4')
+    assert 'id4' not in browser._entries
+
+    # Services that can't be resolved are no longer cached
+    browser._entries['id5'] = browser._entries['id1']
+    await browser._add(const.BREWBLOX_DNS_TYPE, 'id5')
+    assert 'id5' not in browser._entries
+
+    # Every device is yielded at most once
+    async with aclosing(browser.discover(None)) as gen:
+        first = await anext(gen)
+        await browser._add(const.BREWBLOX_DNS_TYPE, first.id)
+        second = await anext(gen)
+        assert first != second
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(anext(gen), timeout=0.01)
+
+    await browser.close()
@@ -0,0 +1,105 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from brewblox_devcon_spark import (app_factory, command, mqtt,
+                                   multi_controller, state_machine, utils)
+
+TESTED = multi_controller.__name__
+
+
+@pytest.fixture
+def app() -> FastAPI:
+    config = utils.get_config()
+    config.controllers = {
+        'spark-one': {},
+        'spark-two': {'device_id': '5678'},
+    }
+    return app_factory.create_app()
+
+
+async def test_multi_controller(client: AsyncClient):
+    one, two = multi_controller.CV.get()
+    assert one.config.name == 'spark-one'
+    assert two.config.device_id == '5678'
+    assert one.config.simulation_port != two.config.simulation_port
+
+    for controller in [one, two]:
+        state = controller.context.run(state_machine.CV.get)
+        await asyncio.wait_for(state.wait_synchronized(), timeout=5)
+
+    # Controllers share nothing but the codec and the MQTT client
+    assert one.context.run(command.CV.get) is not two.context.run(command.CV.get)
+
+    resp = await client.post('/spark-one/blocks/create', json={
+        'id': 'setpoint',
+        'type': 'SetpointSensorPair',
+        'data': {},
+    })
+    assert resp.status_code == 201
+    assert resp.json()['serviceId'] == 'spark-one'
+
+    resp = await client.post('/spark-one/blocks/all/read')
+    assert 'setpoint' in [b['id'] for b in resp.json()]
+
+    resp = await client.post('/spark-two/blocks/all/read')
+    assert 'setpoint' not in [b['id'] for b in resp.json()]
+
+    resp = await client.get('/spark-two/api/doc')
+    assert resp.status_code == 200
+
+    resp = await client.get('/sparkey/controllers')
+    assert [c['name'] for c in resp.json()] == ['spark-one', 'spark-two']
+    assert resp.json()[1]['status']['service']['device']['device_id'] == '5678'
+
+
+async def test_multi_controller_mqtt(client: AsyncClient):
+    one, two = multi_controller.CV.get()
+    for controller in [one, two]:
+        state = controller.context.run(state_machine.CV.get)
+        await asyncio.wait_for(state.wait_synchronized(), timeout=5)
+
+    # MQTT handlers are called in the context of the controller that subscribed them
+    mqtt_client = one.context.run(mqtt.CV.get)
+    mqtt_client.publish('brewcast/spark/blocks/create', {
+        'id': 'mqtt-setpoint',
+        'serviceId': 'spark-two',
+        'type': 'SetpointSensorPair',
+        'data': {},
+    })
+
+    async def created(name: str) -> bool:
+        resp = await client.post(f'/{name}/blocks/all/read')
+        return 'mqtt-setpoint' in [b['id'] for b in resp.json()]
+
+    async with asyncio.timeout(5):
+        while not await created('spark-two'):
+            await asyncio.sleep(0.01)
+
+    assert not await created('spark-one')
+
+
+async def test_controller_lifespan_errors(caplog: pytest.LogCaptureFixture):
+    controller = multi_controller.Controller(utils.get_config().model_copy(), FastAPI)
+
+    @asynccontextmanager
+    async def failing_startup():
+        raise RuntimeError('startup')
+        yield
+
+    @asynccontextmanager
+    async def failing_shutdown():
+        yield
+        raise RuntimeError('shutdown')
+
+    with pytest.raises(RuntimeError, match='startup'):
+        async with controller.lifespan(failing_startup):
+            pass
+
+    async with controller.lifespan(failing_shutdown):
+        pass
+
+    assert 'RuntimeError(shutdown)' in caplog.text
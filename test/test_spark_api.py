@@ -7,7 +7,7 @@ from asgi_lifespan import LifespanManager
 from fastapi import FastAPI
 from pytest_mock import MockerFixture
 
-from brewblox_devcon_spark import (codec, command, connection,
+from brewblox_devcon_spark import (codec, command, connection, const,
                                    datastore_blocks, datastore_settings,
                                    exceptions, mqtt, spark_api, state_machine,
                                    synchronization, utils)
@@ -24,6 +24,7 @@ async def lifespan(app: FastAPI):
         await stack.enter_async_context(mqtt.lifespan())
         await stack.enter_async_context(connection.lifespan())
         await stack.enter_async_context(synchronization.lifespan())
+        await stack.enter_async_context(spark_api.lifespan())
         yield
 
 
@@ -213,3 +214,73 @@ async def test_start_update():
 
     with pytest.raises(exceptions.UpdateInProgress):
         await api.read_all_blocks()
+
+
+async def test_block_cache(mocker: MockerFixture):
+    await state_machine.CV.get().wait_synchronized()
+    api = spark_api.CV.get()
+    cmder = command.CV.get()
+    s_read = mocker.spy(cmder, 'read_block')
+    s_read_all = mocker.spy(cmder, 'read_all_blocks')
+
+    created = await api.create_block(Block(
+        id='setpoint',
+        type='SetpointSensorPair',
+        data={'storedSetting[degC]': 20},
+    ))
+
+    # Created block is cached
+    block = await api.read_block(BlockIdentity(id='setpoint'), max_age=10)
+    assert block == created
+    assert s_read.await_count == 0
+
+    # Cached data is not modified by callers
+    block.data['storedSetting']['value'] = 50
+    block = await api.read_block(BlockIdentity(id='setpoint'), max_age=10)
+    assert block == created
+
+    # Cache is bypassed by default
+    await api.read_block(BlockIdentity(id='setpoint'))
+    assert s_read.await_count == 1
+
+    # Cache is only complete after all blocks are read
+    all_blocks = await api.read_all_blocks(max_age=10)
+    cached = await api.read_all_blocks(max_age=10)
+    assert sorted(cached, key=lambda b: b.nid) == sorted(all_blocks, key=lambda b: b.nid)
+    assert s_read_all.await_count == 1
+
+    # Writes update the cache
+    created.data['storedSetting[degC]'] = 25
+    patched = await api.patch_block(created)
+    assert await api.read_block(BlockIdentity(id='setpoint'), max_age=10) == patched
+
+    # Deleted blocks are not returned from cache
+    await api.delete_block(BlockIdentity(id='setpoint'))
+    assert 'setpoint' not in [b.id for b in await api.read_all_blocks(max_age=10)]
+    with pytest.raises(exceptions.UnknownId):
+        await api.read_block(BlockIdentity(id='setpoint'), max_age=10)
+
+    # Reads that started before a write do not replace newer data
+    nid = const.SYS_BLOCK_IDS['SysInfo']
+    old = FirmwareBlock(nid=nid, type='SysInfo', data={'version': 'old'})
+    api.cache.put(old.model_copy(update={'data': {'version': 'new'}}), 2e9)
+    api.cache.put(old, 1e9)
+    assert api.cache.get(nid, 1e10).data == {'version': 'new'}
+
+    stats = api.cache.stats()
+    assert stats.hits == 6
+    assert stats.misses == 1
+    assert stats.hit_ratio == pytest.approx(6 / 7)
+    assert stats.age is not None
+
+    # Unit changes invalidate the cache
+    await api._on_global_settings()
+    assert api.cache.stats().size == 0
+    assert api.cache.stats().age is None
+
+    # Disconnects invalidate the cache
+    await api.read_all_blocks()
+    assert api.cache.stats().size > 0
+    await connection.CV.get().end()
+    await asyncio.sleep(0.01)
+    assert api.cache.stats().size == 0
@@ -72,6 +72,10 @@ async def test_sync_status(m_sleep):
     await connect()
     assert states() == [False, True, True, True]
 
+    times = state_machine.CV.get().desc().sync_times
+    assert times.startup is not None
+    assert times.synchronized >= max(times.handshake, times.block_names, times.sysinfo)
+
     await disconnect()
     assert states() == [True, False, False, False]
 
@@ -112,6 +116,26 @@ async def test_write_error(mocker: MockerFixture):
     assert states() == [True, False, False, False]
 
 
+async def test_handshake_backoff(mocker: MockerFixture):
+    config = utils.get_config()
+    config.handshake_timeout = timedelta(milliseconds=450)
+    config.handshake_ping_interval_min = timedelta(milliseconds=10)
+    config.handshake_ping_interval = timedelta(milliseconds=80)
+
+    # Prompts do not wait for earlier prompts to complete
+    async def hang():
+        await asyncio.Event().wait()
+
+    m_version = mocker.patch.object(command.CV.get(), 'version', autospec=True)
+    m_version.side_effect = hang
+
+    with pytest.raises(asyncio.TimeoutError):
+        await connect()
+
+    # Prompts are sent at 0, 10, 30, 70, 150, 230, 310, and 390 ms
+    assert m_version.await_count == 8
+
+
 async def test_handshake_timeout(mocker: MockerFixture):
     config = utils.get_config()
     config.handshake_timeout = timedelta(milliseconds=100)
@@ -163,3 +187,172 @@ async def test_invalid_error(mocker: MockerFixture):
     with pytest.raises(asyncio.TimeoutError):
         s = synchronization.StateSynchronizer()
         await asyncio.wait_for(s.run(), timeout=0.2)
+
+
+async def test_name_snapshot(mocker: MockerFixture):
+    config = utils.get_config()
+    store = datastore_blocks.CV.get()
+    cmder = command.CV.get()
+    s_read_names = mocker.spy(cmder, 'read_all_block_names')
+
+    await connect()
+    assert s_read_names.call_count == 1
+    snapshot = datastore_blocks.load_snapshot()
+    assert snapshot.device_id == config.device_id
+    assert sorted(snapshot.names) == sorted(store.items())
+    names = dict(store)
+
+    # Controller did not reboot: names are loaded from snapshot
+    await disconnect()
+    store.clear()
+    sync = synchronization.StateSynchronizer()
+    datastore_settings.CV.get().service_settings.enabled = True
+    await sync.synchronize()
+    assert s_read_names.call_count == 1
+    assert sync._unverified
+    assert dict(store) == names
+
+    # Background verification replaces outdated names
+    del store['SystemInfo']
+    store['outdated'] = 1234
+    sync.save_snapshot()  # unverified names are not saved
+    assert datastore_blocks.load_snapshot().digest == snapshot.digest
+    await sync._verify_block_store()
+    assert s_read_names.call_count == 2
+    assert not sync._unverified
+    assert dict(store) == names
+
+    # Verified names are not verified again
+    await sync._verify_block_store()
+    assert s_read_names.call_count == 2
+
+    # Controller rebooted: names are read from controller
+    await disconnect()
+    path = datastore_blocks.get_snapshot_path()
+    path.write_text(snapshot.model_copy(update={'boot_time': 0}).model_dump_json())
+    await connect()
+    assert s_read_names.call_count == 3
+
+    # Snapshots with an invalid digest are discarded
+    path.write_text(snapshot.model_copy(update={'names': [('other', 1000)]}).model_dump_json())
+    assert datastore_blocks.load_snapshot() is None
+    path.write_text('garbage')
+    assert datastore_blocks.load_snapshot() is None
+
+    config.name_snapshot = False
+    assert datastore_blocks.save_snapshot(config.device_id, 0) is None
+    assert datastore_blocks.load_snapshot() is None
+
+
+async def test_name_snapshot_changes(mocker: MockerFixture):
+    store = datastore_blocks.CV.get()
+    s_save = mocker.spy(datastore_blocks, 'save_snapshot')
+
+    await connect()
+    assert s_save.call_count == 1
+
+    # Changes are saved immediately, and changes made together are saved together
+    store['new-block'] = 1500
+    store['other-block'] = 1501
+    store['other-block'] = 1501
+    await asyncio.sleep(0)
+    assert s_save.call_count == 2
+    assert ('new-block', 1500) in datastore_blocks.load_snapshot().names
+    assert ('other-block', 1501) in datastore_blocks.load_snapshot().names
+
+    # Unchanged names are not saved again
+    store.update({'new-block': 1500})
+    await asyncio.sleep(0)
+    assert s_save.call_count == 2
+
+    # Changes to unverified names discard the snapshot
+    await disconnect()
+    sync = synchronization.StateSynchronizer()
+    datastore_settings.CV.get().service_settings.enabled = True
+    await sync.synchronize()
+    assert sync._unverified
+    await asyncio.sleep(0)
+    assert datastore_blocks.load_snapshot() is not None
+
+    del store['new-block']
+    await asyncio.sleep(0)
+    assert datastore_blocks.load_snapshot() is None
+
+    await sync._verify_block_store()
+    assert not sync._unverified
+    assert ('other-block', 1501) not in datastore_blocks.load_snapshot().names
+
+
+async def test_name_snapshot_errors(mocker: MockerFixture, caplog: pytest.LogCaptureFixture):
+    cmder = command.CV.get()
+
+    sync = synchronization.StateSynchronizer()
+    datastore_settings.CV.get().service_settings.enabled = True
+    await sync.synchronize()
+
+    m_save = mocker.patch(TESTED + '.datastore_blocks.save_snapshot', autospec=True)
+    m_save.side_effect = OSError('disk full')
+    sync.save_snapshot()
+    assert 'Failed to save block name snapshot: OSError(disk full)' in caplog.text
+
+    # Names remain unverified if verification fails
+    sync._unverified = True
+    m_read_names = mocker.patch.object(cmder, 'read_all_block_names', autospec=True)
+    m_read_names.side_effect = RuntimeError('read failed')
+    await sync._verify_block_store()
+    assert 'Failed to verify block name snapshot: RuntimeError(read failed)' in caplog.text
+    assert sync._unverified
+
+
+async def test_legacy_migration(mocker: MockerFixture):
+    config = utils.get_config()
+    config.datastore_migration_timeout = timedelta(milliseconds=100)
+    store = datastore_blocks.CV.get()
+    nid = const.SYS_BLOCK_IDS['SysInfo']
+
+    async def hang(client):
+        await asyncio.sleep(10)
+
+    m_extract = mocker.patch(TESTED + '.datastore_blocks.extract_legacy_redis_block_names', autospec=True)
+    m_remove = mocker.patch(TESTED + '.datastore_blocks.remove_legacy_redis_block_names', autospec=True)
+    m_extract.side_effect = hang
+
+    sync = synchronization.StateSynchronizer()
+    datastore_settings.CV.get().service_settings.enabled = True
+    await sync.synchronize()
+    assert sync.startup_latency is not None
+
+    # Datastore does not respond: migration is not recorded
+    await sync._migrate_legacy_names()
+    assert m_extract.await_count == 1
+    assert not datastore_blocks.is_legacy_migrated()
+
+    # Datastore errors: migration is not recorded
+    m_extract.side_effect = RuntimeError('datastore error')
+    await sync._migrate_legacy_names()
+    assert m_extract.await_count == 2
+    assert not datastore_blocks.is_legacy_migrated()
+
+    # Controller disconnected during migration: migration is not recorded
+    m_extract.side_effect = None
+    m_extract.return_value = [('legacy-sysinfo', nid)]
+    m_synchronized = mocker.patch.object(sync.state, 'is_synchronized', autospec=True)
+    m_synchronized.side_effect = [True, False]
+    await sync._migrate_legacy_names()
+    assert m_extract.await_count == 3
+    assert m_remove.await_count == 0
+    assert not datastore_blocks.is_legacy_migrated()
+    mocker.stop(m_synchronized)
+
+    # Names that can't be written are skipped
+    m_extract.return_value = [('legacy-sysinfo', nid), ('legacy-unknown', 9999)]
+    await sync._migrate_legacy_names()
+    assert store['legacy-sysinfo'] == nid
+    assert 'legacy-unknown' not in store
+    assert m_remove.await_count == 1
+    assert datastore_blocks.is_legacy_migrated()
+    assert ('legacy-sysinfo', nid) in datastore_blocks.load_snapshot().names
+
+    # Migration is done once per device
+    await sync._migrate_legacy_names()
+    assert m_extract.await_count == 4
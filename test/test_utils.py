@@ -20,6 +20,29 @@ def test_not_sentinel():
     assert utils.not_sentinel(..., ...) is ...
 
 
+def test_resolve_config_defaults():
+    base = utils.get_config()
+
+    config = utils.resolve_config_defaults(base.model_copy(update={
+        'mock': True,
+        'device_id': None,
+        'simulation_port': 0,
+        'simulation_display_port': 0,
+    }))
+    assert config.device_id
+    assert config.simulation_port
+    assert config.simulation_display_port
+
+    config = utils.resolve_config_defaults(base.model_copy(update={
+        'mock': False,
+        'simulation': False,
+        'device_id': None,
+        'simulation_port': 1234,
+    }))
+    assert config.device_id is None
+    assert config.simulation_port == 1234
+
+
 def test_add_logging_level(caplog: pytest.LogCaptureFixture):
     logger = logging.getLogger('test_add_logging_level')
 